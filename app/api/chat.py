@@ -1,22 +1,26 @@
 # Path: app/api/chat.py
 
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any
 from datetime import datetime
 from app.models.chat import ChatMessage, ChatResponse, ChatHistory, DocumentProcessingResponse
 from app.services.rag_service import RAGService
-from app.core.dependencies import get_rag_service
+from app.core.dependencies import get_rag_service, get_text_extractor
 from app.core.auth import get_current_user
+from app.core.uploads import save_upload, UploadTooLarge
+from app.services.document_text import DocumentTextExtractor
+from app.services.session_documents import SessionDocumentStore
 import logging
-import io
-import docx
-import fitz 
+import os
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # In-memory storage for chat sessions
 chat_sessions: Dict[str, Dict[str, Any]] = {}
+# Documents uploaded to sessions, stored once per content hash; sessions reference them by hash
+session_documents = SessionDocumentStore()
 
 def get_session(session_id: str) -> Dict[str, Any]:
     """
@@ -60,7 +64,7 @@ async def chat_endpoint(message: ChatMessage, service: RAGService = Depends(get_
         if session["mode"] == "DOCUMENT_QA" and doc_context:
             result = service.query_simple_document(
                 question=message.message,
-                full_text=doc_context["full_text"],
+                full_text=session_documents.get(doc_context["content_hash"]).paged_text().text,
                 chat_history=history_for_rag
             )
         else: # This path is now correctly taken when the router decides GENERAL_KNOWLEDGE_BASE
@@ -107,6 +111,9 @@ async def clear_chat_history(session_id: str,current_user: str = Depends(get_cur
     """Clears all data for a session."""
     try:
         if session_id in chat_sessions:
+            doc_context = chat_sessions[session_id].get("document_context")
+            if doc_context:
+                session_documents.release(doc_context["content_hash"], session_id)
             del chat_sessions[session_id]
             logger.info(f"--- Chat history for session {session_id} cleared by user {current_user} ---")
         return {"message": "Chat history and document context cleared", "session_id": session_id}
@@ -120,6 +127,7 @@ async def upload_and_chat(
     message: str = Form(...),
     session_id: str = Form(...),
     service: RAGService = Depends(get_rag_service),
+    extractor: DocumentTextExtractor = Depends(get_text_extractor),
     current_user: str = Depends(get_current_user)
 ):
     """
@@ -128,40 +136,55 @@ async def upload_and_chat(
     try:
         logger.info(f"Document upload for chat by user: {current_user}")
         filename = file.filename
-        content = await file.read()
-        full_text = ""
-        
-        if filename.lower().endswith('.pdf'):
-            with fitz.open(stream=content, filetype="pdf") as doc:
-                full_text = "".join(page.get_text() for page in doc)
-        elif filename.lower().endswith('.docx'):
-            doc = docx.Document(io.BytesIO(content))
-            full_text = "\n".join([para.text for para in doc.paragraphs])
-        else:
+        if not filename.lower().endswith(('.pdf', '.docx')):
             raise HTTPException(status_code=400, detail="Only PDF or DOCX files are supported.")
-        
-        if not full_text:
-            raise HTTPException(status_code=500, detail="Could not extract text from the document.")
 
-        # --- Create and store the document summary ---
-        document_summary = service._create_document_summary(full_text)
+        async def extract_and_summarize(path: str):
+            try:
+                # Parsed from the streamed temp file in the extraction processes, off the event loop
+                document_text = await extractor.extract(path, filename)
+                if not document_text.text.strip():
+                    raise HTTPException(status_code=500, detail="Could not extract text from the document.")
+                # --- Create the document summary ---
+                return document_text, await run_in_threadpool(service._create_document_summary, document_text.text)
+            finally:
+                os.remove(path)
+
+        # Files already uploaded by any session are neither extracted nor summarized again
+        upload = await save_upload(file)
+        handed_over = False
+
+        def start_build():
+            # The build owns the temp file from here on: it outlives this request if the client goes away
+            nonlocal handed_over
+            handed_over = True
+            return extract_and_summarize(upload.path)
+
+        try:
+            document = await session_documents.acquire(upload.content_hash, session_id, start_build)
+        finally:
+            if not handed_over:
+                os.remove(upload.path)
+
+        # Store the reference in the session right away, so the document is released with it
+        session = get_session(session_id)
+        previous = session.get("document_context")
+        if previous and previous["content_hash"] != document.content_hash:
+            session_documents.release(previous["content_hash"], session_id)
+        # Text, page offsets and summary are in session_documents under the content hash
+        session["document_context"] = {
+            "filename": filename,
+            "content_hash": document.content_hash
+        }
+        session["mode"] = "DOCUMENT_QA"
         
         # Answer the user's first question about the document
         result = service.query_simple_document(
             question=message,
-            full_text=full_text,
+            full_text=document.paged_text().text,
             chat_history=[]
         )
         
-        # Get the session and store all necessary context
-        session = get_session(session_id)
-        session["document_context"] = {
-            "filename": filename,
-            "full_text": full_text,
-            "summary": document_summary 
-        }
-        session["mode"] = "DOCUMENT_QA"
-        
         # Store the first interaction in history
         session["history"].append(ChatHistory(
             question=message,
@@ -181,6 +204,10 @@ async def upload_and_chat(
             timestamp=datetime.now()
         )
 
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"--- ChatEndpoint: Simple document chat failed: {e} ---", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Document processing failed: {e}")
\ No newline at end of file
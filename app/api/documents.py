@@ -1,11 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from typing import List, Optional
 from datetime import datetime
 from pathlib import Path
-from app.models.documents import DocumentUpload
+import os
+import uuid
+from app.models.documents import DocumentUpload, IngestionJob
 from app.services.rag_service import RAGService
-from app.core.config import DATA_DIR
-from app.core.dependencies import get_rag_service
+from app.core.config import RAW_DATA_DIR, INGESTION_UPLOADS_DIR
+from app.core.uploads import save_upload, publish_upload, UploadTooLarge
+from app.services.collection_rebuild import CollectionRebuilder
+from app.services.ingestion_jobs import IngestionWorkerPool, job_eta_seconds, QUEUED, RUNNING, FAILED, CANCELLED
+from app.core.dependencies import get_rag_service, get_collection_rebuilder, get_ingestion_workers
 from app.core.auth import get_current_admin
 import logging
 
@@ -13,41 +18,114 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # Ensure the directory for raw data exists
-RAW_DATA_DIR = DATA_DIR / "raw"
 RAW_DATA_DIR.mkdir(exist_ok=True)
 
-@router.post("/documents/upload", response_model=DocumentUpload)
+def _job_response(job: dict) -> IngestionJob:
+    return IngestionJob(**{**job, "cancel_requested": bool(job["cancel_requested"]), "eta_seconds": job_eta_seconds(job)})
+
+def _get_job_or_404(workers: IngestionWorkerPool, job_id: str) -> dict:
+    job = workers.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@router.post("/documents/upload", response_model=DocumentUpload, status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     service: RAGService = Depends(get_rag_service),
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers),
     admin: str = Depends(get_current_admin)
 ):
     """
-    Handles the upload and processing of a document for the knowledge base.
+    Stores an uploaded document and queues it for ingestion into the knowledge base.
+    Progress is available from /documents/jobs/{job_id}. A document already ingested
+    with the same content is not queued again.
     This endpoint is protected and requires admin authentication.
     """
     logger.info(f"--- Document Upload endpoint for file: {file.filename} by admin: {admin} ---")
     try:
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+        # Streamed next to its destination, so the move into place is atomic
+        upload = await save_upload(file, directory=str(RAW_DATA_DIR))
         file_path = RAW_DATA_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
-        
-        success = service.process_document(str(file_path))
-        if success:
+        if file_path.is_file() and service.vector_store.is_document_current(file.filename, upload.content_hash):
+            os.remove(upload.path)
             return DocumentUpload(
                 filename=file.filename,
-                status="processed",
-                message="Document successfully processed.",
+                status="unchanged",
+                message="The document is already in the knowledge base with the same content.",
                 timestamp=datetime.now()
             )
-        else:
-            raise HTTPException(status_code=500, detail="Document processing failed.")
+        # The job ingests its own copy, so a later upload of the same name cannot change the file under it
+        job_path = INGESTION_UPLOADS_DIR / uuid.uuid4().hex / file.filename
+        job_path.parent.mkdir(parents=True)
+        os.replace(upload.path, job_path)
+        publish_upload(job_path, file_path)
+
+        job = workers.submit(file.filename, str(job_path), submitted_by=str(admin))
+        return DocumentUpload(
+            filename=file.filename,
+            status=QUEUED,
+            message="Document queued for processing.",
+            job_id=job["job_id"],
+            timestamp=datetime.now()
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/documents/jobs", response_model=List[IngestionJob])
+async def list_ingestion_jobs(
+    status: Optional[str] = None,
+    limit: int = 50,
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers),
+    admin: str = Depends(get_current_admin)
+):
+    """Lists the most recent ingestion jobs, optionally filtered by status."""
+    return [_job_response(job) for job in workers.store.list(limit=limit, status=status)]
+
+@router.get("/documents/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(
+    job_id: str,
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers),
+    admin: str = Depends(get_current_admin)
+):
+    """Reports an ingestion job's status, current stage, chunk progress and ETA."""
+    return _job_response(_get_job_or_404(workers, job_id))
+
+@router.post("/documents/jobs/{job_id}/cancel", response_model=IngestionJob)
+async def cancel_ingestion_job(
+    job_id: str,
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers),
+    admin: str = Depends(get_current_admin)
+):
+    """Cancels a queued job, or asks a running job to stop before it writes to the index."""
+    job = _get_job_or_404(workers, job_id)
+    if job["status"] not in (QUEUED, RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}.")
+    logger.info(f"--- Ingestion job {job_id} cancelled by admin: {admin} ---")
+    return _job_response(workers.store.request_cancel(job_id))
+
+@router.post("/documents/jobs/{job_id}/retry", response_model=IngestionJob)
+async def retry_ingestion_job(
+    job_id: str,
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers),
+    admin: str = Depends(get_current_admin)
+):
+    """Queues a failed or cancelled job again."""
+    job = _get_job_or_404(workers, job_id)
+    if job["status"] not in (FAILED, CANCELLED):
+        raise HTTPException(status_code=409, detail=f"Only failed or cancelled jobs can be retried; this one is {job['status']}.")
+    if not Path(job["file_path"]).is_file():
+        raise HTTPException(status_code=410, detail="The uploaded file no longer exists.")
+    logger.info(f"--- Ingestion job {job_id} retried by admin: {admin} ---")
+    return _job_response(workers.retry(job_id))
+
 @router.get("/documents/list")
 async def list_documents(admin: str = Depends(get_current_admin)):
     """Lists all documents currently in the knowledge base."""
@@ -66,18 +144,24 @@ async def list_documents(admin: str = Depends(get_current_admin)):
         raise HTTPException(status_code=500, detail="Failed to list documents.")
 
 @router.delete("/documents/{filename}")
-async def delete_document(filename: str, admin: str = Depends(get_current_admin)):
-    """Deletes a document from the knowledge base."""
+async def delete_document(
+    filename: str,
+    service: RAGService = Depends(get_rag_service),
+    admin: str = Depends(get_current_admin)
+):
+    """Deletes a document from the knowledge base, including its vectors."""
     try:
         file_path = RAW_DATA_DIR / filename
         if not file_path.is_file():
             raise HTTPException(status_code=404, detail="Document not found.")
         
+        removed_chunks = service.delete_document(filename)
         file_path.unlink()  # Deletes the file
         
-        # You might want to add logic here to remove the document from the vector store as well
-        logger.info(f"--- Document deleted: {filename} ---")
-        return {"message": "Document deleted successfully", "filename": filename}
+        logger.info(f"--- Document deleted: {filename} ({removed_chunks} chunks removed from the vector store) ---")
+        return {"message": "Document deleted successfully", "filename": filename, "removed_chunks": removed_chunks}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"--- Failed to delete document: {e} ---", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to delete document: {e}")
@@ -97,4 +181,59 @@ async def get_vectorstore_status(
         }
     except Exception as e:
         logger.error(f"--- Failed to get vector store status: {e} ---", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to get vector store status: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get vector store status: {e}")
+
+def _run_rebuild(rebuilder: CollectionRebuilder):
+    try:
+        rebuilder.rebuild()
+    except Exception:
+        pass  # Logged by the rebuilder; the report is available from /documents/generations
+
+@router.post("/documents/rebuild", status_code=202)
+async def rebuild_knowledge_base(
+    background_tasks: BackgroundTasks,
+    rebuilder: CollectionRebuilder = Depends(get_collection_rebuilder),
+    admin: str = Depends(get_current_admin)
+):
+    """Rebuilds the knowledge base into a new generation and activates it once validated."""
+    if rebuilder.is_running:
+        raise HTTPException(status_code=409, detail="A rebuild is already running.")
+    logger.info(f"--- Knowledge base rebuild requested by admin: {admin} ---")
+    background_tasks.add_task(_run_rebuild, rebuilder)
+    return {"message": "Rebuild started.", "timestamp": datetime.now()}
+
+@router.get("/documents/generations")
+async def list_generations(
+    rebuilder: CollectionRebuilder = Depends(get_collection_rebuilder),
+    admin: str = Depends(get_current_admin)
+):
+    """Shows the active index generation, the ones kept for rollback and the last rebuild report."""
+    state = rebuilder.live_store.alias_store.read()
+    return {**state, "rebuild_running": rebuilder.is_running, "last_rebuild": rebuilder.last_report}
+
+@router.post("/documents/rollback")
+async def rollback_generation(
+    rebuilder: CollectionRebuilder = Depends(get_collection_rebuilder),
+    admin: str = Depends(get_current_admin)
+):
+    """Switches reads back to the previously active generation."""
+    if rebuilder.is_running:
+        raise HTTPException(status_code=409, detail="Cannot roll back while a rebuild is running.")
+    generation = rebuilder.rollback()
+    if generation is None:
+        raise HTTPException(status_code=404, detail="No previous generation to roll back to.")
+    logger.info(f"--- Rolled back to generation '{generation or 'base'}' by admin: {admin} ---")
+    return {"message": "Rolled back.", "active": generation or "base"}
+
+@router.post("/documents/generations/gc")
+async def garbage_collect_generations(
+    rebuilder: CollectionRebuilder = Depends(get_collection_rebuilder),
+    admin: str = Depends(get_current_admin)
+):
+    """Deletes old generations that are no longer kept for rollback."""
+    try:
+        dropped = rebuilder.gc()
+        return {"dropped": [g or "base" for g in dropped]}
+    except Exception as e:
+        logger.error(f"--- Failed to garbage-collect generations: {e} ---", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to garbage-collect generations: {e}")
@@ -12,6 +12,7 @@ load_dotenv()
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 VECTORSTORE_DIR = DATA_DIR / "vectorstore"
+RAW_DATA_DIR = DATA_DIR / "raw"  # Uploaded source PDFs; the knowledge base can be rebuilt from them
 
 # --- FastAPI Settings ---
 API_TITLE = "Immigration Chatbot"
@@ -27,6 +28,50 @@ EMBEDDING_MODEL = "/root/local_models/paraphrase-multilingual-mpnet-base-v2"
 # --- ChromaDB Settings ---
 CHROMA_PERSIST_DIR = str(VECTORSTORE_DIR)
 COLLECTION_NAME = "documents"
+QUESTIONS_COLLECTION_NAME = f"{COLLECTION_NAME}_questions"
+SECTIONS_COLLECTION_NAME = f"{COLLECTION_NAME}_sections"
+VECTORSTORE_SCAN_BATCH_SIZE = 1000  # Page size when scanning the whole collection
+# "local" opens the embedded store in CHROMA_PERSIST_DIR (development, single process).
+# "http" talks to a shared Chroma server, e.g. `chroma run --path data/vectorstore --port 8001`,
+# so several workers or hosts can serve one index.
+CHROMA_MODE = os.getenv("CHROMA_MODE", "local")
+CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST", "localhost")
+CHROMA_SERVER_PORT = int(os.getenv("CHROMA_SERVER_PORT", "8001"))
+CHROMA_SERVER_SSL = os.getenv("CHROMA_SERVER_SSL", "false").lower() == "true"
+CHROMA_SERVER_AUTH_TOKEN = os.getenv("CHROMA_SERVER_AUTH_TOKEN", "")
+CHROMA_REQUEST_RETRIES = 4           # Attempts per request on connection errors and 5xx/429 responses
+CHROMA_RETRY_MAX_WAIT_SECONDS = 4.0
+
+# --- Blue/Green Index Rebuilds ---
+# Rebuilds write a new generation of collections; reads follow the alias file, which is swapped atomically
+COLLECTION_ALIAS_PATH = str(DATA_DIR / "vectorstore_alias.json")
+ALIAS_REFRESH_SECONDS = 5            # How often readers check whether the alias moved
+REBUILD_GENERATIONS_KEPT = 1         # Previous generations kept for rollback after GC
+REBUILD_SMOKE_QUERIES = [
+    "How do I apply for a green card?",
+    "¿Cuáles son los requisitos para la ciudadanía?",
+]
+
+# --- Compact Chunk Storage ---
+# Chunk text is kept once, zstd-compressed, in a side store instead of twice in Chroma
+COMPACT_STORAGE_ENABLED = True
+CHUNK_CONTENT_DB_PATH = str(DATA_DIR / "chunk_content.db")
+CHUNK_CONTENT_ZSTD_LEVEL = 9
+
+# --- Vector Quantization Report ---
+# scripts/quantization_report.py measures recall@k of PCA + int8 codes on the corpus.
+# Serving still uses Chroma's full-precision index: codes held beside it would add memory, not save it.
+QUANTIZATION_TRAINING_SIZE = 20000   # Vectors sampled to fit the PCA and int8 scales
+
+# --- Near-Duplicate Chunk Detection ---
+# Boilerplate shared across forms (privacy act notice, paperwork reduction text, filing
+# addresses) is stored once; the canonical chunk lists every document and page it appears in.
+NEAR_DUPLICATE_ENABLED = True
+NEAR_DUPLICATE_THRESHOLD = 0.85     # Estimated Jaccard similarity of word shingles; numbers and forms must also match
+NEAR_DUPLICATE_NUM_PERM = 128
+NEAR_DUPLICATE_BANDS = 16           # 16 bands x 8 rows
+NEAR_DUPLICATE_SHINGLE_SIZE = 5
+NEAR_DUPLICATE_MIN_LENGTH = 200     # Shorter chunks are too generic to collapse safely
 
 # --- Chunking Settings ---
 MIN_SECTION_TEXT_LENGTH = 50
@@ -34,6 +79,41 @@ DEFAULT_HEADER_TEXT = "General Content"
 CHUNK_SIZE = 750
 CHUNK_OVERLAP = 75
 
+# --- Ingestion Job Queue ---
+# Uploads are queued and ingested by background workers; the queue survives restarts
+INGESTION_JOBS_DB_PATH = str(DATA_DIR / "ingestion_jobs.db")
+INGESTION_UPLOADS_DIR = RAW_DATA_DIR / "jobs"   # Each queued upload keeps its own copy here until its job succeeds
+INGESTION_WORKERS = 1                      # Documents ingested at once; each already runs concurrent LLM calls
+INGESTION_POLL_SECONDS = 2.0               # How often idle workers look for queued jobs
+BULK_INGEST_CHECKPOINT_PATH = str(DATA_DIR / "ingest_checkpoint.json")  # Progress of scripts/ingest_documents.py, for resuming
+
+# --- Uploads ---
+# Uploads are streamed to disk in blocks and hashed on the way; larger ones are rejected with 413
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))  # 50 MiB
+UPLOAD_READ_BLOCK_SIZE = 1024 * 1024       # 1 MiB read from the request at a time
+UPLOAD_MULTIPART_OVERHEAD = 64 * 1024      # Allowance for multipart framing when checking a request's Content-Length
+UPLOAD_PATHS = ("/api/documents/upload", "/api/chat/document")  # Requests refused by Content-Length before the form is parsed
+
+# --- Chat Document Text Extraction ---
+# Documents uploaded to a chat are parsed in worker processes, off the event loop
+CHAT_EXTRACTION_WORKERS = 2                # Processes shared by all chat uploads
+CHAT_EXTRACTION_PAGES_PER_TASK = 16        # Larger PDFs are split into page ranges extracted in parallel
+SESSION_DOCUMENT_ZSTD_LEVEL = 6            # Chat documents are kept once per content hash, compressed
+
+# --- Streaming Ingestion Pipeline ---
+# Chunking, question generation, embedding and upserts run as concurrent stages
+# over batches of chunks, so a document is never held in memory all at once
+INGESTION_PIPELINE_CONCURRENT = True       # False chains the stages in one thread (same batches, no overlap)
+INGESTION_PIPELINE_BATCH_SIZE = 16         # Chunks per batch passed between stages
+INGESTION_PIPELINE_QUEUE_SIZE = 2          # Batches buffered between two stages before the earlier one blocks
+
+# --- Question Generation ---
+QUESTION_GENERATION_WORKERS = 4            # Concurrent LLM calls; match the server's OLLAMA_NUM_PARALLEL
+QUESTION_BATCHING_ENABLED = False          # Pack several short chunks into one prompt
+QUESTION_BATCH_SHORT_CHUNK_CHARS = 500     # Only chunks shorter than this are batched
+QUESTION_BATCH_MAX_CHUNKS = 4
+QUESTION_BATCH_MAX_CHARS = 2000            # Passage text per batched prompt
+
 # --- Document AI Layout Types ---
 DOCUMENT_AI_HEADER_TYPES = {"heading-1", "heading-2", "heading-3", "heading-4", "heading-5", "heading-6"}
 DOCUMENT_AI_PARAGRAPH_TYPES = {"paragraph"}
@@ -41,11 +121,34 @@ DOCUMENT_AI_LIST_ITEM_TYPES = {"list_item"}
 DOCUMENT_AI_FOOTER_TYPES = {"footer"}
 DOCUMENT_AI_TABLE_TYPES = {"table"}
 
+# --- Layout Extraction ---
+# "documentai" sends each PDF to Google Document AI (OCR, network round trip); "pymupdf"
+# reads the PDF text layer locally with font heuristics, so ingestion also works offline.
+# Compare both on a corpus with scripts/compare_layout_backends.py.
+LAYOUT_BACKEND = os.getenv("LAYOUT_BACKEND", "documentai")
+LAYOUT_OCR_FALLBACK = True          # With "pymupdf", PDFs without a text layer go to Document AI if it is configured
+PYMUPDF_HEADING_SIZE_RATIO = 1.08   # Blocks set this much larger than the body text are headings
+PYMUPDF_HEADING_MAX_CHARS = 120     # Longer blocks are never headings
+PYMUPDF_MARGIN_RATIO = 0.05         # Blocks within this fraction of the page top/bottom are headers/footers
+PYMUPDF_DETECT_TABLES = False       # Skip table text like the Document AI path does; costs ~0.7s per page
+
 # --- Google Document AI Settings ---
 GOOGLE_PROJECT_ID = os.getenv("GOOGLE_PROJECT_ID", "")
 GOOGLE_LOCATION = os.getenv("GOOGLE_LOCATION", "us")
 # Using the more specific variable name for the parser
 GOOGLE_PROCESSOR_ID = os.getenv("GOOGLE_PARSER_PROCESSOR_ID", "")
+GOOGLE_PROCESSOR_VERSION = os.getenv("GOOGLE_PARSER_PROCESSOR_VERSION", "")  # Empty uses the processor's default version
+
+DOCUMENT_AI_MAX_PAGES_PER_REQUEST = 15   # Online processing page limit; longer PDFs are split into page ranges
+DOCUMENT_AI_CONCURRENT_REQUESTS = 4      # Page ranges of one PDF processed in parallel
+
+# --- Document AI Response Cache ---
+# Raw responses keyed by PDF SHA-256 + processor id/version, so re-chunking and
+# re-ingestion run locally. Manage with scripts/documentai_cache.py.
+DOCUMENT_AI_CACHE_ENABLED = True
+DOCUMENT_AI_CACHE_DIR = DATA_DIR / "documentai_cache"
+DOCUMENT_AI_CACHE_MAX_BYTES = 2 * 1024 ** 3   # Least recently used responses are evicted above this
+DOCUMENT_AI_CACHE_ZSTD_LEVEL = 3
 
 # --- Chat & RAG Settings ---
 MAX_MESSAGES_PER_SESSION = 10
@@ -53,8 +156,56 @@ CONTEXT_HISTORY_MESSAGES = 6
 MAX_CHUNKS_RETRIEVED = 3
 LARGE_DOCUMENT_THRESHOLD = 12000
 
+# --- FAQ (question-to-question) Matching ---
+FAQ_MATCH_ENABLED = True
+FAQ_MATCH_CANDIDATES = 10        # Generated-question hits considered per query
+FAQ_MATCH_MAX_DISTANCE = 0.12    # Cosine distance under which a question match is trusted on its own
+
+# --- Hierarchical Retrieval ---
+HIERARCHICAL_RETRIEVAL_ENABLED = True
+HIERARCHICAL_TOP_DOCUMENTS = 3      # Documents kept by the first stage
+HIERARCHICAL_TOP_SECTIONS = 5       # Sections whose chunks are ranked in the second stage
+SECTION_EXPANSION_ENABLED = False   # Replace sibling hits with their whole parent section
+SECTION_EXPANSION_MIN_HITS = 2      # Sibling chunks that must hit before a section is expanded
+SECTION_EXPANSION_MAX_CHARS = 4000  # Sections longer than this are never expanded
+
+# --- Language-Partitioned Retrieval ---
+# Chunks carry their language; questions search their own language first and fall back to
+# all languages only when too few same-language hits reach the similarity floor.
+LANGUAGE_PARTITIONED_SEARCH = True
+LANGUAGE_FALLBACK_MIN_SIMILARITY = 0.5   # Cosine similarity (1 - distance)
+
+# --- Context Compaction ---
+# A wider candidate pool is retrieved; passages are picked by maximal marginal relevance,
+# trimmed to the sentences that overlap the question and packed into a token budget.
+CONTEXT_COMPACTION_ENABLED = True
+CONTEXT_CANDIDATES = 8          # Retrieved chunks considered for the prompt (instead of MAX_CHUNKS_RETRIEVED)
+CONTEXT_MAX_PASSAGES = 5        # Numbered passages at most in the prompt
+CONTEXT_TOKEN_BUDGET = 600      # Estimated tokens of numbered context; about the old 3 chunks x CHUNK_SIZE chars
+CONTEXT_MMR_LAMBDA = 0.5        # 1.0 ranks by relevance only, lower values favour diverse passages
+CONTEXT_REDUNDANCY_CUTOFF = 0.95  # Passages this similar to an already selected one are dropped
+CONTEXT_SENTENCE_WINDOW = 1     # Neighbouring sentences kept around each sentence that matches the question
+CONTEXT_CHARS_PER_TOKEN = 4     # Token estimate used for the budget
+
+# --- Reranking Settings ---
+RERANK_ENABLED = False
+RERANK_MODEL = "/root/local_models/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 20          # Vector hits scored by the cross-encoder before keeping MAX_CHUNKS_RETRIEVED
+RERANK_BATCH_SIZE = 32
+RERANK_CACHE_SIZE = 5000        # Cached (query, chunk) scores
+RERANK_LATENCY_BUDGET_MS = 300  # Reranking is skipped while the average latency is above this
+RERANK_MAX_CONCURRENT = 2       # Reranking is skipped when this many reranks are already running
+RERANK_PROBE_INTERVAL = 10      # While over budget, every Nth request still reranks to re-measure latency
+
+# --- Semantic Answer Cache Settings ---
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.93  # Cosine similarity for two questions to share an answer
+ANSWER_CACHE_MAX_ENTRIES = 512
+ANSWER_CACHE_TTL_SECONDS = 24 * 60 * 60
+
 # --- Database Settings ---
 DATABASE_URL = str(DATA_DIR / "users.db")
+MANIFEST_DB_PATH = str(DATA_DIR / "manifest.db")
 
 # --- Admin Authentication ---
 # For session validation and password hashing
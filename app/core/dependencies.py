@@ -1,12 +1,18 @@
 from fastapi import HTTPException, Depends
 from typing import Optional
 from app.services.rag_service import RAGService
+from app.services.collection_rebuild import CollectionRebuilder
+from app.services.ingestion_jobs import IngestionJobStore, IngestionWorkerPool
+from app.services.document_text import DocumentTextExtractor
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Global RAG service instance
 _rag_service: Optional[RAGService] = None
+_collection_rebuilder: Optional[CollectionRebuilder] = None
+_ingestion_workers: Optional[IngestionWorkerPool] = None
+_text_extractor: Optional[DocumentTextExtractor] = None
 
 def get_rag_service() -> RAGService:
     """
@@ -28,6 +34,56 @@ def get_rag_service() -> RAGService:
     
     return _rag_service
 
+def get_collection_rebuilder(service: RAGService = Depends(get_rag_service)) -> CollectionRebuilder:
+    """
+    Dependency to get the single blue/green rebuilder, so only one rebuild runs at a time
+    """
+    global _collection_rebuilder
+
+    if _collection_rebuilder is None:
+        _collection_rebuilder = CollectionRebuilder(service)
+    return _collection_rebuilder
+
+def get_ingestion_workers(service: RAGService = Depends(get_rag_service)) -> IngestionWorkerPool:
+    """
+    Dependency to get the background ingestion workers, started on first use
+    """
+    global _ingestion_workers
+
+    if _ingestion_workers is None:
+        _ingestion_workers = IngestionWorkerPool(service)
+        _ingestion_workers.start()
+    return _ingestion_workers
+
+def get_text_extractor() -> DocumentTextExtractor:
+    """
+    Dependency to get the shared text extractor for chat uploads, whose process pool starts on first use
+    """
+    global _text_extractor
+
+    if _text_extractor is None:
+        _text_extractor = DocumentTextExtractor()
+    return _text_extractor
+
+def shutdown_text_extractor():
+    """
+    Stops the extraction processes when the server shuts down
+    """
+    if _text_extractor is not None:
+        _text_extractor.shutdown()
+
+def resume_ingestion_jobs():
+    """
+    Starts the ingestion workers at startup when jobs were left queued or running,
+    so a restart does not wait for the next upload to pick them up
+    """
+    try:
+        if IngestionJobStore().has_pending():
+            logger.info("Resuming pending ingestion jobs...")
+            get_ingestion_workers(get_rag_service())
+    except Exception as e:
+        logger.error(f"Failed to resume ingestion jobs: {str(e)}")
+
 def validate_session_id(session_id: str) -> str:
     """
     Validate and sanitize session ID
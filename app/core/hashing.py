@@ -0,0 +1,17 @@
+# Path: app/core/hashing.py
+
+import hashlib
+
+HASH_READ_BLOCK_SIZE = 1024 * 1024  # 1 MiB
+
+def sha256_file(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def sha256_text(text: str) -> str:
+    """Returns the SHA-256 hex digest of a UTF-8 string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
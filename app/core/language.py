@@ -0,0 +1,23 @@
+# Path: app/core/language.py
+
+import re
+
+# Frequent function words that rarely occur in the other language
+SPANISH_MARKERS = {
+    "de", "la", "el", "los", "las", "del", "en", "que", "por", "para", "con", "una", "su", "sus",
+    "es", "se", "al", "lo", "como", "más", "pero", "o", "y", "usted", "este", "esta", "si", "también",
+}
+ENGLISH_MARKERS = {
+    "the", "of", "and", "to", "in", "is", "for", "you", "your", "that", "with", "on", "are", "be",
+    "this", "by", "or", "if", "an", "as", "must", "may", "not", "from", "have", "will", "at", "it",
+}
+
+def detect_text_language(text: str) -> str:
+    """
+    Cheap 'english'/'spanish' classification of document text by counting function
+    words. Used at ingestion, where an LLM call per chunk would be too expensive.
+    """
+    words = re.findall(r"[a-záéíóúñü]+", text.lower())
+    spanish = sum(word in SPANISH_MARKERS for word in words)
+    english = sum(word in ENGLISH_MARKERS for word in words)
+    return "spanish" if spanish > english else "english"
@@ -238,6 +238,48 @@ PREGUNTAS POCO COMUNES:
 5. [pregunta]
 """
 
+BATCH_QUESTION_GENERATION_PROMPT_EN = """
+You are an immigration law content analyst. Below are several numbered passages. For EACH passage, generate exactly 5 questions a user might ask that the passage answers, to improve semantic search in a RAG system.
+- Only generate questions that are answerable from that passage.
+- Do not add explanations, just the questions.
+---
+{passages}
+---
+Format your response as one block per passage, in order:
+
+PASSAGE 1:
+1. [question]
+2. [question]
+3. [question]
+4. [question]
+5. [question]
+
+PASSAGE 2:
+1. [question]
+...
+"""
+
+BATCH_QUESTION_GENERATION_PROMPT_ES = """
+Eres un analista de contenido de derecho migratorio. A continuación hay varios pasajes numerados. Para CADA pasaje, genera exactamente 5 preguntas que un usuario podría hacer y que el pasaje responde, para mejorar la búsqueda semántica en un sistema RAG.
+- Solo genera preguntas que se puedan responder con ese pasaje.
+- No agregues explicaciones, solo las preguntas.
+---
+{passages}
+---
+Formato de salida, un bloque por pasaje y en orden:
+
+PASAJE 1:
+1. [pregunta]
+2. [pregunta]
+3. [pregunta]
+4. [pregunta]
+5. [pregunta]
+
+PASAJE 2:
+1. [pregunta]
+...
+"""
+
 LANGUAGE_DETECTION_PROMPT = """You are a language detection expert. Your task is to analyze the following text and determine whether it is written in English or Spanish.
 
 Only respond with a single word: either "english" or "spanish". Do not include any explanation or extra characters.
@@ -262,6 +304,10 @@ def get_question_generation_prompt(language: str) -> str:
     """Get question generation prompt based on language."""
     return QUESTION_GENERATION_PROMPT_ES if language == "spanish" else QUESTION_GENERATION_PROMPT_EN
 
+def get_batch_question_generation_prompt(language: str) -> str:
+    """Get the several-passages-per-call question generation prompt based on language."""
+    return BATCH_QUESTION_GENERATION_PROMPT_ES if language == "spanish" else BATCH_QUESTION_GENERATION_PROMPT_EN
+
 def get_query_intent_prompt(language: str) -> str:
     """Get query intent prompt based on language."""
     return QUERY_INTENT_PROMPT_ES if language == "spanish" else QUERY_INTENT_PROMPT_EN
\ No newline at end of file
@@ -0,0 +1,89 @@
+# Path: app/core/uploads.py
+
+import os
+import uuid
+import shutil
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+from starlette.responses import JSONResponse
+
+from app.core.config import MAX_UPLOAD_BYTES, UPLOAD_READ_BLOCK_SIZE, UPLOAD_MULTIPART_OVERHEAD, UPLOAD_PATHS
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"The file exceeds the maximum upload size of {max_bytes / (1024 * 1024):g} MiB.")
+        self.max_bytes = max_bytes
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Answers 413 for upload requests whose Content-Length is already over the limit.
+    FastAPI parses (and spools) the whole multipart form before an endpoint or its
+    dependencies run, so the check in save_upload alone comes too late. Requests without
+    a Content-Length (chunked) are still caught by save_upload while it streams.
+    """
+    def __init__(self, app, paths=UPLOAD_PATHS, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            headers = dict(scope["headers"])
+            length = headers.get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.max_bytes + UPLOAD_MULTIPART_OVERHEAD:
+                response = JSONResponse({"detail": str(UploadTooLarge(self.max_bytes))}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    size: int
+    content_hash: str  # SHA-256 hex digest, same as app.core.hashing.sha256_file
+
+
+async def save_upload(file: UploadFile, directory: Optional[str] = None, max_bytes: int = MAX_UPLOAD_BYTES) -> SavedUpload:
+    """
+    Streams an upload to a temporary file in `directory` (the system temp dir by default)
+    in fixed-size blocks, hashing it on the way, so the upload is never held in memory
+    whole. Raises UploadTooLarge as soon as it goes over `max_bytes`, or before reading
+    when the declared size already does. The caller moves or deletes the file.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    digest, size = hashlib.sha256(), 0
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while block := await file.read(UPLOAD_READ_BLOCK_SIZE):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(block)
+                buffer.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SavedUpload(path=path, size=size, content_hash=digest.hexdigest())
+
+
+def publish_upload(path: Path, destination: Path):
+    """
+    Atomically makes `destination` a copy of `path`, without touching `path` itself.
+    A hard link is used where the file system allows it, so nothing is copied.
+    """
+    tmp_path = destination.with_name(f"{destination.name}.{uuid.uuid4().hex}.part")
+    try:
+        os.link(path, tmp_path)
+    except OSError:
+        shutil.copyfile(path, tmp_path)
+    os.replace(tmp_path, destination)
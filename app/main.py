@@ -10,6 +10,8 @@ import logging
 from app.api import chat, documents, auth, users
 from app.core.config import API_TITLE, API_VERSION, DESRIPTION, SECRET_KEY
 from app.core.auth import get_current_admin, get_session_user, get_session_admin
+from app.core.dependencies import resume_ingestion_jobs, shutdown_text_extractor
+from app.core.uploads import UploadSizeLimitMiddleware
 
 # Configure basic logging for the application
 logging.basicConfig(
@@ -26,6 +28,9 @@ app = FastAPI(
     description=DESRIPTION
 )
 
+# Refuse oversized uploads from their Content-Length, before the form is read
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Add session middleware BEFORE CORS middleware
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY, max_age=8*60*60)  # 8 hours
 
@@ -38,6 +43,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def resume_pending_ingestion():
+    """Picks up ingestion jobs that were queued or running when the server stopped."""
+    resume_ingestion_jobs()
+
+@app.on_event("shutdown")
+async def stop_text_extraction():
+    """Stops the worker processes that extract the text of chat uploads."""
+    shutdown_text_extractor()
+
 # Include the API endpoint routers
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
 app.include_router(documents.router, prefix="/api", tags=["Documents"])
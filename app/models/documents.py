@@ -6,4 +6,21 @@ class DocumentUpload(BaseModel):
     filename: str
     status: str
     message: Optional[str] = None
-    timestamp: datetime
\ No newline at end of file
+    job_id: Optional[str] = None
+    timestamp: datetime
+
+class IngestionJob(BaseModel):
+    job_id: str
+    document_name: str
+    status: str
+    stage: str
+    chunks_done: int
+    chunks_total: int
+    eta_seconds: Optional[float] = None
+    attempts: int
+    cancel_requested: bool
+    error: Optional[str] = None
+    submitted_by: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
\ No newline at end of file
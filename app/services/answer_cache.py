@@ -0,0 +1,133 @@
+# Path: app/services/answer_cache.py
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.config import (
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY_THRESHOLD
+)
+import numpy as np
+import threading
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Words that make a follow-up question depend on the previous turns ("what about that one?").
+FOLLOW_UP_PATTERN = re.compile(
+    r'\b(it|its|that|this|those|these|they|them|he|she|above|previous|same|'
+    r'eso|esto|ese|esa|esos|esas|este|esta|anterior|mismo|misma|ello)\b',
+    re.IGNORECASE
+)
+MIN_STANDALONE_QUESTION_WORDS = 4
+
+def is_history_dependent(question: str, chat_history: Optional[List[Dict]]) -> bool:
+    """
+    True when the question likely relies on earlier turns to be understood, in which
+    case a cached answer to a similar-looking question may not apply.
+    """
+    if not chat_history:
+        return False
+    if len(question.split()) < MIN_STANDALONE_QUESTION_WORDS:
+        return True
+    return bool(FOLLOW_UP_PATTERN.search(question))
+
+
+@dataclass
+class CachedAnswer:
+    embedding: np.ndarray
+    language: str
+    forms: Tuple[str, ...]
+    response: str
+    sources: List[Dict[str, Any]]
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SemanticAnswerCache:
+    """
+    Caches final knowledge-base answers keyed by the query embedding, language and the
+    form numbers the question names. A lookup hits when a cached question names exactly
+    the same forms and is within the cosine-similarity threshold: "fee for G-845" and
+    "fee for G-884" embed almost identically but must not share an answer.
+    Entries are evicted LRU and by TTL, and the whole cache is dropped as soon as
+    the vector store reports a new collection version.
+    """
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_key = 0
+        self._collection_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def lookup(self, embedding: List[float], language: str, forms: Sequence[str], collection_version: str) -> Optional[Dict[str, Any]]:
+        """Returns a cached result for a semantically equivalent question about the same forms, or None."""
+        query = self._normalize(embedding)
+        forms = tuple(sorted(forms))
+        with self._lock:
+            self._check_version(collection_version)
+            self._evict_expired()
+
+            best_key, best_similarity = None, -1.0
+            for key, entry in self._entries.items():
+                if entry.language != language or entry.forms != forms:
+                    continue
+                similarity = float(np.dot(query, entry.embedding))
+                if similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None or best_similarity < self.similarity_threshold:
+                return None
+
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            logger.info(f"--- SemanticAnswerCache: Hit with similarity {best_similarity:.3f}. ---")
+            return {"response": entry.response, "sources": list(entry.sources), "language": entry.language}
+
+    def store(self, embedding: List[float], language: str, forms: Sequence[str], collection_version: str, result: Dict[str, Any]):
+        """Caches a final answer together with its sources."""
+        with self._lock:
+            self._check_version(collection_version)
+            self._entries[self._next_key] = CachedAnswer(
+                embedding=self._normalize(embedding),
+                language=language,
+                forms=tuple(sorted(forms)),
+                response=result["response"],
+                sources=list(result.get("sources", []))
+            )
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, collection_version: str):
+        """Drops every entry when documents were ingested or deleted since they were cached."""
+        if collection_version != self._collection_version:
+            if self._entries:
+                logger.info(f"--- SemanticAnswerCache: Collection version changed to {collection_version}. Invalidating {len(self._entries)} answers. ---")
+            self._entries.clear()
+            self._collection_version = collection_version
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry.created_at < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
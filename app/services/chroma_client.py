@@ -0,0 +1,80 @@
+# Path: app/services/chroma_client.py
+
+import logging
+from typing import Any
+
+import chromadb
+import httpx
+from chromadb.api.models.Collection import Collection
+from chromadb.errors import InternalError, RateLimitError
+from tenacity import Retrying, before_sleep_log, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from app.core.config import (
+    CHROMA_PERSIST_DIR, CHROMA_MODE, CHROMA_SERVER_HOST, CHROMA_SERVER_PORT, CHROMA_SERVER_SSL,
+    CHROMA_SERVER_AUTH_TOKEN, CHROMA_REQUEST_RETRIES, CHROMA_RETRY_MAX_WAIT_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Connection problems, timeouts, server errors and rate limiting are worth retrying.
+    The client re-raises some transport errors as ValueError, so the cause chain is checked too.
+    """
+    while error is not None:
+        if isinstance(error, (httpx.TransportError, InternalError, RateLimitError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RetryingProxy:
+    """
+    Forwards attribute access to a Chroma client or collection and retries method calls
+    that fail with a transient error. Every call the vector store makes (get, query, upsert,
+    delete, count, get_or_create_collection) is idempotent, so retrying is safe.
+    Collections returned by the client are wrapped as well.
+    """
+    def __init__(self, target: Any, retrying: Retrying):
+        self._target = target
+        self._retrying = retrying
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = self._retrying(attribute, *args, **kwargs)
+            return RetryingProxy(result, self._retrying) if isinstance(result, Collection) else result
+        return call
+
+
+def create_chroma_client(persist_dir: str = CHROMA_PERSIST_DIR, mode: str = CHROMA_MODE):
+    """
+    Opens the vector store client. In "http" mode all workers share one Chroma server;
+    the HTTP client keeps a pooled keep-alive session per host and process.
+    """
+    if mode == "local":
+        return chromadb.PersistentClient(path=persist_dir)
+    if mode != "http":
+        raise ValueError(f"Unknown CHROMA_MODE '{mode}'. Use 'local' or 'http'.")
+
+    headers = {"Authorization": f"Bearer {CHROMA_SERVER_AUTH_TOKEN}"} if CHROMA_SERVER_AUTH_TOKEN else None
+    retrying = Retrying(
+        retry=retry_if_exception(is_transient_error),
+        stop=stop_after_attempt(CHROMA_REQUEST_RETRIES),
+        wait=wait_exponential_jitter(initial=0.25, max=CHROMA_RETRY_MAX_WAIT_SECONDS),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
+    # The constructor already contacts the server, so it is retried too (e.g. while the server starts)
+    client = retrying(
+        chromadb.HttpClient,
+        host=CHROMA_SERVER_HOST,
+        port=CHROMA_SERVER_PORT,
+        ssl=CHROMA_SERVER_SSL,
+        headers=headers
+    )
+    logger.info(f"--- ChromaClient: Connected to Chroma server at {CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}. ---")
+    return RetryingProxy(client, retrying)
@@ -0,0 +1,132 @@
+# Path: app/services/chunk_store.py
+
+import sqlite3
+import logging
+from typing import Dict, Iterable, List
+
+import zstandard
+
+from app.core.config import CHUNK_CONTENT_DB_PATH, CHUNK_CONTENT_ZSTD_LEVEL
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+SQLITE_MAX_VARIABLES = 900
+
+def enrich_content(original_content: str, questions: List[str]) -> str:
+    """Builds the text that is embedded for a chunk: its content plus its generated questions."""
+    if not questions:
+        return original_content
+    return f"{original_content}\n\nRelated questions: {' '.join(questions)}"
+
+
+class ChunkContentStore:
+    """
+    Side store for chunk text. Each chunk's original content and generated questions
+    are kept once, zstd-compressed and keyed by chunk id, so the vector store only
+    holds embeddings and small metadata fields and text is read for the final hits only.
+    """
+    def __init__(self, db_path: str = CHUNK_CONTENT_DB_PATH):
+        self.db_path = db_path
+        self._compressor = zstandard.ZstdCompressor(level=CHUNK_CONTENT_ZSTD_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._conn = None
+        self._connect()
+        self._create_table_if_not_exists()
+
+    def _connect(self):
+        """Establish a connection to the SQLite database."""
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            logger.info(f"--- ChunkContentStore: Successfully connected to database at {self.db_path} ---")
+        except sqlite3.Error as e:
+            logger.critical(f"--- ChunkContentStore: Database connection failed: {e} ---", exc_info=True)
+            raise
+
+    def _create_table_if_not_exists(self):
+        try:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_content (
+                    chunk_id TEXT PRIMARY KEY,
+                    content BLOB NOT NULL,
+                    questions BLOB NOT NULL
+                )
+            """)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- ChunkContentStore: Failed to create or verify chunk_content table: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def put_many(self, records: Dict[str, Dict]):
+        """Stores {chunk_id: {"original_content": str, "questions": [str]}} records, replacing existing ones."""
+        if not records:
+            return
+        try:
+            rows = [
+                (
+                    chunk_id,
+                    self._compressor.compress(record["original_content"].encode("utf-8")),
+                    self._compressor.compress("|".join(record.get("questions", [])).encode("utf-8"))
+                )
+                for chunk_id, record in records.items()
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_content (chunk_id, content, questions) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- ChunkContentStore: Failed to store {len(records)} chunks: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Returns {chunk_id: {"original_content", "questions"}} for the ids that are stored."""
+        found = {}
+        chunk_ids = list(chunk_ids)
+        for start in range(0, len(chunk_ids), SQLITE_MAX_VARIABLES):
+            batch = chunk_ids[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(batch))
+            cursor = self._conn.execute(
+                f"SELECT chunk_id, content, questions FROM chunk_content WHERE chunk_id IN ({placeholders})", batch
+            )
+            for chunk_id, content, questions in cursor.fetchall():
+                questions_text = self._decompressor.decompress(questions).decode("utf-8")
+                found[chunk_id] = {
+                    "original_content": self._decompressor.decompress(content).decode("utf-8"),
+                    "questions": [q for q in questions_text.split("|") if q]
+                }
+        return found
+
+    def delete_many(self, chunk_ids: Iterable[str]):
+        chunk_ids = list(chunk_ids)
+        try:
+            for start in range(0, len(chunk_ids), SQLITE_MAX_VARIABLES):
+                batch = chunk_ids[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM chunk_content WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- ChunkContentStore: Failed to delete chunks: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def close(self):
+        """Closes the database connection, e.g. when the service moves to another index generation."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def clear(self):
+        self._conn.execute("DELETE FROM chunk_content")
+        self._conn.commit()
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM chunk_content").fetchone()[0]
+
+    def stored_bytes(self) -> int:
+        """Total compressed payload size, excluding SQLite page overhead."""
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(content) + LENGTH(questions)), 0) FROM chunk_content"
+        ).fetchone()
+        return row[0]
@@ -0,0 +1,122 @@
+# Path: app/services/collection_alias.py
+
+import json
+import os
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import (
+    COLLECTION_NAME, QUESTIONS_COLLECTION_NAME, SECTIONS_COLLECTION_NAME,
+    MANIFEST_DB_PATH, CHUNK_CONTENT_DB_PATH, COLLECTION_ALIAS_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+# The generation that uses the original, unversioned collection names and databases
+BASE_GENERATION = ""
+
+def generation_suffix(generation: str) -> str:
+    return f"__{generation}" if generation else ""
+
+def collection_names(generation: str) -> Dict[str, str]:
+    """Chroma collection names that make up one generation of the index."""
+    suffix = generation_suffix(generation)
+    return {
+        "chunks": f"{COLLECTION_NAME}{suffix}",
+        "questions": f"{QUESTIONS_COLLECTION_NAME}{suffix}",
+        "sections": f"{SECTIONS_COLLECTION_NAME}{suffix}",
+    }
+
+def generation_db_path(base_path: str, generation: str) -> str:
+    """Per-generation SQLite path, e.g. data/manifest__g3.db."""
+    if not generation:
+        return base_path
+    path = Path(base_path)
+    return str(path.with_name(f"{path.stem}{generation_suffix(generation)}{path.suffix}"))
+
+def manifest_db_path(generation: str) -> str:
+    return generation_db_path(MANIFEST_DB_PATH, generation)
+
+def content_db_path(generation: str) -> str:
+    return generation_db_path(CHUNK_CONTENT_DB_PATH, generation)
+
+
+class CollectionAliasStore:
+    """
+    Persists which index generation serves reads. The alias file is replaced with
+    an atomic rename, so readers always see either the old or the new generation.
+    Previous generations are remembered for rollback until garbage-collected.
+    """
+    def __init__(self, path: str = COLLECTION_ALIAS_PATH):
+        self.path = path
+
+    def read(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"active": BASE_GENERATION, "previous": [], "generations": {}}
+
+    def get_active(self) -> str:
+        return self.read().get("active", BASE_GENERATION)
+
+    def mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return 0.0
+
+    def next_generation(self) -> str:
+        """Returns a new, unused generation name (g1, g2, ...)."""
+        state = self.read()
+        numbers = [int(g[1:]) for g in state.get("generations", {}) if g.startswith("g") and g[1:].isdigit()]
+        return f"g{max(numbers, default=0) + 1}"
+
+    def register(self, generation: str, status: str, **details):
+        """Records a generation's build status without changing the active alias."""
+        state = self.read()
+        entry = state.setdefault("generations", {}).setdefault(generation, {"created_at": datetime.now().isoformat()})
+        entry.update({"status": status, **details})
+        self._write(state)
+
+    def swap(self, generation: str) -> str:
+        """Points reads at `generation`. Returns the generation that was active before."""
+        state = self.read()
+        previous = state.get("active", BASE_GENERATION)
+        if previous == generation:
+            return previous
+        state["active"] = generation
+        state["previous"] = [previous] + [g for g in state.get("previous", []) if g not in (previous, generation)]
+        generations = state.setdefault("generations", {})
+        generations.setdefault(generation, {}).update({"status": "active", "activated_at": datetime.now().isoformat()})
+        if previous in generations:
+            generations[previous]["status"] = "standby"
+        self._write(state)
+        logger.info(f"--- CollectionAliasStore: Active generation switched from '{previous or 'base'}' to '{generation or 'base'}'. ---")
+        return previous
+
+    def rollback(self) -> Optional[str]:
+        """Re-activates the most recent previous generation, if any."""
+        state = self.read()
+        if not state.get("previous"):
+            return None
+        target = state["previous"][0]
+        self.swap(target)
+        return target
+
+    def forget(self, generations: List[str]):
+        state = self.read()
+        state["previous"] = [g for g in state.get("previous", []) if g not in generations]
+        for generation in generations:
+            state.get("generations", {}).pop(generation, None)
+        self._write(state)
+
+    def _write(self, state: Dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
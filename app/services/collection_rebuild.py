@@ -0,0 +1,145 @@
+# Path: app/services/collection_rebuild.py
+
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import RAW_DATA_DIR, REBUILD_GENERATIONS_KEPT, REBUILD_SMOKE_QUERIES
+from app.core.hashing import sha256_file
+from app.services.vectorstore import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+
+class RebuildValidationError(Exception):
+    """Raised when a freshly built generation fails validation and is not activated."""
+
+
+class CollectionRebuilder:
+    """
+    Blue/green rebuilds of the knowledge base. A new generation of collections is built
+    from the raw documents while the active one keeps serving, then validated and
+    activated by atomically swapping the alias. The old generation is kept for rollback
+    until it is garbage-collected.
+    """
+    def __init__(self, rag_service, raw_data_dir: Path = RAW_DATA_DIR):
+        self.rag_service = rag_service
+        self.raw_data_dir = Path(raw_data_dir)
+        self._lock = threading.Lock()
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._building: Optional[str] = None
+
+    @property
+    def live_store(self) -> VectorStoreService:
+        return self.rag_service.vector_store
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    def rebuild(self, activate: bool = True) -> Dict[str, Any]:
+        """Builds, validates and (optionally) activates a new generation. Returns a report."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A rebuild is already running.")
+        alias_store = self.live_store.alias_store
+        generation = self._building = alias_store.next_generation()
+        report = {"generation": generation, "started_at": datetime.now().isoformat(), "failed_documents": []}
+        try:
+            alias_store.register(generation, "building")
+            target = VectorStoreService(generation=generation)
+            logger.info(f"--- CollectionRebuilder: Building generation '{generation}' from {self.raw_data_dir}. ---")
+
+            # 1. Full build from the raw documents, while the active generation keeps serving
+            hashes = self._ingest_all(target, report)
+
+            # 2. Catch up with uploads and deletions that happened during the build
+            self._catch_up(target, hashes, report)
+
+            # 3. Only a consistent, queryable generation is activated
+            report["validation"] = self.validate(target)
+            alias_store.register(generation, "ready", documents=report["validation"]["documents"], chunks=report["validation"]["chunks"])
+            if activate:
+                report["previous_generation"] = self.live_store.activate_generation(generation)
+            report["status"] = "active" if activate else "ready"
+            logger.info(f"--- CollectionRebuilder: Generation '{generation}' is {report['status']}. ---")
+            return report
+        except Exception as e:
+            logger.error(f"--- CollectionRebuilder: Rebuild of generation '{generation}' failed: {e} ---", exc_info=True)
+            alias_store.register(generation, "failed", error=str(e))
+            report.update({"status": "failed", "error": str(e)})
+            raise
+        finally:
+            report["finished_at"] = datetime.now().isoformat()
+            self.last_report = report
+            self._building = None
+            self._lock.release()
+
+    def _ingest_all(self, target: VectorStoreService, report: Dict[str, Any]) -> Dict[str, str]:
+        hashes = {}
+        for file_path in sorted(self.raw_data_dir.glob("*.pdf")):
+            hashes[file_path.name] = sha256_file(str(file_path))
+            if not self.rag_service.process_document(str(file_path), vector_store=target):
+                report["failed_documents"].append(file_path.name)
+        if report["failed_documents"]:
+            raise RebuildValidationError(f"Failed to ingest: {', '.join(report['failed_documents'])}")
+        return hashes
+
+    def _catch_up(self, target: VectorStoreService, hashes: Dict[str, str], report: Dict[str, Any]):
+        current = {p.name: p for p in self.raw_data_dir.glob("*.pdf")}
+        changed = [p for name, p in current.items() if hashes.get(name) != sha256_file(str(p))]
+        removed = [name for name in hashes if name not in current]
+        for file_path in changed:
+            if not self.rag_service.process_document(str(file_path), vector_store=target):
+                raise RebuildValidationError(f"Failed to ingest '{file_path.name}' during catch-up.")
+        for document_name in removed:
+            target.delete_document(document_name)
+        report["caught_up"] = {"changed": [p.name for p in changed], "removed": removed}
+
+    def validate(self, target: VectorStoreService) -> Dict[str, Any]:
+        """Checks chunk counts against the manifest and runs smoke queries against `target`."""
+        documents = target.manifest.list_documents()
+        # A near-duplicate chunk shared by several documents is listed by each of them but stored once
+        expected = len(set().union(*(target.manifest.get_chunk_ids(d["document_name"]) for d in documents)))
+        stored = target.get_collection_count()
+        if not documents:
+            raise RebuildValidationError("The new generation contains no documents.")
+        if stored != expected:
+            raise RebuildValidationError(f"Collection has {stored} chunks but the manifest records {expected}.")
+        empty = [d["document_name"] for d in documents if d["chunk_count"] == 0]
+        if empty:
+            raise RebuildValidationError(f"Documents without chunks: {', '.join(empty)}")
+
+        embeddings = self.rag_service.embedding_service.generate_embeddings(REBUILD_SMOKE_QUERIES)
+        for query, results in zip(REBUILD_SMOKE_QUERIES, target.search_many(embeddings, n_results=1)):
+            if not results:
+                raise RebuildValidationError(f"Smoke query returned no results: '{query}'")
+        return {"documents": len(documents), "chunks": stored, "smoke_queries": len(REBUILD_SMOKE_QUERIES)}
+
+    def rollback(self) -> Optional[str]:
+        """Re-activates the previously active generation. Returns it, or None if there is none."""
+        previous = self.live_store.alias_store.read().get("previous", [])
+        if not previous:
+            return None
+        target = previous[0]
+        self.live_store.activate_generation(target)
+        logger.info(f"--- CollectionRebuilder: Rolled back to generation '{target or 'base'}'. ---")
+        return target
+
+    def gc(self, keep: int = REBUILD_GENERATIONS_KEPT) -> List[str]:
+        """Drops generations that are neither active nor among the `keep` most recent previous ones."""
+        alias_store = self.live_store.alias_store
+        state = alias_store.read()
+        retained = {state.get("active", "")} | set(state.get("previous", [])[:keep])
+        if self._building:
+            retained.add(self._building)
+        known = set(state.get("generations", {})) | set(state.get("previous", []))
+        dropped = []
+        for generation in sorted(known - retained):
+            self.live_store.drop_generation(generation)
+            dropped.append(generation)
+        if dropped:
+            alias_store.forget(dropped)
+            logger.info(f"--- CollectionRebuilder: Garbage-collected generations: {', '.join(g or 'base' for g in dropped)}. ---")
+        return dropped
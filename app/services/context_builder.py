@@ -0,0 +1,169 @@
+# Path: app/services/context_builder.py
+
+import math
+import re
+import logging
+from typing import Dict, List, Set
+
+import numpy as np
+
+from app.core.config import (
+    CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_PASSAGES, CONTEXT_MMR_LAMBDA,
+    CONTEXT_SENTENCE_WINDOW, CONTEXT_CHARS_PER_TOKEN, CONTEXT_REDUNDANCY_CUTOFF
+)
+from app.core.language import SPANISH_MARKERS, ENGLISH_MARKERS
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = SPANISH_MARKERS | ENGLISH_MARKERS
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+|\n+")
+CITATION_OVERHEAD_TOKENS = 12  # "[n] " and the "Source: ..., page ..." line
+
+def passage_text(result: Dict) -> str:
+    """The chunk's own text, without the generated questions used for embedding."""
+    return result.get("metadata", {}).get("original_content") or result.get("content") or ""
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN)
+
+def content_terms(text: str) -> Set[str]:
+    """Lowercased content words, cut to 6 characters so 'eligible' matches 'eligibility'."""
+    return {word[:6] for word in re.findall(r"\w+", text.lower()) if len(word) > 2 and word not in STOPWORDS}
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def trim_to_query(text: str, query_terms: Set[str], window: int = CONTEXT_SENTENCE_WINDOW) -> str:
+    """
+    Keeps the sentences that share a content word with the question, plus `window`
+    neighbours on each side. A passage with no overlap at all (e.g. a Spanish question
+    against an English chunk) was retrieved for its meaning and is kept whole.
+    """
+    sentences = split_sentences(text)
+    matches = [i for i, sentence in enumerate(sentences) if content_terms(sentence) & query_terms]
+    if not matches:
+        return text
+    keep = sorted({j for i in matches for j in range(max(i - window, 0), min(i + window + 1, len(sentences)))})
+    parts, previous = [], None
+    for i in keep:
+        if previous is not None and i != previous + 1:
+            parts.append("…")
+        parts.append(sentences[i])
+        previous = i
+    return " ".join(parts)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text at the last sentence boundary that fits into `max_tokens`."""
+    max_chars = max_tokens * CONTEXT_CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    return (cut[:boundary + 1] if boundary > max_chars // 2 else cut).rstrip() + " …"
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row so that dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def mmr_order(relevance: np.ndarray, similarity: np.ndarray, mmr_lambda: float) -> List[int]:
+    """
+    Orders candidates by maximal marginal relevance: each pick maximizes
+    lambda * relevance - (1 - lambda) * max similarity to the passages already picked.
+    """
+    remaining = list(range(len(relevance)))
+    order: List[int] = []
+    while remaining:
+        if order:
+            redundancy = similarity[np.ix_(remaining, order)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        order.append(remaining.pop(int(np.argmax(scores))))
+    return order
+
+def format_context(passages: List[Dict]) -> str:
+    """Numbered context with the citation line the prompt templates expect."""
+    blocks = []
+    for i, result in enumerate(passages, 1):
+        metadata = result.get("metadata", {})
+        content = result.get("excerpt") or passage_text(result)
+        blocks.append(f"[{i}] {content}\nSource: {metadata.get('source', 'Unknown')}, page {metadata.get('page', 'N/A')}")
+    return "\n\n".join(blocks)
+
+
+class ContextBuilder:
+    """
+    Turns a wide pool of retrieved chunks into dense prompt context: picks passages by
+    maximal marginal relevance so near-identical chunks do not both make it in, trims
+    each to the sentences relevant to the question, and stops at the token budget.
+    """
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        max_passages: int = CONTEXT_MAX_PASSAGES,
+        mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+        sentence_window: int = CONTEXT_SENTENCE_WINDOW,
+        redundancy_cutoff: float = CONTEXT_REDUNDANCY_CUTOFF
+    ):
+        self.token_budget = token_budget
+        self.max_passages = max_passages
+        self.mmr_lambda = mmr_lambda
+        self.sentence_window = sentence_window
+        self.redundancy_cutoff = redundancy_cutoff
+
+    def build(self, question: str, query_embedding: List[float], results: List[Dict], embeddings: Dict[str, List[float]]) -> List[Dict]:
+        """
+        Returns the selected results in MMR order, each with an "excerpt" holding the
+        trimmed text for the prompt. `embeddings` maps result ids to their stored vectors.
+        """
+        if not results:
+            return []
+        relevance, similarity = self._scores(query_embedding, results, embeddings)
+        query_terms = content_terms(question)
+
+        selected, picked, used, full_tokens = [], [], 0, 0
+        for i in mmr_order(relevance, similarity, self.mmr_lambda):
+            if picked and similarity[i, picked].max() >= self.redundancy_cutoff:
+                continue  # Restates a passage already in the context
+            text = passage_text(results[i])
+            excerpt = trim_to_query(text, query_terms, self.sentence_window)
+            cost = estimate_tokens(excerpt) + CITATION_OVERHEAD_TOKENS
+            if used + cost > self.token_budget:
+                if selected:
+                    continue  # A shorter passage further down may still fit
+                excerpt = truncate_to_tokens(excerpt, self.token_budget - CITATION_OVERHEAD_TOKENS)
+                cost = estimate_tokens(excerpt) + CITATION_OVERHEAD_TOKENS
+            selected.append({**results[i], "excerpt": excerpt})
+            picked.append(i)
+            used += cost
+            full_tokens += estimate_tokens(text) + CITATION_OVERHEAD_TOKENS
+            if len(selected) >= self.max_passages:
+                break
+
+        logger.info(
+            f"--- ContextBuilder: Selected {len(selected)} of {len(results)} passages, "
+            f"~{used} context tokens (~{full_tokens} untrimmed). ---"
+        )
+        return selected
+
+    def _scores(self, query_embedding: List[float], results: List[Dict], embeddings: Dict[str, List[float]]):
+        """
+        Relevance of each result to the query and pairwise similarity between results.
+        The cross-encoder score is used as relevance when the results were reranked.
+        """
+        dim = len(query_embedding)
+        vectors = np.asarray([embeddings.get(result["id"]) or np.zeros(dim) for result in results], dtype=np.float32)
+        vectors = normalize_rows(vectors)
+        query = normalize_rows(np.asarray([query_embedding], dtype=np.float32))[0]
+
+        if all("rerank_score" in result for result in results):
+            relevance = 1.0 / (1.0 + np.exp(-np.asarray([result["rerank_score"] for result in results], dtype=np.float32)))
+        else:
+            relevance = vectors @ query
+            for i, result in enumerate(results):
+                if result["id"] not in embeddings and math.isfinite(result.get("distance", math.inf)):
+                    relevance[i] = 1.0 - result["distance"]
+        similarity = vectors @ vectors.T
+        return relevance, similarity
@@ -1,17 +1,23 @@
 # Path: app/services/data_loader.py
 
-from google.cloud import documentai_v1 as documentai
-from google.cloud.documentai_v1.types import Document
-from typing import List, Dict
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app.core.config import (
-    GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID,
-    MIN_SECTION_TEXT_LENGTH, DEFAULT_HEADER_TEXT, CHUNK_SIZE, CHUNK_OVERLAP,
-    DOCUMENT_AI_HEADER_TYPES, DOCUMENT_AI_FOOTER_TYPES, DOCUMENT_AI_TABLE_TYPES
+    LAYOUT_OCR_FALLBACK, MIN_SECTION_TEXT_LENGTH, DEFAULT_HEADER_TEXT, CHUNK_SIZE, CHUNK_OVERLAP,
+    DOCUMENT_AI_HEADER_TYPES, DOCUMENT_AI_FOOTER_TYPES, DOCUMENT_AI_TABLE_TYPES,
+    QUESTION_GENERATION_WORKERS, QUESTION_BATCHING_ENABLED, QUESTION_BATCH_SHORT_CHUNK_CHARS,
+    QUESTION_BATCH_MAX_CHUNKS, QUESTION_BATCH_MAX_CHARS
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.services.llm_client import OllamaClient
-from app.core.prompts import get_question_generation_prompt
+from app.services.layout_backends import (
+    LayoutBlock, DocumentAILayoutBackend, PyMuPDFLayoutBackend, create_layout_backend, document_ai_configured
+)
+from app.core.prompts import get_question_generation_prompt, get_batch_question_generation_prompt
+from app.core.hashing import sha256_text
+from app.core.language import detect_text_language
 import logging
+import threading
 import re
 import os
 
@@ -19,19 +25,18 @@ logger = logging.getLogger(__name__)
 
 class DocumentProcessor:
     """
-    Handles complex document processing using Google Document AI Layout Parser,
-    followed by intelligent chunking and question-based enrichment.
+    Handles complex document processing using a layout backend (Google Document AI
+    Layout Parser or local PyMuPDF heuristics), followed by intelligent chunking and
+    question-based enrichment.
     """
-    def __init__(self):
+    def __init__(self, layout_backend=None):
         logger.info("--- DocumentProcessor: Initializing... ---")
-        if not all([GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID]):
-            raise Exception("Google Document AI credentials not configured properly.")
+        self.layout_backend = layout_backend or create_layout_backend()
+        self._ocr_backend = None
+        self.llm_calls = 0  # Question-generation calls made so far, for throughput reports
+        self._llm_calls_lock = threading.Lock()
+        logger.info(f"--- DocumentProcessor: Using the '{self.layout_backend.name}' layout backend. ---")
 
-        self.project_id = GOOGLE_PROJECT_ID
-        self.location = GOOGLE_LOCATION
-        self.processor_id = GOOGLE_PROCESSOR_ID
-        
-        self.client = documentai.DocumentProcessorServiceClient()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=CHUNK_SIZE,
             chunk_overlap=CHUNK_OVERLAP,
@@ -47,46 +52,63 @@ class DocumentProcessor:
 
         logger.info("--- DocumentProcessor: Initialized successfully. ---")
 
-    def process_pdf(self, file_path: str) -> List[Dict[str, any]]:
-        """Processes a PDF using Document AI and extracts structured, enriched chunks."""
+    def process_pdf(self, file_path: str, generate_questions: bool = True) -> List[Dict[str, any]]:
+        """
+        Processes a PDF with the layout backend and extracts structured, enriched chunks.
+        With `generate_questions=False` the chunks come back without questions, so the
+        caller can run `generate_questions` only for the chunks it actually stores.
+        """
         logger.info(f"--- DocumentProcessor: Starting PDF processing for: {file_path} ---")
         document_name = os.path.basename(file_path)
         try:
-            name = self.client.processor_path(self.project_id, self.location, self.processor_id)
-            with open(file_path, "rb") as file:
-                file_content = file.read()
-
-            raw_document = documentai.RawDocument(content=file_content, mime_type="application/pdf")
-            request = documentai.ProcessRequest(name=name, raw_document=raw_document)
-            
-            result = self.client.process_document(request=request)
-            document_proto: Document = result.document
-
-            if not (hasattr(document_proto, 'document_layout') and document_proto.document_layout.blocks):
-                logger.warning(f"--- DocumentProcessor: No layout blocks found in Document AI response for {file_path}. ---")
+            chunks = list(self.iter_chunks(self.iter_blocks(file_path), document_name))
+            if not chunks:
+                logger.warning(f"--- DocumentProcessor: No chunks found for {file_path}. ---")
                 return []
-
-            chunks = self._extract_chunks_from_layout_parser(document_proto, document_name)
             logger.info(f"--- DocumentProcessor: Extracted {len(chunks)} chunks for {file_path}. ---")
+            if generate_questions:
+                self.generate_questions(chunks)
             return chunks
 
         except Exception as e:
             logger.error(f"--- DocumentProcessor: PDF processing failed for {file_path}: {e} ---", exc_info=True)
             raise
 
-    def _extract_chunks_from_layout_parser(self, document_proto: Document, document_name: str) -> List[Dict[str, any]]:
+    def iter_blocks(self, file_path: str) -> Iterator[LayoutBlock]:
+        """
+        Streams the layout backend's blocks. A PDF without a text layer (scanned) yields
+        no local blocks; it is sent to Document AI for OCR when that is configured.
+        """
+        blocks = iter(self.layout_backend.iter_blocks(file_path))
+        first = next(blocks, None)
+        if first is not None:
+            yield first
+            yield from blocks
+            return
+        if not isinstance(self.layout_backend, PyMuPDFLayoutBackend):
+            return
+        if not (LAYOUT_OCR_FALLBACK and document_ai_configured()):
+            logger.warning(f"--- DocumentProcessor: {file_path} has no text layer and Document AI is not configured for OCR. ---")
+            return
+        logger.info(f"--- DocumentProcessor: {file_path} has no text layer. Using Document AI for OCR. ---")
+        if self._ocr_backend is None:
+            self._ocr_backend = DocumentAILayoutBackend()
+        yield from self._ocr_backend.iter_blocks(file_path)
+
+    def _extract_chunks_from_layout_parser(self, blocks: Iterable[LayoutBlock], document_name: str) -> List[Dict[str, any]]:
         """Extracts and processes chunks based on the document's layout structure."""
-        all_chunks = []
-        doc_layout = document_proto.document_layout
+        return list(self.iter_chunks(blocks, document_name))
 
+    def iter_chunks(self, blocks: Iterable[LayoutBlock], document_name: str) -> Iterator[Dict[str, any]]:
+        """Yields the chunks of each section as soon as the next heading (or the end) closes it."""
         current_header_text = DEFAULT_HEADER_TEXT
         current_section_content_parts = []
         current_section_page_start = 1
 
-        for block in doc_layout.blocks:
-            page_start = block.page_span.page_start if block.page_span else 1
-            block_type = block.text_block.type
-            block_text = self._get_text_from_block(block)
+        for block in blocks:
+            page_start = block.page
+            block_type = block.type
+            block_text = block.text
 
             if not block_text:
                 continue
@@ -99,10 +121,9 @@ class DocumentProcessor:
                 if current_section_content_parts:
                     section_text = "\n".join(current_section_content_parts).strip()
                     if section_text:
-                        processed_chunks = self._process_section_into_chunks(
+                        yield from self._process_section_into_chunks(
                             current_header_text, section_text, current_section_page_start, document_name
                         )
-                        all_chunks.extend(processed_chunks)
                 
                 # Start a new section
                 current_header_text = block_text
@@ -118,15 +139,12 @@ class DocumentProcessor:
         if current_section_content_parts:
             section_text = "\n".join(current_section_content_parts).strip()
             if section_text:
-                processed_chunks = self._process_section_into_chunks(
+                yield from self._process_section_into_chunks(
                     current_header_text, section_text, current_section_page_start, document_name
                 )
-                all_chunks.extend(processed_chunks)
-
-        return all_chunks
 
     def _process_section_into_chunks(self, header: str, content: str, page: int, doc_name: str) -> List[Dict[str, any]]:
-        """Splits a large section into smaller chunks or keeps it whole, then enriches with questions."""
+        """Splits a large section into smaller chunks or keeps it whole. Questions are added later by `generate_questions`."""
         final_chunks = []
         if len(content) < MIN_SECTION_TEXT_LENGTH:
             return [] # Discard very short, likely irrelevant sections
@@ -136,29 +154,131 @@ class DocumentProcessor:
         else:
             split_texts = [content]
 
-        for text_part in split_texts:
-            questions = self._generate_questions_for_chunk(text_part)
+        # Sibling chunks share a section id so retrieval can work at the section level
+        section_id = f"{doc_name}_s{sha256_text(f'{header}|{page}|{content[:200]}')[:12]}"
+        for chunk_index, text_part in enumerate(split_texts):
             final_chunks.append({
                 "content": text_part,
                 "page": str(page),
                 "header": header,
                 "document_name": doc_name,
-                "questions": questions
+                "section_id": section_id,
+                "chunk_index": chunk_index,
+                "questions": []
             })
         return final_chunks
 
+    def generate_questions(
+        self, chunks: List[Dict[str, any]], progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Fills in the generated questions of each chunk. LLM calls run concurrently on
+        QUESTION_GENERATION_WORKERS threads; with batching enabled, short chunks of the same
+        language share one call. A failed call only leaves its own chunks without questions.
+        `progress(done, total)` is called as chunks complete.
+        """
+        if not chunks:
+            return chunks
+        texts = [chunk.get("original_content", chunk["content"]) for chunk in chunks]
+        jobs = self._plan_question_jobs(texts)
+        total, done = len(chunks), 0
+        logger.info(f"--- DocumentProcessor: Generating questions for {total} chunks in {len(jobs)} LLM calls. ---")
+
+        executor = ThreadPoolExecutor(max_workers=QUESTION_GENERATION_WORKERS, thread_name_prefix="questions")
+        try:
+            futures = {executor.submit(self._run_question_job, [texts[i] for i in job]): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"--- DocumentProcessor: Question generation failed for {len(job)} chunks: {e} ---", exc_info=True)
+                    results = [[] for _ in job]
+                for i, questions in zip(job, results):
+                    chunks[i]["questions"] = questions
+
+                previous, done = done, done + len(job)
+                if done == total or done // 25 > previous // 25:
+                    logger.info(f"--- DocumentProcessor: Questions generated for {done}/{total} chunks. ---")
+                if progress:
+                    progress(done, total)
+        finally:
+            # If `progress` raised (e.g. a cancelled ingestion job), queued calls are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
+        return chunks
+
+    def _plan_question_jobs(self, texts: List[str]) -> List[List[int]]:
+        """Groups chunk indexes into LLM calls: one per chunk, or same-language batches of short chunks."""
+        if not QUESTION_BATCHING_ENABLED:
+            return [[i] for i in range(len(texts))]
+
+        jobs, open_batches = [], {}
+        for i, text in enumerate(texts):
+            if len(text) >= QUESTION_BATCH_SHORT_CHUNK_CHARS or len(text.strip()) < 50:
+                jobs.append([i])
+                continue
+            language = detect_text_language(text)
+            batch = open_batches.get(language)
+            if batch and (len(batch["indexes"]) >= QUESTION_BATCH_MAX_CHUNKS or batch["chars"] + len(text) > QUESTION_BATCH_MAX_CHARS):
+                jobs.append(batch["indexes"])
+                batch = None
+            if batch is None:
+                batch = open_batches[language] = {"indexes": [], "chars": 0}
+            batch["indexes"].append(i)
+            batch["chars"] += len(text)
+        jobs.extend(batch["indexes"] for batch in open_batches.values())
+        return jobs
+
+    def _run_question_job(self, texts: List[str]) -> List[List[str]]:
+        if len(texts) == 1:
+            return [self._generate_questions_for_chunk(texts[0])]
+        batched = self._generate_questions_for_batch(texts)
+        # Passages the model skipped or garbled get a call of their own
+        return [questions or self._generate_questions_for_chunk(text) for questions, text in zip(batched, texts)]
+
+    def _count_llm_call(self):
+        with self._llm_calls_lock:
+            self.llm_calls += 1
+
+    def _generate_questions_for_batch(self, texts: List[str]) -> List[List[str]]:
+        """Generates questions for several short chunks of one language with a single LLM call."""
+        if not self.llm_client:
+            return [[] for _ in texts]
+        try:
+            language = detect_text_language(texts[0])
+            label = "PASAJE" if language == "spanish" else "PASSAGE"
+            passages = "\n\n".join(f"{label} {n}:\n{text}" for n, text in enumerate(texts, 1))
+            prompt = get_batch_question_generation_prompt(language).format(passages=passages)
+
+            self._count_llm_call()
+            response = self.llm_client.generate_response(prompt)
+            return self._parse_batched_questions(response, len(texts))
+        except Exception as e:
+            logger.warning(f"--- DocumentProcessor: Batched question generation failed: {e}. Falling back to one call per chunk. ---")
+            return [[] for _ in texts]
+
+    def _parse_batched_questions(self, response: str, count: int) -> List[List[str]]:
+        """Splits a batched response at its 'PASSAGE n:' headings and parses each block."""
+        questions = [[] for _ in range(count)]
+        parts = re.split(r'^[\s*#]*(?:PASSAGE|PASAJE)\s+(\d+)[\s*:]*$', response, flags=re.MULTILINE | re.IGNORECASE)
+        for number, block in zip(parts[1::2], parts[2::2]):
+            index = int(number) - 1
+            if 0 <= index < count and not questions[index]:
+                questions[index] = self._parse_questions_from_response(block)
+        return questions
+
     def _generate_questions_for_chunk(self, content: str) -> List[str]:
         """Generates questions for a chunk of text using the local LLM."""
         if not self.llm_client or len(content.strip()) < 50:
             return []
         try:
             # Simple language detection for choosing the right prompt
-            is_spanish = any(word in content.lower() for word in [' de ', ' la ', ' el ', ' en ', ' que '])
-            language = "spanish" if is_spanish else "english"
+            language = detect_text_language(content)
             
             prompt_template = get_question_generation_prompt(language)
             prompt = prompt_template.format(content=content)
             
+            self._count_llm_call()
             response = self.llm_client.generate_response(prompt)
             return self._parse_questions_from_response(response)
         except Exception as e:
@@ -175,16 +295,3 @@ class DocumentProcessor:
                 if question and ']' not in question:
                     questions.append(question)
         return questions[:10]
-
-    def _get_text_from_block(self, block: 'documentai.Document.Layout.Block') -> str:
-        """Recursively extracts all text from a block and its nested blocks."""
-        text = ""
-        if block.text_block and block.text_block.text:
-            text = block.text_block.text.strip()
-        
-        # This part is crucial for layouts where content is nested inside other blocks
-        if block.text_block and block.text_block.blocks:
-            nested_texts = [self._get_text_from_block(nb) for nb in block.text_block.blocks]
-            text = "\n".join([text] + nested_texts).strip()
-            
-        return text
\ No newline at end of file
@@ -0,0 +1,133 @@
+# Path: app/services/document_text.py
+
+import asyncio
+import logging
+import threading
+import multiprocessing
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import List, Optional
+
+import docx
+import fitz
+
+from app.core.config import CHAT_EXTRACTION_WORKERS, CHAT_EXTRACTION_PAGES_PER_TASK
+
+logger = logging.getLogger(__name__)
+
+PAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class PagedText:
+    """
+    A document's text with the character offset at which each page starts, so pages
+    can be sliced out again without re-parsing. DOCX files have no fixed pages and
+    come out as a single page.
+    """
+    text: str
+    page_offsets: List[int]
+
+    @classmethod
+    def from_pages(cls, pages: List[str]) -> "PagedText":
+        offsets, position = [], 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page) + len(PAGE_SEPARATOR)
+        return cls(text=PAGE_SEPARATOR.join(pages), page_offsets=offsets)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets)
+
+    def pages(self, first: int, last: Optional[int] = None) -> str:
+        """Text of pages `first` to `last` (1-based, inclusive; a single page by default)."""
+        last = first if last is None else min(last, self.page_count)
+        if first < 1 or first > last:
+            return ""
+        end = self.page_offsets[last] - len(PAGE_SEPARATOR) if last < self.page_count else len(self.text)
+        return self.text[self.page_offsets[first - 1]:end]
+
+    def page_at(self, offset: int) -> int:
+        """The 1-based page containing the character at `offset`."""
+        return max(1, bisect_right(self.page_offsets, offset))
+
+
+# --- Run in the worker processes ---
+
+def _pdf_page_count(file_path: str) -> int:
+    with fitz.open(file_path, filetype="pdf") as pdf:
+        return pdf.page_count
+
+def _pdf_page_texts(file_path: str, start: int, end: int) -> List[str]:
+    with fitz.open(file_path, filetype="pdf") as pdf:
+        return [pdf[number].get_text() for number in range(start, end)]
+
+def _docx_text(file_path: str) -> str:
+    return "\n".join(paragraph.text for paragraph in docx.Document(file_path).paragraphs)
+
+
+class DocumentTextExtractor:
+    """
+    Extracts the text of documents uploaded to a chat in a pool of worker processes,
+    so parsing never blocks the event loop. PDFs longer than `pages_per_task` are split
+    into page ranges that are extracted in parallel and reassembled in page order.
+    The pool is started on first use, and replaced when a worker process dies.
+    """
+    def __init__(self, workers: int = CHAT_EXTRACTION_WORKERS, pages_per_task: int = CHAT_EXTRACTION_PAGES_PER_TASK):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned rather than forked: the server process runs threads
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"--- DocumentTextExtractor: Started {self.workers} extraction processes. ---")
+            return self._pool
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        """Drops a pool that lost a worker process; the next use starts a fresh one."""
+        with self._lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                logger.warning("--- DocumentTextExtractor: An extraction process died. Restarting the pool. ---")
+
+    async def extract(self, file_path: str, filename: str) -> PagedText:
+        """
+        Extracts a PDF or DOCX file (chosen by `filename`'s extension) into page-indexed text.
+        A broken pool (e.g. a worker killed by the OOM killer) is replaced and the file is
+        tried once more; a file that breaks the new pool as well fails.
+        """
+        pool = self.pool
+        try:
+            return await self._extract(pool, file_path, filename)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+        return await self._extract(self.pool, file_path, filename)
+
+    async def _extract(self, pool: ProcessPoolExecutor, file_path: str, filename: str) -> PagedText:
+        loop = asyncio.get_running_loop()
+        if filename.lower().endswith('.docx'):
+            return PagedText.from_pages([await loop.run_in_executor(pool, _docx_text, file_path)])
+
+        page_count = await loop.run_in_executor(pool, _pdf_page_count, file_path)
+        ranges = [(start, min(start + self.pages_per_task, page_count)) for start in range(0, page_count, self.pages_per_task)]
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _pdf_page_texts, file_path, start, end) for start, end in ranges
+        ))
+        if len(ranges) > 1:
+            logger.info(f"--- DocumentTextExtractor: Extracted '{filename}' ({page_count} pages) in {len(ranges)} page ranges. ---")
+        return PagedText.from_pages([page for part in parts for page in part])
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,127 @@
+# Path: app/services/documentai_cache.py
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import zstandard
+
+from app.core.config import DOCUMENT_AI_CACHE_DIR, DOCUMENT_AI_CACHE_MAX_BYTES, DOCUMENT_AI_CACHE_ZSTD_LEVEL
+from app.core.hashing import sha256_text
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".pb.zst"
+PROCESSOR_VERSIONS_FILE = "processor_versions.json"
+
+
+class DocumentAIResponseCache:
+    """
+    On-disk cache of raw Document AI responses (serialized Document protos, zstd-compressed).
+    Entries are keyed by the PDF's SHA-256 and the processor id and version, so re-chunking
+    or re-ingesting an unchanged PDF never calls Document AI again, while switching
+    processors does. Reads refresh an entry's mtime; the least recently used entries are
+    evicted once the cache grows past `max_bytes`.
+    """
+    def __init__(self, cache_dir: str = str(DOCUMENT_AI_CACHE_DIR), max_bytes: int = DOCUMENT_AI_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_hash: str, processor_id: str, processor_version: str) -> str:
+        """`processor_version` must be the concrete version, never empty: the processor's default can change."""
+        if not processor_version:
+            raise ValueError("A concrete processor version is required for Document AI cache keys.")
+        return sha256_text(f"{file_hash}|{processor_id}|{processor_version}")
+
+    def get_processor_version(self, processor_id: str) -> Optional[str]:
+        """The default version last resolved for a processor, so an offline run can still key its lookups."""
+        try:
+            versions = json.loads((self.cache_dir / PROCESSOR_VERSIONS_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        return versions.get(processor_id)
+
+    def put_processor_version(self, processor_id: str, version: str):
+        path = self.cache_dir / PROCESSOR_VERSIONS_FILE
+        with self._lock:
+            try:
+                versions = json.loads(path.read_text())
+            except (FileNotFoundError, ValueError):
+                versions = {}
+            if versions.get(processor_id) == version:
+                return
+            versions[processor_id] = version
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(versions, indent=2))
+            os.replace(tmp_path, path)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = zstandard.ZstdDecompressor().decompress(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except zstandard.ZstdError as e:
+            logger.warning(f"--- DocumentAIResponseCache: Dropping corrupt entry {path.name}: {e} ---")
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # Marks the entry as recently used
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(zstandard.ZstdCompressor(level=DOCUMENT_AI_CACHE_ZSTD_LEVEL).compress(data))
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Deletes least recently used entries until the cache fits. Returns the number deleted."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.glob(f"*{CACHE_SUFFIX}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= limit:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"--- DocumentAIResponseCache: Evicted {removed} entries to stay under {limit} bytes. ---")
+        return removed
+
+    def clear(self, older_than_seconds: Optional[float] = None) -> int:
+        """Deletes all entries, or only those not used for `older_than_seconds`."""
+        cutoff = time.time() - older_than_seconds if older_than_seconds is not None else None
+        removed = 0
+        with self._lock:
+            for path in self.cache_dir.glob(f"*{CACHE_SUFFIX}"):
+                if cutoff is None or path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        sizes = [path.stat().st_size for path in self.cache_dir.glob(f"*{CACHE_SUFFIX}")]
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
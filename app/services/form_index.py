@@ -0,0 +1,69 @@
+# Path: app/services/form_index.py
+
+from typing import Dict, Iterable, List, Set
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# USCIS-style form identifiers: "G-845", "I-130", "G-325A", "n-648", "G845" or "Form G 845".
+FORM_SERIES = r'(AR|EOIR|G|I|N)'
+FORM_NUMBER_PATTERNS = [
+    re.compile(rf'\b{FORM_SERIES}-(\d{{1,4}}[A-Z]?)\b', re.IGNORECASE),
+    re.compile(rf'\b{FORM_SERIES}(\d{{2,4}}[A-Z]?)\b', re.IGNORECASE),
+    re.compile(rf'\b(?:form|formulario)\s+{FORM_SERIES}\s+(\d{{1,4}}[A-Z]?)\b', re.IGNORECASE),
+]
+
+def normalize_form_number(series: str, number: str) -> str:
+    """Normalizes a form identifier to the canonical 'G-845' spelling."""
+    return f"{series.upper()}-{number.upper()}"
+
+def extract_form_numbers(text: str) -> List[str]:
+    """Returns the sorted, de-duplicated, normalized form identifiers mentioned in a text."""
+    if not text:
+        return []
+    forms = set()
+    for pattern in FORM_NUMBER_PATTERNS:
+        for series, number in pattern.findall(text):
+            forms.add(normalize_form_number(series, number))
+    return sorted(forms)
+
+def parse_forms_metadata(value: str) -> List[str]:
+    """Splits the pipe-joined 'forms' metadata string back into a list."""
+    return [form for form in (value or "").split("|") if form]
+
+
+class FormIndex:
+    """
+    In-memory inverted index from normalized form numbers to the chunk ids that
+    mention them. It lets the vector store restrict a similarity search to the
+    chunks of the forms named in a query.
+    """
+    def __init__(self):
+        self._form_to_ids: Dict[str, Set[str]] = {}
+
+    def add(self, chunk_id: str, forms: Iterable[str]):
+        """Registers a chunk under each of its form numbers."""
+        for form in forms:
+            self._form_to_ids.setdefault(form, set()).add(chunk_id)
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """Drops the given chunk ids from every form entry."""
+        chunk_ids = set(chunk_ids)
+        for form in list(self._form_to_ids):
+            self._form_to_ids[form] -= chunk_ids
+            if not self._form_to_ids[form]:
+                del self._form_to_ids[form]
+
+    def chunk_ids_for(self, forms: Iterable[str]) -> List[str]:
+        """Returns the union of chunk ids indexed under any of the given forms."""
+        ids = set()
+        for form in forms:
+            ids |= self._form_to_ids.get(form, set())
+        return sorted(ids)
+
+    def clear(self):
+        self._form_to_ids.clear()
+
+    def __len__(self) -> int:
+        return len(self._form_to_ids)
@@ -0,0 +1,285 @@
+# Path: app/services/ingestion_jobs.py
+
+import uuid
+import shutil
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import INGESTION_JOBS_DB_PATH, INGESTION_WORKERS, INGESTION_POLL_SECONDS, INGESTION_UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED_STATUSES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    """Raised from a progress callback when the running job was cancelled."""
+
+
+class IngestionJobStore:
+    """
+    Persistent queue of document ingestion jobs. Jobs survive restarts: anything left
+    'running' by a dead process is queued again on startup, which is safe because
+    ingestion skips unchanged documents and only re-embeds changed chunks.
+    """
+    def __init__(self, db_path: str = INGESTION_JOBS_DB_PATH):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._connect()
+        self._create_tables_if_not_exist()
+
+    def _connect(self):
+        """Establish a connection to the SQLite database."""
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            logger.info(f"--- IngestionJobStore: Successfully connected to database at {self.db_path} ---")
+        except sqlite3.Error as e:
+            logger.critical(f"--- IngestionJobStore: Database connection failed: {e} ---", exc_info=True)
+            raise
+
+    def _create_tables_if_not_exist(self):
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    document_name TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    submitted_by TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    stage_started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- IngestionJobStore: Failed to create or verify tables: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False):
+        """Runs one write statement in its own transaction; with `fetch`, returns its RETURNING row."""
+        with self._lock:
+            try:
+                cursor = self._conn.execute(sql, params)
+                row = cursor.fetchone() if fetch else None
+                self._conn.commit()
+                return row if fetch else cursor
+            except sqlite3.Error as e:
+                logger.error(f"--- IngestionJobStore: Query failed: {e} ---", exc_info=True)
+                self._conn.rollback()
+                raise
+
+    def create(self, document_name: str, file_path: str, submitted_by: Optional[str] = None) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO ingestion_jobs (job_id, document_name, file_path, status, stage, submitted_by, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, document_name, file_path, QUEUED, QUEUED, submitted_by, datetime.now().isoformat())
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM ingestion_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically moves the oldest queued job to 'running'. Jobs for a document that
+        another worker is already ingesting wait until that one finishes.
+        """
+        now = datetime.now().isoformat()
+        row = self._execute(
+            f"""
+            UPDATE ingestion_jobs
+            SET status = '{RUNNING}', attempts = attempts + 1, started_at = ?, stage_started_at = ?,
+                chunks_done = 0, chunks_total = 0, error = NULL, finished_at = NULL
+            WHERE job_id = (
+                SELECT job_id FROM ingestion_jobs
+                WHERE status = '{QUEUED}' AND cancel_requested = 0
+                  AND document_name NOT IN (SELECT document_name FROM ingestion_jobs WHERE status = '{RUNNING}')
+                ORDER BY created_at LIMIT 1
+            )
+            RETURNING *
+            """,
+            (now, now),
+            fetch=True
+        )
+        return dict(row) if row else None
+
+    def update_progress(self, job_id: str, stage: str, chunks_done: int = 0, chunks_total: int = 0) -> bool:
+        """Records the job's stage and chunk progress. Returns True if cancellation was requested."""
+        now = datetime.now().isoformat()
+        self._execute(
+            "UPDATE ingestion_jobs SET stage_started_at = CASE WHEN stage = ? THEN stage_started_at ELSE ? END, "
+            "stage = ?, chunks_done = ?, chunks_total = ? WHERE job_id = ?",
+            (stage, now, stage, chunks_done, chunks_total, job_id)
+        )
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM ingestion_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self._execute(
+            "UPDATE ingestion_jobs SET status = ?, stage = ?, error = ?, finished_at = ? WHERE job_id = ?",
+            (status, status, error, datetime.now().isoformat(), job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queued jobs are cancelled at once; running jobs stop at their next checkpoint."""
+        now = datetime.now().isoformat()
+        self._execute(
+            f"UPDATE ingestion_jobs SET status = '{CANCELLED}', stage = '{CANCELLED}', finished_at = ? "
+            f"WHERE job_id = ? AND status = '{QUEUED}'",
+            (now, job_id)
+        )
+        self._execute(f"UPDATE ingestion_jobs SET cancel_requested = 1 WHERE job_id = ? AND status = '{RUNNING}'", (job_id,))
+        return self.get(job_id)
+
+    def retry(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queues a failed or cancelled job again."""
+        self._execute(
+            f"UPDATE ingestion_jobs SET status = '{QUEUED}', stage = '{QUEUED}', cancel_requested = 0, error = NULL, "
+            f"chunks_done = 0, chunks_total = 0, finished_at = NULL WHERE job_id = ? AND status IN ('{FAILED}', '{CANCELLED}')",
+            (job_id,)
+        )
+        return self.get(job_id)
+
+    def requeue_interrupted(self) -> int:
+        """Queues jobs that were running when the previous process stopped."""
+        cursor = self._execute(
+            f"UPDATE ingestion_jobs SET status = '{QUEUED}', stage = '{QUEUED}' WHERE status = '{RUNNING}' AND cancel_requested = 0"
+        )
+        self._execute(
+            f"UPDATE ingestion_jobs SET status = '{CANCELLED}', stage = '{CANCELLED}', finished_at = ? "
+            f"WHERE status = '{RUNNING}' AND cancel_requested = 1",
+            (datetime.now().isoformat(),)
+        )
+        return cursor.rowcount
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM ingestion_jobs WHERE status IN ('{QUEUED}', '{RUNNING}') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+
+def job_eta_seconds(job: Dict[str, Any]) -> Optional[float]:
+    """Extrapolates the current stage's chunk rate; None until the stage has made progress."""
+    if job["status"] != RUNNING or not job["chunks_total"] or not job["chunks_done"] or not job["stage_started_at"]:
+        return None
+    elapsed = (datetime.now() - datetime.fromisoformat(job["stage_started_at"])).total_seconds()
+    return round(elapsed / job["chunks_done"] * (job["chunks_total"] - job["chunks_done"]), 1)
+
+
+class IngestionWorkerPool:
+    """
+    Background threads that take jobs from the store and ingest them with the shared
+    RAGService, reporting each stage and the chunk progress of question generation.
+    """
+    def __init__(self, rag_service, store: Optional[IngestionJobStore] = None, workers: int = INGESTION_WORKERS):
+        self.rag_service = rag_service
+        self.store = store or IngestionJobStore()
+        self.workers = workers
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logger.info(f"--- IngestionWorkerPool: Re-queued {requeued} jobs interrupted by a restart. ---")
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingestion-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"--- IngestionWorkerPool: Started {self.workers} ingestion workers. ---")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, document_name: str, file_path: str, submitted_by: Optional[str] = None) -> Dict[str, Any]:
+        job = self.store.create(document_name, file_path, submitted_by)
+        logger.info(f"--- IngestionWorkerPool: Queued job {job['job_id']} for '{document_name}'. ---")
+        self._wakeup.set()
+        return job
+
+    def retry(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.retry(job_id)
+        self._wakeup.set()
+        return job
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim_next()
+            except Exception:
+                job = None  # Logged by the store; try again after the poll interval
+            if job is None:
+                self._wakeup.wait(INGESTION_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        logger.info(f"--- IngestionWorkerPool: Job {job_id} started for '{job['document_name']}' (attempt {job['attempts']}). ---")
+
+        def progress(stage: str, done: int = 0, total: int = 0):
+            if self.store.update_progress(job_id, stage, done, total):
+                raise JobCancelled(f"Job {job_id} was cancelled.")
+
+        try:
+            success = self.rag_service.process_document(job["file_path"], progress=progress)
+            if success:
+                self.store.finish(job_id, SUCCEEDED)
+                self._remove_job_upload(job["file_path"])
+            else:
+                self.store.finish(job_id, FAILED, "Document processing failed. See the server log for details.")
+        except JobCancelled:
+            logger.info(f"--- IngestionWorkerPool: Job {job_id} cancelled. ---")
+            self.store.finish(job_id, CANCELLED)
+        except Exception as e:
+            logger.error(f"--- IngestionWorkerPool: Job {job_id} failed: {e} ---", exc_info=True)
+            self.store.finish(job_id, FAILED, str(e))
+
+    @staticmethod
+    def _remove_job_upload(file_path: str):
+        """Deletes a succeeded job's own copy of its upload. Failed and cancelled jobs keep theirs for a retry."""
+        job_dir = Path(file_path).parent
+        if job_dir.parent == Path(INGESTION_UPLOADS_DIR):
+            shutil.rmtree(job_dir, ignore_errors=True)
@@ -0,0 +1,125 @@
+# Path: app/services/ingestion_pipeline.py
+
+import queue
+import logging
+import threading
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from app.core.config import INGESTION_PIPELINE_QUEUE_SIZE, INGESTION_PIPELINE_CONCURRENT
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+_stage = threading.local()
+
+
+class PipelineStopped(Exception):
+    """Raised in a stage thread whose pipeline is stopping, so the stage gives up its remaining work."""
+
+
+class _Failure:
+    """Carries an exception raised in a stage thread to the consumer."""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def check_stopped():
+    """
+    Raises PipelineStopped when called from a stage of a pipeline that was told to stop.
+    Stages call it between long calls (e.g. LLM requests); elsewhere it does nothing.
+    """
+    stop = getattr(_stage, "stop", None)
+    if stop is not None and stop.is_set():
+        raise PipelineStopped()
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Groups an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StagedPipeline:
+    """
+    Chains generator stages (`stage(iterator) -> iterator`) over a source iterable. With
+    `concurrent=True` the source and every stage run in their own thread, connected by
+    queues of `queue_size` items, and the consumer reads the last stage's output from a
+    queue as well: a slow stage makes the stages before it block (backpressure), so memory
+    stays bounded while all stages work at once. An exception in any stage is re-raised
+    to the consumer; when the consumer stops early (close the returned generator), the
+    stage threads are told to stop and are waited for. Stages that make long calls should
+    call `check_stopped` between them, so at most the call in flight is finished.
+    With `concurrent=False` the stages are plain chained generators. Defaults follow
+    INGESTION_PIPELINE_QUEUE_SIZE and INGESTION_PIPELINE_CONCURRENT.
+    """
+    def __init__(self, queue_size: Optional[int] = None, concurrent: Optional[bool] = None, name: str = "pipeline"):
+        self.queue_size = INGESTION_PIPELINE_QUEUE_SIZE if queue_size is None else queue_size
+        self.concurrent = INGESTION_PIPELINE_CONCURRENT if concurrent is None else concurrent
+        self.name = name
+
+    def run(self, source: Iterable[Any], *stages: Callable[[Iterator[Any]], Iterator[Any]]) -> Iterator[Any]:
+        iterator = iter(source)
+        if not self.concurrent:
+            for stage in stages:
+                iterator = stage(iterator)
+            yield from iterator
+            return
+
+        stop = threading.Event()
+        threads = []
+        for i in range(len(stages) + 1):
+            channel = queue.Queue(maxsize=self.queue_size)
+            thread = threading.Thread(target=self._pump, args=(iterator, channel, stop), name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            threads.append(thread)
+            iterator = self._drain(channel, stop)
+            if i < len(stages):
+                iterator = stages[i](iterator)
+        try:
+            yield from iterator
+        finally:
+            stop.set()
+            for thread in threads:
+                # A thread busy in a long call (e.g. an LLM request) notices `stop` once it returns
+                thread.join()
+
+    @staticmethod
+    def _put(channel: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                channel.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _pump(self, iterator: Iterator[Any], channel: queue.Queue, stop: threading.Event):
+        _stage.stop = stop
+        try:
+            for item in iterator:
+                if not self._put(channel, item, stop):
+                    return
+            self._put(channel, _DONE, stop)
+        except BaseException as e:
+            self._put(channel, _Failure(e), stop)
+
+    @staticmethod
+    def _drain(channel: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+        while True:
+            try:
+                item = channel.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
@@ -0,0 +1,344 @@
+# Path: app/services/layout_backends.py
+
+import re
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+
+from app.core.config import (
+    GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID, GOOGLE_PROCESSOR_VERSION, LAYOUT_BACKEND, DOCUMENT_AI_CACHE_ENABLED,
+    DOCUMENT_AI_MAX_PAGES_PER_REQUEST, DOCUMENT_AI_CONCURRENT_REQUESTS,
+    PYMUPDF_HEADING_SIZE_RATIO, PYMUPDF_HEADING_MAX_CHARS, PYMUPDF_MARGIN_RATIO, PYMUPDF_DETECT_TABLES
+)
+from app.core.hashing import sha256_file
+from app.services.documentai_cache import DocumentAIResponseCache
+
+logger = logging.getLogger(__name__)
+
+BOLD_FLAG = 16  # PyMuPDF span flag bit
+LIST_ITEM_PATTERN = re.compile(r"^(?:[•\-–▪●]|\(?\d{1,2}[.)]|\(?[a-zA-Z][.)])\s")
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b-\x1f]")
+
+
+@dataclass
+class LayoutBlock:
+    """A top-level layout block, typed with Document AI's layout type names (heading-1, paragraph, footer, ...)."""
+    type: str
+    text: str
+    page: int
+
+
+def document_ai_configured() -> bool:
+    return all([GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID])
+
+
+class DocumentAILayoutBackend:
+    """
+    Google Document AI Layout Parser. Handles scanned PDFs (OCR). PDFs longer than
+    DOCUMENT_AI_MAX_PAGES_PER_REQUEST are split into page ranges that are processed
+    concurrently and merged back in page order. Responses are cached per file (or page
+    range) and processor version. `client` can be any object with a `process_document`
+    method (and `get_processor` when caching without a configured processor version),
+    e.g. a local stand-in for the service.
+    """
+    name = "documentai"
+
+    def __init__(
+        self, cache: Optional[DocumentAIResponseCache] = None, client=None,
+        use_cache: bool = DOCUMENT_AI_CACHE_ENABLED, max_pages_per_request: int = DOCUMENT_AI_MAX_PAGES_PER_REQUEST
+    ):
+        if client is None:
+            if not document_ai_configured():
+                raise Exception("Google Document AI credentials not configured properly.")
+            # Imported here so the local backend works without the Google client library
+            from google.cloud import documentai_v1 as documentai
+            client = documentai.DocumentProcessorServiceClient()
+        self.client = client
+        self.project_id = GOOGLE_PROJECT_ID
+        self.location = GOOGLE_LOCATION
+        self.processor_id = GOOGLE_PROCESSOR_ID
+        self.processor_version = GOOGLE_PROCESSOR_VERSION
+        self.max_pages_per_request = max_pages_per_request
+        self.cache = (cache or DocumentAIResponseCache()) if use_cache else None
+        # Cache entries are keyed on the version that actually answers, so a new default version misses the cache
+        self.cache_version = self._resolve_processor_version() if self.cache is not None else self.processor_version
+
+    def _resolve_processor_version(self) -> str:
+        """
+        The configured processor version, or the processor's current default version. The
+        resolved default is kept with the cache, so a run without access to Document AI
+        keys its lookups on the last known version and is served from the cache.
+        """
+        if self.processor_version:
+            return self.processor_version
+        try:
+            processor = self.client.get_processor(name=self.processor_name)
+            version = processor.default_processor_version.rsplit("/", 1)[-1]
+            if not version:
+                raise ValueError("the processor reports no default version")
+        except Exception as e:
+            version = self.cache.get_processor_version(self.processor_id)
+            if version is None:
+                raise Exception(
+                    f"Could not look up the default version of Document AI processor {self.processor_id} ({e}) and none "
+                    "was resolved before. Set GOOGLE_PARSER_PROCESSOR_VERSION to key the response cache."
+                ) from e
+            logger.warning(f"--- DocumentAILayoutBackend: Could not look up the default processor version ({e}). Using '{version}' from the cache. ---")
+            return version
+        logger.info(f"--- DocumentAILayoutBackend: Processor {self.processor_id} defaults to version '{version}'. ---")
+        self.cache.put_processor_version(self.processor_id, version)
+        return version
+
+    @property
+    def processor_name(self) -> str:
+        name = f"projects/{self.project_id}/locations/{self.location}/processors/{self.processor_id}"
+        return f"{name}/processorVersions/{self.processor_version}" if self.processor_version else name
+
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """Zero-based [start, end) page ranges of at most `max_pages_per_request` pages."""
+        step = self.max_pages_per_request
+        return [(start, min(start + step, page_count)) for start in range(0, page_count, step)] or [(0, 0)]
+
+    def _cache_key(self, file_hash: str, page_range: Optional[Tuple[int, int]]) -> str:
+        part = f"{file_hash}:{page_range[0]}-{page_range[1]}" if page_range else file_hash
+        return self.cache.make_key(part, self.processor_id, self.cache_version)
+
+    def is_cached(self, file_path: str) -> bool:
+        if self.cache is None:
+            return False
+        file_hash = sha256_file(file_path)
+        with fitz.open(file_path) as pdf:
+            ranges = self._page_ranges(pdf.page_count)
+        return all(self._cache_key(file_hash, r if len(ranges) > 1 else None) in self.cache for r in ranges)
+
+    def fetch_documents(self, file_path: str, use_cache: bool = True) -> List[Tuple[int, Any]]:
+        """
+        Returns (page offset, Document proto) pairs in page order: one pair for a short
+        PDF, one per page range for a long one.
+        """
+        return list(self.iter_documents(file_path, use_cache))
+
+    def iter_documents(self, file_path: str, use_cache: bool = True) -> Iterator[Tuple[int, Any]]:
+        """
+        Yields the (page offset, Document proto) pairs of `fetch_documents` as they arrive.
+        Page ranges are sliced and sent just ahead of the consumer: at most
+        DOCUMENT_AI_CONCURRENT_REQUESTS of them are in flight or waiting to be consumed.
+        """
+        file_hash = sha256_file(file_path) if self.cache is not None else None
+        with fitz.open(file_path) as pdf:
+            ranges = self._page_ranges(pdf.page_count)
+            if len(ranges) == 1:
+                with open(file_path, "rb") as file:
+                    content = file.read()
+                yield 0, self._process(content, file_hash, None, use_cache)
+                return
+
+            logger.info(
+                f"--- DocumentAILayoutBackend: Splitting {file_path} ({ranges[-1][1]} pages) into {len(ranges)} requests "
+                f"of up to {self.max_pages_per_request} pages. ---"
+            )
+            window = min(DOCUMENT_AI_CONCURRENT_REQUESTS, len(ranges))
+            with ThreadPoolExecutor(max_workers=window, thread_name_prefix="documentai") as executor:
+                pending = deque()
+                for page_range in ranges:
+                    if len(pending) == window:
+                        start, future = pending.popleft()
+                        yield start, future.result()
+                    part = self._slice_pdf(pdf, *page_range)
+                    pending.append((page_range[0], executor.submit(self._process, part, file_hash, page_range, use_cache)))
+                while pending:
+                    start, future = pending.popleft()
+                    yield start, future.result()
+
+    @staticmethod
+    def _slice_pdf(pdf: 'fitz.Document', start: int, end: int) -> bytes:
+        with fitz.open() as part:
+            part.insert_pdf(pdf, from_page=start, to_page=end - 1)
+            return part.tobytes(garbage=3, deflate=True)
+
+    def _process(self, content: bytes, file_hash: Optional[str], page_range: Optional[Tuple[int, int]], use_cache: bool):
+        """One Document AI request (a whole PDF or one page range), through the response cache."""
+        key = self._cache_key(file_hash, page_range) if self.cache is not None else None
+        if key is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                from google.cloud import documentai_v1 as documentai
+                return documentai.Document.deserialize(cached)
+
+        # GAPIC clients accept the request as a plain dict
+        request = {"name": self.processor_name, "raw_document": {"content": content, "mime_type": "application/pdf"}}
+        document = self.client.process_document(request=request).document
+        if key is not None:
+            self.cache.put(key, type(document).serialize(document))
+        return document
+
+    def extract_blocks(self, file_path: str) -> List[LayoutBlock]:
+        return list(self.iter_blocks(file_path))
+
+    def iter_blocks(self, file_path: str) -> Iterator[LayoutBlock]:
+        """
+        Top-level layout blocks of all page ranges, in page order. Page spans of a range
+        are relative to it, so its offset is added back. Blocks stream on across range
+        boundaries, so a section that runs across one simply continues.
+        """
+        for offset, document_proto in self.iter_documents(file_path):
+            if not (hasattr(document_proto, 'document_layout') and document_proto.document_layout.blocks):
+                continue
+            for block in document_proto.document_layout.blocks:
+                yield LayoutBlock(
+                    type=block.text_block.type,
+                    text=self._get_text_from_block(block),
+                    page=offset + (block.page_span.page_start if block.page_span else 1)
+                )
+
+    def _get_text_from_block(self, block) -> str:
+        """Recursively extracts all text from a block and its nested blocks."""
+        text = ""
+        if block.text_block and block.text_block.text:
+            text = block.text_block.text.strip()
+
+        # This part is crucial for layouts where content is nested inside other blocks
+        if block.text_block and block.text_block.blocks:
+            nested_texts = [self._get_text_from_block(nb) for nb in block.text_block.blocks]
+            text = "\n".join([text] + nested_texts).strip()
+
+        return text
+
+
+class PyMuPDFLayoutBackend:
+    """
+    Local layout extraction from the PDF text layer. Block types come from font heuristics:
+    - Headings are blocks set larger than the body text, or short blocks set entirely in
+      bold. Larger sizes get higher heading levels.
+    - Footers are blocks inside the top/bottom page margins, and text that repeats on
+      most pages once digits are ignored (running heads, "Page n of m").
+    - Tables are blocks that fall inside a table PyMuPDF detects.
+    - List items are blocks that start with a bullet or an item number.
+    Scanned PDFs have no text layer and yield no blocks.
+    """
+    name = "pymupdf"
+
+    def extract_blocks(self, file_path: str) -> List[LayoutBlock]:
+        return list(self.iter_blocks(file_path))
+
+    def iter_blocks(self, file_path: str) -> Iterator[LayoutBlock]:
+        """
+        Two passes: the first collects the document-wide font statistics the heuristics
+        need, the second classifies and yields one page at a time, so only a page of
+        blocks is held in memory.
+        """
+        with fitz.open(file_path) as pdf:
+            statistics = self._font_statistics(pdf)
+            if statistics is None:
+                return
+            body_size, heading_levels, repeated = statistics
+            for page in pdf:
+                for raw in self._page_blocks(page):
+                    block_type = self._classify(raw, body_size, heading_levels, repeated)
+                    yield LayoutBlock(type=block_type, text=raw["text"], page=page.number + 1)
+
+    def _font_statistics(self, pdf: 'fitz.Document') -> Optional[Tuple[float, Dict[float, int], set]]:
+        """Body font size, heading levels and repeated texts of the document; None without a text layer."""
+        sizes, block_sizes, text_counts = Counter(), set(), Counter()
+        for page in pdf:
+            page_blocks = self._page_blocks(page, detect_tables=False)
+            for block in page_blocks:
+                sizes.update(block["sizes"])
+                block_sizes.add(block["size"])
+            text_counts.update({self._repeat_key(block["text"]) for block in page_blocks})
+        if not sizes:
+            return None
+        body_size = sizes.most_common(1)[0][0]
+        return body_size, self._heading_levels(block_sizes, body_size), self._repeated_texts(text_counts, pdf.page_count)
+
+    def _page_blocks(self, page: 'fitz.Page', detect_tables: bool = True) -> List[Dict]:
+        """Text blocks of a page with their text, font sizes, boldness and position."""
+        height = page.rect.height
+        table_boxes = []
+        if detect_tables and PYMUPDF_DETECT_TABLES:
+            try:
+                table_boxes = [fitz.Rect(table.bbox) for table in page.find_tables().tables]
+            except Exception as e:
+                logger.warning(f"--- PyMuPDFLayoutBackend: Table detection failed on page {page.number + 1}: {e} ---")
+
+        blocks = []
+        for block in page.get_text("dict")["blocks"]:
+            if block["type"] != 0:
+                continue  # Images
+            lines, sizes, bold_chars, chars = [], Counter(), 0, 0
+            for line in block["lines"]:
+                line_text = ""
+                for span in line["spans"]:
+                    text = CONTROL_CHARS.sub("", span["text"]).replace("\t", " ")
+                    line_text += text
+                    length = len(text.strip())
+                    sizes[round(span["size"], 1)] += length
+                    chars += length
+                    if span["flags"] & BOLD_FLAG or "bold" in span["font"].lower():
+                        bold_chars += length
+                lines.append(" ".join(line_text.split()))
+            text = " ".join(line for line in lines if line)
+            if not text:
+                continue
+            bbox = fitz.Rect(block["bbox"])
+            blocks.append({
+                "text": text,
+                "lines": len(lines),
+                "size": sizes.most_common(1)[0][0],
+                "sizes": sizes,
+                "bold": chars > 0 and bold_chars == chars,
+                "in_margin": bbox.y1 < height * PYMUPDF_MARGIN_RATIO or bbox.y0 > height * (1 - PYMUPDF_MARGIN_RATIO),
+                "in_table": any(box.contains(bbox) or (box & bbox).get_area() > 0.5 * bbox.get_area() for box in table_boxes),
+            })
+        return blocks
+
+    def _heading_levels(self, block_sizes: set, body_size: float) -> Dict[float, int]:
+        """Maps each heading-sized font size to a level, largest first; bold body text is the lowest level."""
+        larger = sorted((size for size in block_sizes if size >= body_size * PYMUPDF_HEADING_SIZE_RATIO), reverse=True)
+        levels = {size: min(level, 6) for level, size in enumerate(larger, 1)}
+        levels[body_size] = min(len(larger) + 1, 6)
+        return levels
+
+    @staticmethod
+    def _repeat_key(text: str) -> int:
+        # Hashed so the first pass does not keep the document's text
+        return hash(re.sub(r"\d+", "#", text))
+
+    def _repeated_texts(self, text_counts: Counter, page_count: int) -> set:
+        """Texts (digits ignored) that occur on most pages: running heads and footers."""
+        if page_count < 3:
+            return set()
+        return {key for key, count in text_counts.items() if count >= page_count / 2}
+
+    def _classify(self, block: Dict, body_size: float, heading_levels: Dict[float, int], repeated: set) -> str:
+        if block["in_margin"] or self._repeat_key(block["text"]) in repeated:
+            return "footer"
+        if block["in_table"]:
+            return "table"
+        short = len(block["text"]) <= PYMUPDF_HEADING_MAX_CHARS and block["lines"] <= 2
+        if short and not LIST_ITEM_PATTERN.match(block["text"]):
+            if block["size"] >= body_size * PYMUPDF_HEADING_SIZE_RATIO:
+                return f"heading-{heading_levels.get(block['size'], 1)}"
+            if block["bold"] and block["size"] >= body_size:
+                return f"heading-{heading_levels.get(block['size'], heading_levels[body_size])}"
+        if LIST_ITEM_PATTERN.match(block["text"]):
+            return "list_item"
+        return "paragraph"
+
+
+LAYOUT_BACKENDS = {
+    DocumentAILayoutBackend.name: DocumentAILayoutBackend,
+    PyMuPDFLayoutBackend.name: PyMuPDFLayoutBackend,
+}
+
+def create_layout_backend(name: str = LAYOUT_BACKEND):
+    """Instantiates the layout backend configured for this deployment."""
+    try:
+        backend_class = LAYOUT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown layout backend '{name}'. Choose one of: {', '.join(LAYOUT_BACKENDS)}.")
+    return backend_class()
@@ -0,0 +1,227 @@
+# Path: app/services/manifest_service.py
+
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from app.core.config import MANIFEST_DB_PATH
+from app.services.chunk_store import SQLITE_MAX_VARIABLES
+
+logger = logging.getLogger(__name__)
+
+class DocumentManifestService:
+    """
+    Keeps a per-document manifest of the chunk ids stored in the vector store,
+    together with the content hash and version of each ingested document and a
+    collection-wide version counter that changes on every ingestion or deletion.
+    """
+    def __init__(self, db_path: str = MANIFEST_DB_PATH):
+        self.db_path = db_path
+        self._conn = None
+        self._connect()
+        self._create_tables_if_not_exist()
+
+    def _connect(self):
+        """Establish a connection to the SQLite database."""
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            logger.info(f"--- DocumentManifestService: Successfully connected to database at {self.db_path} ---")
+        except sqlite3.Error as e:
+            logger.critical(f"--- DocumentManifestService: Database connection failed: {e} ---", exc_info=True)
+            raise
+
+    def _create_tables_if_not_exist(self):
+        """Creates the manifest tables and seeds the collection version."""
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_name TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    chunk_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS document_chunks (
+                    document_name TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (document_name, chunk_id)
+                )
+            """)
+            # Reverse lookups: which documents reference a chunk (shared near-duplicate chunks)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_chunks_chunk_id ON document_chunks (chunk_id)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_signatures (
+                    chunk_id TEXT PRIMARY KEY,
+                    signature BLOB NOT NULL,
+                    facts TEXT
+                )
+            """)
+            columns = {row["name"] for row in cursor.execute("PRAGMA table_info(chunk_signatures)")}
+            if "facts" not in columns:
+                # Signatures stored before fact keys existed keep a NULL key and never collapse new chunks
+                cursor.execute("ALTER TABLE chunk_signatures ADD COLUMN facts TEXT")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS store_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO store_state (key, value) VALUES ('collection_version', '0')")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- DocumentManifestService: Failed to create or verify manifest tables: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def get_document(self, document_name: str) -> Optional[Dict[str, Any]]:
+        """Returns the manifest entry of a document, or None if it was never ingested."""
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT * FROM documents WHERE document_name = ?", (document_name,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """Returns the manifest entries of all ingested documents."""
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT * FROM documents ORDER BY document_name")
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_chunk_ids(self, document_name: str) -> List[str]:
+        """Returns the chunk ids recorded for a document, in document order."""
+        cursor = self._conn.cursor()
+        cursor.execute(
+            "SELECT chunk_id FROM document_chunks WHERE document_name = ? ORDER BY position",
+            (document_name,)
+        )
+        return [row["chunk_id"] for row in cursor.fetchall()]
+
+    def get_chunk_references(self, chunk_ids: List[str]) -> Dict[str, List[str]]:
+        """Returns {chunk_id: [document_name, ...]} for the given chunks that any document references."""
+        references: Dict[str, List[str]] = {}
+        cursor = self._conn.cursor()
+        for start in range(0, len(chunk_ids), SQLITE_MAX_VARIABLES):
+            batch = list(chunk_ids[start:start + SQLITE_MAX_VARIABLES])
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(
+                f"SELECT chunk_id, document_name FROM document_chunks WHERE chunk_id IN ({placeholders}) ORDER BY document_name",
+                batch
+            )
+            for row in cursor.fetchall():
+                references.setdefault(row["chunk_id"], []).append(row["document_name"])
+        return references
+
+    def put_signatures(self, signatures: Dict[str, tuple]):
+        """Stores the near-duplicate signatures of chunks as {chunk_id: (signature, facts)}, replacing existing ones."""
+        if not signatures:
+            return
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_signatures (chunk_id, signature, facts) VALUES (?, ?, ?)",
+                [(chunk_id, signature, facts) for chunk_id, (signature, facts) in signatures.items()]
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- DocumentManifestService: Failed to store chunk signatures: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def get_signatures(self) -> List[tuple]:
+        """Returns (chunk_id, signature, facts) for every stored chunk signature."""
+        return [
+            (row["chunk_id"], row["signature"], row["facts"])
+            for row in self._conn.execute("SELECT chunk_id, signature, facts FROM chunk_signatures")
+        ]
+
+    def delete_signatures(self, chunk_ids: List[str]):
+        try:
+            for start in range(0, len(chunk_ids), SQLITE_MAX_VARIABLES):
+                batch = list(chunk_ids[start:start + SQLITE_MAX_VARIABLES])
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM chunk_signatures WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- DocumentManifestService: Failed to delete chunk signatures: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def record_document(self, document_name: str, content_hash: str, chunk_ids: List[str]) -> int:
+        """Replaces a document's chunk manifest, bumps its version and returns the new version."""
+        try:
+            existing = self.get_document(document_name)
+            version = existing["version"] + 1 if existing else 1
+            cursor = self._conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO documents (document_name, content_hash, version, chunk_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (document_name, content_hash, version, len(chunk_ids), datetime.now().isoformat())
+            )
+            cursor.execute("DELETE FROM document_chunks WHERE document_name = ?", (document_name,))
+            cursor.executemany(
+                "INSERT INTO document_chunks (document_name, chunk_id, position) VALUES (?, ?, ?)",
+                [(document_name, chunk_id, i) for i, chunk_id in enumerate(chunk_ids)]
+            )
+            self._bump_collection_version(cursor)
+            self._conn.commit()
+            logger.info(f"--- DocumentManifestService: Recorded '{document_name}' v{version} with {len(chunk_ids)} chunks. ---")
+            return version
+        except sqlite3.Error as e:
+            logger.error(f"--- DocumentManifestService: Failed to record document '{document_name}': {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def remove_document(self, document_name: str):
+        """Removes a document and its chunk manifest."""
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("DELETE FROM document_chunks WHERE document_name = ?", (document_name,))
+            cursor.execute("DELETE FROM documents WHERE document_name = ?", (document_name,))
+            self._bump_collection_version(cursor)
+            self._conn.commit()
+            logger.info(f"--- DocumentManifestService: Removed '{document_name}' from the manifest. ---")
+        except sqlite3.Error as e:
+            logger.error(f"--- DocumentManifestService: Failed to remove document '{document_name}': {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def get_collection_version(self) -> int:
+        """Returns the collection version, which changes on every ingestion or deletion."""
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT value FROM store_state WHERE key = 'collection_version'")
+        row = cursor.fetchone()
+        return int(row["value"]) if row else 0
+
+    def bump_collection_version(self):
+        """Marks the collection as changed outside of a document update (e.g. a full reset)."""
+        cursor = self._conn.cursor()
+        self._bump_collection_version(cursor)
+        self._conn.commit()
+
+    def close(self):
+        """Closes the database connection, e.g. when the service moves to another index generation."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def clear(self):
+        """Forgets every document, e.g. after the collection itself was deleted."""
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("DELETE FROM document_chunks")
+            cursor.execute("DELETE FROM documents")
+            cursor.execute("DELETE FROM chunk_signatures")
+            self._bump_collection_version(cursor)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"--- DocumentManifestService: Failed to clear manifest: {e} ---", exc_info=True)
+            self._conn.rollback()
+            raise
+
+    def _bump_collection_version(self, cursor: sqlite3.Cursor):
+        cursor.execute(
+            "UPDATE store_state SET value = CAST(value AS INTEGER) + 1 WHERE key = 'collection_version'"
+        )
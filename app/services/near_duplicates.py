@@ -0,0 +1,138 @@
+# Path: app/services/near_duplicates.py
+
+import re
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.form_index import extract_form_numbers
+from app.core.config import NEAR_DUPLICATE_NUM_PERM, NEAR_DUPLICATE_BANDS, NEAR_DUPLICATE_SHINGLE_SIZE
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,/:-]\d+)*")
+
+def shingles(text: str, size: int = NEAR_DUPLICATE_SHINGLE_SIZE) -> Set[str]:
+    """Word n-grams of the lowercased text; punctuation and layout whitespace are ignored."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def fact_key(text: str) -> str:
+    """
+    The figures a chunk's text (header and content) states: its numbers (fees, dates,
+    addresses, phone numbers) and the form numbers it names. Two chunks only collapse when
+    these are equal, however similar the wording. The forms a chunk inherits from its file
+    name are left out, so boilerplate shared by the instructions of different forms still
+    collapses; add_chunk_references merges those into the canonical chunk's forms.
+    """
+    numbers = sorted({number.replace(",", "") for number in NUMBER_PATTERN.findall(text)})
+    facts = "|".join(numbers) + "#" + "|".join(extract_form_numbers(text))
+    return hashlib.blake2b(facts.encode("utf-8"), digest_size=8).hexdigest()
+
+def format_reference(document_name: str, page) -> str:
+    """One entry of a canonical chunk's 'sources' metadata field."""
+    return f"{document_name}#{page}"
+
+def parse_references(value: Optional[str]) -> List[str]:
+    return [r for r in (value or "").split("|") if r]
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles. The fraction of equal signature positions
+    estimates the Jaccard similarity of two texts. Seeded, so signatures persisted by
+    one process can be compared with signatures computed by another.
+    """
+    def __init__(self, num_perm: int = NEAR_DUPLICATE_NUM_PERM, shingle_size: int = NEAR_DUPLICATE_SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        tokens = shingles(text, self.shingle_size)
+        if not tokens:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little") for t in tokens),
+            dtype=np.uint64, count=len(tokens)
+        )
+        # Universal hashing (a*x + b) mod p, one permutation per column
+        permuted = ((np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME) & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    return float(np.mean(signature_a == signature_b))
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures. Signatures are split into bands;
+    texts sharing any band are candidates, which are then confirmed with the estimated
+    similarity and must have the same fact key. With 16 bands of 8 rows, pairs above ~0.85 similarity are found with
+    >99% probability while pairs below ~0.5 rarely become candidates.
+    """
+    def __init__(self, num_perm: int = NEAR_DUPLICATE_NUM_PERM, bands: int = NEAR_DUPLICATE_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands}).")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._facts: Dict[str, Optional[str]] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, chunk_id: str, signature: np.ndarray, facts: Optional[str]):
+        """Indexes a chunk. Chunks without a fact key (stored before keys existed) never match."""
+        self.remove([chunk_id])
+        self._signatures[chunk_id] = signature
+        self._facts[chunk_id] = facts
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(chunk_id)
+
+    def remove(self, chunk_ids: Iterable[str]):
+        for chunk_id in chunk_ids:
+            signature = self._signatures.pop(chunk_id, None)
+            self._facts.pop(chunk_id, None)
+            if signature is None:
+                continue
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.discard(chunk_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def query(self, signature: np.ndarray, facts: str, threshold: float, exclude: Optional[Set[str]] = None) -> Optional[Tuple[str, float]]:
+        """Returns the most similar indexed chunk with the same `facts` at or above `threshold`, as (chunk_id, similarity)."""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        if exclude:
+            candidates -= exclude
+        best = None
+        for chunk_id in sorted(candidates):
+            if self._facts[chunk_id] != facts:
+                continue
+            similarity = estimate_similarity(signature, self._signatures[chunk_id])
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (chunk_id, similarity)
+        return best
+
+    def clear(self):
+        self._buckets.clear()
+        self._signatures.clear()
+        self._facts.clear()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
@@ -1,17 +1,28 @@
 # Path: app/services/rag_service.py
 
-from typing import Any, List, Dict
+from typing import Any, Callable, Iterator, List, Dict, Optional, Tuple
 from app.services.llm_client import OllamaClient
 from app.services.embeddings import EmbeddingService
-from app.services.vectorstore import VectorStoreService
+from app.services.vectorstore import VectorStoreService, make_chunk_id
 from app.services.data_loader import DocumentProcessor
-from app.core.config import CONTEXT_HISTORY_MESSAGES, GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID, MAX_CHUNKS_RETRIEVED, LARGE_DOCUMENT_THRESHOLD
+from app.services.form_index import extract_form_numbers
+from app.services.reranker import RerankerService
+from app.services.chunk_store import enrich_content
+from app.services.answer_cache import SemanticAnswerCache, is_history_dependent
+from app.services.ingestion_jobs import JobCancelled
+from app.services.ingestion_pipeline import StagedPipeline, batched, check_stopped
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.context_builder import ContextBuilder, format_context, passage_text
+from app.core.hashing import sha256_file
+from app.core.language import detect_text_language
+from app.core.config import CONTEXT_HISTORY_MESSAGES, GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID, LAYOUT_BACKEND, MAX_CHUNKS_RETRIEVED, LARGE_DOCUMENT_THRESHOLD, RERANK_ENABLED, RERANK_CANDIDATES, ANSWER_CACHE_ENABLED, FAQ_MATCH_ENABLED, FAQ_MATCH_CANDIDATES, FAQ_MATCH_MAX_DISTANCE, HIERARCHICAL_RETRIEVAL_ENABLED, HIERARCHICAL_TOP_DOCUMENTS, HIERARCHICAL_TOP_SECTIONS, SECTION_EXPANSION_ENABLED, SECTION_EXPANSION_MIN_HITS, SECTION_EXPANSION_MAX_CHARS, LANGUAGE_PARTITIONED_SEARCH, LANGUAGE_FALLBACK_MIN_SIMILARITY, CONTEXT_COMPACTION_ENABLED, CONTEXT_CANDIDATES, INGESTION_PIPELINE_BATCH_SIZE
 from app.core.prompts import get_system_prompt, get_prompt_template, get_query_intent_prompt, LANGUAGE_DETECTION_PROMPT, ROUTER_PROMPT, EXTRACTION_PROMPT_TEMPLATE,DOCUMENT_SUMMARY_PROMPT, PER_CHUNK_TASK_PROMPT, COMBINE_RESULTS_PROMPT, TRANSLATION_INTENT_PROMPT, TRANSLATE_CHUNK_PROMPT
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import logging
 import os
 import re
 import numpy as np
+from contextlib import closing
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +33,11 @@ class RAGService:
             self.llm_client = OllamaClient()
             self.embedding_service = EmbeddingService()
             self.vector_store = VectorStoreService()
+            self.reranker = self._init_reranker()
+            self.answer_cache = SemanticAnswerCache() if ANSWER_CACHE_ENABLED else None
+            self.context_builder = ContextBuilder() if CONTEXT_COMPACTION_ENABLED else None
             
-            if not all([GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID]):
+            if LAYOUT_BACKEND == "documentai" and not all([GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GOOGLE_PROCESSOR_ID]):
                 logger.error("Google Document AI credentials are not fully configured.")
                 raise Exception("Google Document AI credentials not configured properly.")
             
@@ -33,6 +47,16 @@ class RAGService:
             logger.error(f"Failed to initialize RAG service: {e}", exc_info=True)
             raise
 
+    def _init_reranker(self):
+        """Loads the optional cross-encoder reranker. Retrieval keeps working without it."""
+        if not RERANK_ENABLED:
+            return None
+        try:
+            return RerankerService()
+        except Exception as e:
+            logger.warning(f"--- RAGService: Could not initialize reranker: {e}. Using vector ranking only. ---")
+            return None
+
     def _create_document_summary(self, full_text: str) -> str:
         """
         Uses an LLM call to create a concise summary of the document text.
@@ -148,33 +172,120 @@ class RAGService:
                 "sources": [], "language": language
             }
 
-    def process_document(self, file_path: str) -> bool:
+    def process_document(
+        self, file_path: str, vector_store: Optional[VectorStoreService] = None,
+        progress: Optional[Callable[..., None]] = None, stats: Optional[Dict[str, int]] = None
+    ) -> bool:
         """
         Processes a complex document for the knowledge base. It chunks, enriches,
         embeds, and stores the document in the permanent vector store.
+        Re-ingesting a document only embeds new chunks and removes stale ones.
+        The stages stream batches of chunks through a StagedPipeline, so pages are still
+        being extracted while earlier chunks get questions, embeddings and upserts.
+        `vector_store` targets another index generation, e.g. during a blue/green rebuild.
+        `progress(stage, done, total)` is told about each stage; it may raise JobCancelled.
+        The manifest is only written at the end and chunks stored by a cancelled or failed
+        run are deleted again, so such a run leaves no trace. A run that was killed instead
+        leaves its stored batches behind; the next run reuses them rather than enriching and
+        embedding those chunks again. `stats`, if given, receives the run's chunk counts.
         """
+        vector_store = vector_store or self.vector_store
+        progress = progress or (lambda stage, done=0, total=0: None)
         logger.info(f"--- RAGService: Starting permanent ingestion for: {file_path} ---")
+        document_name = os.path.basename(file_path)
+        stored_ids = []
         try:
-            # 1. Process with DocumentAI and enrich with questions
-            enriched_chunks = self._process_and_enrich_chunks(file_path)
-            if not enriched_chunks:
-                return False
+            content_hash = sha256_file(file_path)
+            if vector_store.is_document_current(document_name, content_hash):
+                logger.info(f"--- RAGService: '{document_name}' is unchanged since its last ingestion. Skipping. ---")
+                if document_name not in vector_store.summarized_documents:
+                    # Ingested before the summary index existed
+                    vector_store.rebuild_document_summaries(document_name)
+                return True
+
+            progress("extracting")
+            previous_ids = vector_store.get_document_chunk_ids(document_name)
+            run = {
+                "previous_ids": set(previous_ids),
+                "recorded_ids": set(vector_store.manifest.get_chunk_ids(document_name)),
+                "releasable_ids": vector_store.exclusive_chunk_ids(document_name, previous_ids),
+                "current_ids": [], "duplicates": {}, "duplicate_chunks": [], "new": 0, "reused": 0, "extracted": False
+            }
 
-            # 2. Generate embeddings for the enriched content
-            texts_for_embedding = [chunk['content'] for chunk in enriched_chunks]
-            embeddings = self.embedding_service.generate_embeddings(texts_for_embedding)
-            if not embeddings or len(embeddings) != len(enriched_chunks):
-                logger.error("Embedding generation failed or mismatched.")
+            # 1-4. Extract, drop unchanged chunks and near-duplicates (so questions are only
+            # generated for chunks that get stored), enrich, embed and upsert, batch by batch
+            batches = StagedPipeline(name="ingest").run(
+                self._iter_chunks(file_path),
+                lambda chunks: self._select_new_chunks(vector_store, document_name, chunks, run),
+                self._enrich_batches,
+                self._embed_batches
+            )
+            # Closing stops the stage threads when a batch fails or the job is cancelled
+            with closing(batches):
+                for batch, embeddings, question_embeddings in batches:
+                    # Each generated question is indexed as its own vector pointing to its chunk.
+                    # Questions go first, so a stored chunk always has its questions (see _select_new_chunks).
+                    stored_ids.extend(chunk['chunk_id'] for chunk in batch)
+                    vector_store.add_questions(batch, question_embeddings)
+                    vector_store.add_documents(batch, embeddings)
+                    # The number of new chunks is only known once extraction has finished; no total (and no ETA) before that
+                    progress("processing", len(stored_ids), run["new"] if run["extracted"] else 0)
+
+            if not run["current_ids"]:
+                logger.warning(f"No chunks extracted from {file_path}.")
                 return False
-
-            # 3. Store in the permanent vector database
-            add_success = self.vector_store.add_documents(enriched_chunks, embeddings)
-            logger.info(f"--- RAGService: Finished permanent ingestion for: {file_path}. Success: {add_success} ---")
-            return add_success
+            # Last cancellation point: from here on the manifest is written
+            progress("indexing", len(stored_ids), len(stored_ids))
+
+            # 5. Point duplicates at their canonical chunks and record the new manifest
+            references = {}
+            for chunk in run["duplicate_chunks"]:
+                references.setdefault(run["duplicates"][chunk['chunk_id']], []).append(chunk)
+            vector_store.add_chunk_references(document_name, references)
+            final_ids = list(dict.fromkeys(run["duplicates"].get(chunk_id, chunk_id) for chunk_id in run["current_ids"]))
+            version = vector_store.record_document(document_name, content_hash, final_ids)
+            stored_ids = []  # Recorded in the manifest: no longer rolled back
+
+            # 6. Release chunks that disappeared from the document (shared ones are kept)
+            kept_ids = set(final_ids)
+            stale_ids = [chunk_id for chunk_id in previous_ids if chunk_id not in kept_ids]
+            vector_store.release_chunks(document_name, stale_ids)
+
+            # 7. Refresh the section/document summary vectors used for two-stage retrieval
+            vector_store.rebuild_document_summaries(document_name)
+            counts = {
+                "chunks": len(set(run["current_ids"])), "new": run["new"], "reused": run["reused"],
+                "duplicates": len(run["duplicates"]), "stale": len(stale_ids)
+            }
+            if stats is not None:
+                stats.update(counts)
+            logger.info(f"--- RAGService: '{document_name}': {', '.join(f'{n} {label}' for label, n in counts.items())}. ---")
+            logger.info(f"--- RAGService: Finished permanent ingestion for: {file_path} (version {version}). ---")
+            return True
+        except JobCancelled:
+            self._discard_stored_chunks(vector_store, stored_ids)
+            logger.info(f"--- RAGService: Ingestion of {file_path} cancelled; nothing was recorded. ---")
+            raise
         except Exception as e:
             logger.error(f"Error in process_document for {file_path}: {e}", exc_info=True)
+            self._discard_stored_chunks(vector_store, stored_ids)
             return False
 
+    def _discard_stored_chunks(self, vector_store: VectorStoreService, chunk_ids: List[str]):
+        """Deletes the new chunks of an unfinished ingestion; no manifest references them yet."""
+        if not chunk_ids:
+            return
+        try:
+            vector_store.delete_chunks(chunk_ids)
+            logger.info(f"--- RAGService: Removed {len(chunk_ids)} chunks of the unfinished ingestion. ---")
+        except Exception as e:
+            logger.error(f"--- RAGService: Could not remove {len(chunk_ids)} chunks of an unfinished ingestion: {e} ---", exc_info=True)
+
+    def delete_document(self, document_name: str) -> int:
+        """Removes a document's vectors from the knowledge base. Returns the number of chunks removed."""
+        logger.info(f"--- RAGService: Removing '{document_name}' from the knowledge base. ---")
+        return self.vector_store.delete_document(document_name)
+
     def query(self, question: str, chat_history: List[Dict] = None) -> Dict:
         """Queries the general knowledge base (documents in the vector store)."""
         try:
@@ -182,22 +293,161 @@ class RAGService:
             language = self._detect_language(question)
             
             query_embedding = self.embedding_service.generate_single_embedding(question)
-            search_results = self.vector_store.search(query_embedding, n_results=MAX_CHUNKS_RETRIEVED)
+            # A form number in the query narrows the search to that form's chunks, and keys the cache
+            forms = extract_form_numbers(question)
+
+            use_cache = self.answer_cache is not None and not is_history_dependent(question, chat_history)
+            if use_cache:
+                collection_version = self.vector_store.collection_version
+                cached = self.answer_cache.lookup(query_embedding, language, forms, collection_version)
+                if cached:
+                    return cached
+
+            search_results = self._retrieve(question, query_embedding, forms, language)
             
             context = self._build_context(search_results)
             prompt = self._build_prompt(question, context, search_results, chat_history, language)
             
             response_text = self.llm_client.generate_response(prompt)
             
-            return {
+            result = {
                 "response": response_text,
                 "sources": [r.get("metadata", {}) for r in search_results],
                 "language": language
             }
+            if use_cache:
+                self.answer_cache.store(query_embedding, language, forms, collection_version, result)
+            return result
         except Exception as e:
             logger.error(f"--- RAGService: Error during general query: {e} ---", exc_info=True)
             raise
 
+    def _retrieve(self, question: str, query_embedding: List[float], forms: List[str], language: Optional[str] = None) -> List[Dict]:
+        """Finds the chunks used as context for a knowledge-base question, restricted to `forms` when given."""
+        # With compaction, a wider pool is retrieved and the context builder picks from it
+        n_results = CONTEXT_CANDIDATES if self.context_builder else MAX_CHUNKS_RETRIEVED
+
+        results = self._match_generated_questions(query_embedding, forms, n_results, language) if FAQ_MATCH_ENABLED else []
+        if not results:
+            if self.reranker:
+                # Retrieve a wider candidate set and let the cross-encoder pick the best few
+                candidates = self.vector_store.hydrate(self._search_chunks(query_embedding, max(RERANK_CANDIDATES, n_results), forms, language))
+                results = self.reranker.rerank(question, candidates, top_k=n_results)
+            else:
+                results = self._search_chunks(query_embedding, n_results, forms, language)
+
+            # Chunk text is only loaded for the hits that reach the prompt
+            results = self.vector_store.hydrate(results)
+            if SECTION_EXPANSION_ENABLED:
+                results = self._expand_sections(results)
+
+        if self.context_builder:
+            results = self._compact_context(question, query_embedding, results)
+        return results
+
+    def _compact_context(self, question: str, query_embedding: List[float], results: List[Dict]) -> List[Dict]:
+        """Selects and trims passages for the prompt. Falls back to the top results untrimmed."""
+        try:
+            # Search hits carry their vector; only question matches and expanded sections need a lookup
+            embeddings = {result["id"]: result["embedding"] for result in results if "embedding" in result}
+            embeddings.update(self.vector_store.get_embeddings([result["id"] for result in results if result["id"] not in embeddings]))
+            return self.context_builder.build(question, query_embedding, results, embeddings)
+        except Exception as e:
+            logger.warning(f"--- RAGService: Context compaction failed: {e}. Using the top {MAX_CHUNKS_RETRIEVED} results. ---")
+            return results[:MAX_CHUNKS_RETRIEVED]
+
+    def _search_chunks(self, query_embedding: List[float], n_results: int, forms: List[str], language: Optional[str] = None) -> List[Dict]:
+        """
+        Searches the question's own language first. Chunks in other languages are only
+        considered when fewer than `n_results` same-language hits reach the similarity floor.
+        """
+        if not (LANGUAGE_PARTITIONED_SEARCH and language):
+            return self._search_partition(query_embedding, n_results, forms)
+
+        results = self._search_partition(query_embedding, n_results, forms, language)
+        max_distance = 1.0 - LANGUAGE_FALLBACK_MIN_SIMILARITY
+        if sum(result["distance"] <= max_distance for result in results) >= n_results:
+            return results
+
+        logger.info(f"--- RAGService: Too few close {language} hits. Adding results from all languages. ---")
+        merged = {result["id"]: result for result in self._search_partition(query_embedding, n_results, forms)}
+        merged.update({result["id"]: result for result in results})
+        return sorted(merged.values(), key=lambda result: result["distance"])[:n_results]
+
+    def _search_partition(self, query_embedding: List[float], n_results: int, forms: List[str], language: Optional[str] = None) -> List[Dict]:
+        """Ranks chunks either through the section/document summary index or over the whole collection."""
+        if HIERARCHICAL_RETRIEVAL_ENABLED:
+            return self.vector_store.search_hierarchical(
+                query_embedding,
+                n_results=n_results,
+                n_sections=HIERARCHICAL_TOP_SECTIONS,
+                n_documents=HIERARCHICAL_TOP_DOCUMENTS,
+                forms=forms,
+                language=language
+            )
+        return self.vector_store.search(query_embedding, n_results=n_results, forms=forms, language=language)
+
+    def _expand_sections(self, results: List[Dict]) -> List[Dict]:
+        """
+        When several retrieved chunks come from the same section, replaces them with the
+        whole section (in document order) so the prompt sees it as one coherent passage.
+        """
+        hits_per_section: Dict[str, int] = {}
+        for result in results:
+            section_id = result.get("metadata", {}).get("section_id")
+            if section_id:
+                hits_per_section[section_id] = hits_per_section.get(section_id, 0) + 1
+
+        expanded, seen_sections = [], set()
+        for result in results:
+            section_id = result.get("metadata", {}).get("section_id")
+            if not section_id or hits_per_section[section_id] < SECTION_EXPANSION_MIN_HITS:
+                expanded.append(result)
+                continue
+            if section_id in seen_sections:
+                continue
+            seen_sections.add(section_id)
+
+            section_chunks = self.vector_store.get_section_chunks(section_id)
+            section_text = "\n".join(chunk["metadata"].get("original_content", chunk["content"]) for chunk in section_chunks)
+            if not section_chunks or len(section_text) > SECTION_EXPANSION_MAX_CHARS:
+                expanded.extend(r for r in results if r.get("metadata", {}).get("section_id") == section_id)
+                continue
+
+            metadata = dict(result["metadata"])
+            metadata["original_content"] = section_text
+            metadata["page"] = section_chunks[0]["metadata"].get("page", metadata.get("page"))
+            logger.info(f"--- RAGService: Expanded {hits_per_section[section_id]} sibling hits into section '{metadata.get('header')}'. ---")
+            expanded.append({**result, "content": section_text, "metadata": metadata})
+        return expanded
+
+    def _match_generated_questions(
+        self, query_embedding: List[float], forms: List[str], n_results: int = MAX_CHUNKS_RETRIEVED, language: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Matches the query against the questions generated at ingestion. When a match is
+        close enough, its parent chunks are used directly and the broader search is skipped.
+        Like the chunk search, only questions of chunks in the question's language are matched;
+        without a confident match the broader search applies its cross-language fallback.
+        """
+        language = language if LANGUAGE_PARTITIONED_SEARCH else None
+        hits = self.vector_store.search_questions(query_embedding, n_results=FAQ_MATCH_CANDIDATES, forms=forms, language=language)
+        confident = [hit for hit in hits if hit["distance"] <= FAQ_MATCH_MAX_DISTANCE]
+        if not confident:
+            return []
+
+        # Several questions often point at the same chunk; keep each parent once, at its best distance
+        parent_distances = {}
+        for hit in confident:
+            parent_distances.setdefault(hit["parent_id"], hit["distance"])
+        parent_ids = list(parent_distances)[:n_results]
+
+        results = self.vector_store.get_chunks(parent_ids)
+        for result in results:
+            result["distance"] = parent_distances[result["id"]]
+        logger.info(f"--- RAGService: Question-to-question match (distance {confident[0]['distance']:.3f}) selected {len(results)} chunks. Skipping broad search. ---")
+        return results
+
     def determine_conversational_mode(self, query: str) -> str:
         """
         Uses a simplified, rule-based prompt to classify the query's intent
@@ -226,28 +476,76 @@ class RAGService:
             logger.error(f"Error in determining conversational mode: {e}", exc_info=True)
             return "GENERAL_QA" # Default to general on error
 
-    def _process_and_enrich_chunks(self, file_path: str) -> List[Dict]:
-        """Internal method to handle Document AI chunking and question enrichment."""
-        chunks = self.doc_processor.process_pdf(file_path)
-        if not chunks:
-            logger.warning(f"No chunks extracted from {file_path}.")
-            return []
-
-        enriched_chunks = []
-        for chunk in chunks:
+    def _iter_chunks(self, file_path: str) -> Iterator[Dict]:
+        """Pipeline source: streams the document's chunks with their metadata."""
+        document_name = os.path.basename(file_path)
+        document_forms = extract_form_numbers(document_name)
+        for chunk in self.doc_processor.iter_chunks(self.doc_processor.iter_blocks(file_path), document_name):
             original_content = chunk["content"]
-            enriched_content = original_content
-            if chunk.get("questions"):
-                questions_text = " ".join(chunk["questions"])
-                enriched_content += f"\n\nRelated questions: {questions_text}"
-            
             chunk['original_content'] = original_content
-            chunk['content'] = enriched_content
-            chunk['source'] = chunk.get('document_name', os.path.basename(file_path))
-            
-            enriched_chunks.append(chunk)
-            
-        return enriched_chunks
+            chunk['source'] = chunk.get('document_name', document_name)
+            chunk['language'] = detect_text_language(original_content)
+            chunk['forms'] = sorted(set(document_forms) | set(extract_form_numbers(f"{chunk.get('header', '')}\n{original_content}")))
+            yield chunk
+
+    def _select_new_chunks(self, vector_store: VectorStoreService, document_name: str, chunks: Iterator[Dict], run: Dict) -> Iterator[List[Dict]]:
+        """
+        Pipeline stage: assigns content-hash ids and passes on, in batches, the chunks that
+        are neither stored already nor near-duplicates. Chunks an interrupted run stored
+        without recording them are reused as they are. Every id of the new version and the
+        duplicates are recorded in `run`. Stored chunks of this document that have not come
+        up yet may still be released, so they cannot serve as canonical chunks.
+        """
+        seen = set()
+        near_duplicates = NearDuplicateIndex()
+        for batch in batched(chunks, INGESTION_PIPELINE_BATCH_SIZE):
+            new_chunks = []
+            for chunk in batch:
+                chunk['chunk_id'] = make_chunk_id(chunk)
+                run["current_ids"].append(chunk['chunk_id'])
+                if chunk['chunk_id'] in seen:
+                    continue  # Repeated within the document
+                seen.add(chunk['chunk_id'])
+                if chunk['chunk_id'] not in run["previous_ids"]:
+                    new_chunks.append(chunk)
+                elif chunk['chunk_id'] not in run["recorded_ids"]:
+                    run["reused"] += 1  # Found by its 'source' metadata, not in the manifest
+            reused = vector_store.existing_chunk_ids([chunk['chunk_id'] for chunk in new_chunks])
+            if reused:
+                run["reused"] += len(reused)
+                new_chunks = [chunk for chunk in new_chunks if chunk['chunk_id'] not in reused]
+
+            duplicates = vector_store.match_near_duplicates(document_name, new_chunks, run["releasable_ids"] - seen, near_duplicates)
+            run["duplicates"].update(duplicates)
+            run["duplicate_chunks"].extend(
+                {"chunk_id": chunk['chunk_id'], "page": chunk['page'], "forms": chunk['forms']}
+                for chunk in new_chunks if chunk['chunk_id'] in duplicates
+            )
+            unique_chunks = [chunk for chunk in new_chunks if chunk['chunk_id'] not in duplicates]
+            run["new"] += len(unique_chunks)
+            if unique_chunks:
+                yield unique_chunks
+        run["extracted"] = True
+
+    def _enrich_batches(self, batches: Iterator[List[Dict]]) -> Iterator[List[Dict]]:
+        """Pipeline stage: generates the questions of each batch and builds the text that is embedded."""
+        for batch in batches:
+            # A cancelled job drops the question calls that have not started yet
+            self.doc_processor.generate_questions(batch, progress=lambda done, total: check_stopped())
+            for chunk in batch:
+                chunk['content'] = enrich_content(chunk['original_content'], chunk.get("questions", []))
+            yield batch
+
+    def _embed_batches(self, batches: Iterator[List[Dict]]) -> Iterator[Tuple[List[Dict], List[List[float]], List[List[float]]]]:
+        """Pipeline stage: embeds each batch's chunks and their generated questions."""
+        for batch in batches:
+            embeddings = self.embedding_service.generate_embeddings([chunk['content'] for chunk in batch])
+            if not embeddings or len(embeddings) != len(batch):
+                raise ValueError("Embedding generation failed or mismatched.")
+            questions = [q for chunk in batch for q in chunk.get('questions', [])]
+            check_stopped()
+            question_embeddings = self.embedding_service.generate_embeddings(questions) if questions else []
+            yield batch, embeddings, question_embeddings
 
     def _detect_language(self, text: str) -> str:
         """
@@ -273,20 +571,13 @@ class RAGService:
 
     def _build_context(self, search_results: List[Dict]) -> str:
         """Builds a string context from search results for the LLM prompt."""
-        return "\n\n".join([result.get('original_content', result.get('content', '')) for result in search_results])
+        return "\n\n".join(result.get("excerpt") or passage_text(result) for result in search_results)
 
     def _build_prompt(self, question: str, context: str, search_results: List[Dict], chat_history: List[Dict], language: str) -> str:
         """Builds the final prompt for the LLM, including numbered source citations."""
         try:
-            numbered_context = []
-            for i, result in enumerate(search_results, 1):
-                content = result.get('original_content', result.get('content', ''))
-                source = result.get('source', 'Unknown')
-                page = result.get('page', 'N/A')
-                numbered_context.append(f"[{i}] {content}\nSource: {source}, page {page}")
-            
-            context_with_sources = "\n\n".join(numbered_context)
-            
+            context_with_sources = format_context(search_results)
+
             history_text = self._format_chat_history(chat_history)
             system_message = get_system_prompt(language)
             template = get_prompt_template(language)
@@ -0,0 +1,112 @@
+# Path: app/services/reranker.py
+
+from sentence_transformers import CrossEncoder
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+from app.core.config import (
+    RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_CACHE_SIZE,
+    RERANK_LATENCY_BUDGET_MS, RERANK_MAX_CONCURRENT, RERANK_PROBE_INTERVAL
+)
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class RerankerService:
+    """
+    Re-scores retrieved chunks against the query with a small local cross-encoder.
+    Scores are cached per (query, chunk id), and the stage backs off when the
+    observed latency exceeds the budget or too many reranks are already running.
+    """
+    def __init__(self):
+        try:
+            self.model = CrossEncoder(RERANK_MODEL, device="cpu")
+            logger.info(f"--- RerankerService: Loaded cross-encoder '{RERANK_MODEL}'. ---")
+        except Exception as e:
+            raise Exception(f"Failed to load reranking model: {str(e)}")
+
+        self._score_cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._avg_latency_ms = 0.0
+        self._skipped_since_probe = 0
+
+    def rerank(self, query: str, results: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Returns the `top_k` results ordered by cross-encoder score. Falls back to the
+        original vector ranking when reranking is skipped or fails.
+        """
+        if len(results) <= 1:
+            return results[:top_k]
+        if not self._acquire_slot():
+            logger.info("--- RerankerService: Over latency budget or concurrency limit. Skipping rerank. ---")
+            return results[:top_k]
+
+        start = time.perf_counter()
+        try:
+            scores = self._score(query, results)
+            ranked = sorted(zip(scores, range(len(results))), key=lambda pair: -pair[0])
+            reranked = []
+            for score, i in ranked[:top_k]:
+                result = dict(results[i])
+                result["rerank_score"] = score
+                reranked.append(result)
+            return reranked
+        except Exception as e:
+            logger.error(f"--- RerankerService: Reranking failed, keeping vector order: {e} ---", exc_info=True)
+            return results[:top_k]
+        finally:
+            self._release_slot((time.perf_counter() - start) * 1000)
+
+    def _score(self, query: str, results: List[Dict]) -> List[float]:
+        """Scores all uncached (query, chunk) pairs in a single batched forward pass."""
+        keys = [(query, result.get("id") or self._chunk_text(result)) for result in results]
+        scores: List[float] = [None] * len(results)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._score_cache:
+                    self._score_cache.move_to_end(key)
+                    scores[i] = self._score_cache[key]
+                else:
+                    missing.append(i)
+
+        if missing:
+            pairs = [(query, self._chunk_text(results[i])) for i in missing]
+            predicted = self.model.predict(pairs, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._score_cache[keys[i]] = scores[i]
+                while len(self._score_cache) > RERANK_CACHE_SIZE:
+                    self._score_cache.popitem(last=False)
+        return scores
+
+    def _chunk_text(self, result: Dict) -> str:
+        metadata = result.get("metadata", {})
+        return metadata.get("original_content") or result.get("content", "")
+
+    def _acquire_slot(self) -> bool:
+        """Admits a rerank unless the stage is saturated or consistently over budget."""
+        with self._lock:
+            if self._in_flight >= RERANK_MAX_CONCURRENT:
+                return False
+            if self._avg_latency_ms > RERANK_LATENCY_BUDGET_MS:
+                # Let an occasional request through so the average can recover
+                self._skipped_since_probe += 1
+                if self._skipped_since_probe < RERANK_PROBE_INTERVAL:
+                    return False
+                self._skipped_since_probe = 0
+            self._in_flight += 1
+            return True
+
+    def _release_slot(self, elapsed_ms: float):
+        with self._lock:
+            self._in_flight -= 1
+            # Exponential moving average of the observed rerank latency
+            if self._avg_latency_ms == 0.0:
+                self._avg_latency_ms = elapsed_ms
+            else:
+                self._avg_latency_ms = 0.8 * self._avg_latency_ms + 0.2 * elapsed_ms
+        logger.debug(f"--- RerankerService: Rerank took {elapsed_ms:.0f} ms (avg {self._avg_latency_ms:.0f} ms). ---")
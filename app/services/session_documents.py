@@ -0,0 +1,124 @@
+# Path: app/services/session_documents.py
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+import zstandard
+
+from app.core.config import SESSION_DOCUMENT_ZSTD_LEVEL
+from app.services.document_text import PagedText
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionDocument:
+    content_hash: str
+    compressed_text: bytes
+    page_offsets: List[int]
+    summary: str
+    text_length: int
+    sessions: Set[str] = field(default_factory=set)
+
+    def paged_text(self) -> PagedText:
+        return PagedText(zstandard.ZstdDecompressor().decompress(self.compressed_text).decode("utf-8"), self.page_offsets)
+
+
+class SessionDocumentStore:
+    """
+    Content-addressed store of the documents uploaded to chat sessions. Each distinct
+    file (by SHA-256) is extracted and summarized once, however many sessions upload it,
+    and its text is kept once, zstd-compressed. Sessions hold only the content hash; a
+    document is evicted as soon as no session references it. Concurrent uploads of the
+    same file wait for a single build. Used from the event loop only.
+    """
+    def __init__(self, zstd_level: int = SESSION_DOCUMENT_ZSTD_LEVEL):
+        self.zstd_level = zstd_level
+        self._documents: Dict[str, SessionDocument] = {}
+        self._building: Dict[str, asyncio.Future] = {}
+        self._waiting: Dict[str, int] = {}  # Requests awaiting each build; a build nobody waits for any more is not kept
+
+    async def acquire(
+        self, content_hash: str, session_id: str, build: Callable[[], Awaitable[Tuple[PagedText, str]]]
+    ) -> SessionDocument:
+        """
+        Returns the document with this content hash, referenced by `session_id`. When it
+        is not stored or being built yet, `build()` is called right away and its result
+        awaited for the page-indexed text and summary. That build runs to completion even
+        if this request goes away, so whatever it needs must belong to it, not to the request.
+        """
+        document = self._documents.get(content_hash)
+        if document is not None:
+            logger.info(f"--- SessionDocumentStore: Reusing document {content_hash[:12]} for session {session_id}. ---")
+        else:
+            pending = self._building.get(content_hash)
+            if pending is None:
+                pending = asyncio.ensure_future(self._build(content_hash, build()))
+                self._building[content_hash] = pending
+            self._waiting[content_hash] = self._waiting.get(content_hash, 0) + 1
+            try:
+                # Shielded: one waiting request going away must not cancel the build for the others
+                document = await asyncio.shield(pending)
+            except BaseException:
+                self._stop_waiting(content_hash)
+                self._evict_if_unused(content_hash)
+                raise
+            self._stop_waiting(content_hash)
+        document = self._documents.setdefault(content_hash, document)
+        document.sessions.add(session_id)
+        return document
+
+    async def _build(self, content_hash: str, building: Awaitable[Tuple[PagedText, str]]) -> SessionDocument:
+        try:
+            paged, summary = await building
+            compressed = zstandard.ZstdCompressor(level=self.zstd_level).compress(paged.text.encode("utf-8"))
+            document = SessionDocument(
+                content_hash=content_hash, compressed_text=compressed, page_offsets=paged.page_offsets,
+                summary=summary, text_length=len(paged.text)
+            )
+            if not self._waiting.get(content_hash):
+                logger.info(f"--- SessionDocumentStore: Dropped document {content_hash[:12]}, every request for it went away. ---")
+                return document
+            self._documents[content_hash] = document
+            logger.info(f"--- SessionDocumentStore: Stored document {content_hash[:12]} ({document.text_length} chars, {len(compressed)} bytes compressed). ---")
+            return document
+        finally:
+            self._building.pop(content_hash, None)
+
+    def _stop_waiting(self, content_hash: str):
+        remaining = self._waiting.get(content_hash, 0) - 1
+        if remaining > 0:
+            self._waiting[content_hash] = remaining
+        else:
+            self._waiting.pop(content_hash, None)
+
+    def _evict_if_unused(self, content_hash: str):
+        """Drops a built document that no session took up because its requests were cancelled."""
+        document = self._documents.get(content_hash)
+        if document is not None and not document.sessions and not self._waiting.get(content_hash):
+            del self._documents[content_hash]
+            logger.info(f"--- SessionDocumentStore: Evicted document {content_hash[:12]}, its requests went away. ---")
+
+    def get(self, content_hash: str) -> SessionDocument:
+        return self._documents[content_hash]
+
+    def release(self, content_hash: str, session_id: str):
+        """Drops the session's reference; the document is evicted when it was the last one."""
+        document = self._documents.get(content_hash)
+        if document is None:
+            return
+        document.sessions.discard(session_id)
+        if not document.sessions:
+            del self._documents[content_hash]
+            logger.info(f"--- SessionDocumentStore: Evicted document {content_hash[:12]}, no session uses it. ---")
+
+    def stats(self) -> Dict[str, int]:
+        documents = list(self._documents.values())
+        return {
+            "documents": len(documents),
+            "references": sum(len(d.sessions) for d in documents),
+            "text_chars": sum(d.text_length for d in documents),
+            "compressed_bytes": sum(len(d.compressed_text) for d in documents),
+        }
@@ -1,112 +1,983 @@
 # Path: app/services/vectorstore.py
 
-import chromadb
-from typing import List, Dict
-from app.core.config import CHROMA_PERSIST_DIR, COLLECTION_NAME, DEFAULT_HEADER_TEXT
+from typing import List, Dict, Optional, Set, Tuple
+from app.core.config import (
+    CHROMA_PERSIST_DIR, DEFAULT_HEADER_TEXT, ALIAS_REFRESH_SECONDS, VECTORSTORE_SCAN_BATCH_SIZE, COMPACT_STORAGE_ENABLED,
+    NEAR_DUPLICATE_ENABLED, NEAR_DUPLICATE_THRESHOLD, NEAR_DUPLICATE_MIN_LENGTH, CONTEXT_COMPACTION_ENABLED
+)
+from app.services.chroma_client import create_chroma_client
+from app.services.chunk_store import ChunkContentStore, enrich_content
+from app.services.form_index import FormIndex, parse_forms_metadata
+from app.services.manifest_service import DocumentManifestService
+from app.services.near_duplicates import MinHasher, NearDuplicateIndex, fact_key, format_reference, parse_references
+from app.services.collection_alias import (
+    CollectionAliasStore, collection_names, manifest_db_path, content_db_path
+)
+from app.core.hashing import sha256_text
+import numpy as np
+import functools
+import threading
+import os
 import re
+import time
 import logging
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+def make_chunk_id(chunk: Dict) -> str:
+    """
+    Builds a content-hash chunk id. Unchanged chunks keep their id across
+    re-ingestions, so re-uploading a document only touches what changed.
+    """
+    document_name = chunk.get("document_name", "doc")
+    fingerprint = "\x1f".join([
+        document_name,
+        str(chunk.get("page", 0)),
+        chunk.get("header", DEFAULT_HEADER_TEXT),
+        chunk.get("original_content", chunk["content"])
+    ])
+    return f"{document_name}_{sha256_text(fingerprint)[:16]}"
+
+def fuse_search_results(result_lists: List[List[Dict]], n_results: int = 3, strategy: str = "rrf", rrf_k: int = 60) -> List[Dict]:
+    """
+    Merges the per-query lists returned by `VectorStoreService.search_many`.
+
+    - "rrf": reciprocal rank fusion; chunks found by several queries rise to the top.
+    - "dedupe": keeps each chunk once, at its best (smallest) distance.
+    """
+    best: Dict[str, Dict] = {}
+    scores: Dict[str, float] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            chunk_id = result["id"]
+            if chunk_id not in best or result["distance"] < best[chunk_id]["distance"]:
+                best[chunk_id] = result
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+    if strategy == "rrf":
+        ranked_ids = sorted(best, key=lambda chunk_id: (-scores[chunk_id], best[chunk_id]["distance"]))
+    elif strategy == "dedupe":
+        ranked_ids = sorted(best, key=lambda chunk_id: best[chunk_id]["distance"])
+    else:
+        raise ValueError(f"Unknown fusion strategy: {strategy}")
+    return [best[chunk_id] for chunk_id in ranked_ids[:n_results]]
+
+class IndexGeneration:
+    """
+    The collections, side databases and in-memory indexes of one index generation.
+    VectorStoreService swaps this object as a whole when the alias moves, so a call never
+    mixes the collection of one generation with the manifest of another. A generation
+    that was swapped out closes its SQLite handles once the last call using it returns.
+    The in-memory indexes (forms, near-duplicate signatures, summarized documents) are
+    reloaded when another process changed the collection version since they were loaded.
+    """
+    def __init__(self, client, generation: str):
+        names = collection_names(generation)
+        self.generation = generation
+        self.collection_name = names["chunks"]
+        self.collection = client.get_or_create_collection(
+            name=names["chunks"],
+            metadata={"hnsw:space": "cosine"} # Using cosine distance for semantic similarity
+        )
+        # One vector per generated question, pointing back to its parent chunk
+        self.questions_collection = client.get_or_create_collection(
+            name=names["questions"],
+            metadata={"hnsw:space": "cosine"}
+        )
+        # Section- and document-level summary vectors for two-stage retrieval
+        self.sections_collection = client.get_or_create_collection(
+            name=names["sections"],
+            metadata={"hnsw:space": "cosine"}
+        )
+        logger.info(f"--- VectorStoreService: Initialized ChromaDB client and collection '{self.collection_name}'. ---")
+        self.manifest = DocumentManifestService(manifest_db_path(generation))
+        # In compact mode chunk text lives only in the side store and is fetched for the final hits
+        self.content_store = ChunkContentStore(content_db_path(generation)) if COMPACT_STORAGE_ENABLED else None
+        self.chunk_query_fields = ["metadatas", "distances"] if self.content_store else ["metadatas", "documents", "distances"]
+        if CONTEXT_COMPACTION_ENABLED:
+            # The context builder compares the retrieved chunks; returning their vectors saves a second lookup
+            self.chunk_query_fields.append("embeddings")
+        self.indexed_version = self.manifest.get_collection_version()
+        self._load_indexes()
+        self._users = 0
+        self._retired = False
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def _load_indexes(self):
+        # Built aside and then assigned, so concurrent calls keep using the previous ones meanwhile
+        self.form_index = self._load_form_index()
+        self.near_duplicates = self._load_duplicate_index() if NEAR_DUPLICATE_ENABLED else None
+        self.summarized_documents = self._load_summarized_documents()
+
+    def refresh_indexes(self):
+        """
+        Reloads the in-memory indexes when another process (an ingestion script, another
+        worker) recorded or removed documents since they were loaded.
+        """
+        if self.manifest.get_collection_version() == self.indexed_version:
+            return
+        with self._reload_lock:
+            version = self.manifest.get_collection_version()
+            if version == self.indexed_version:
+                return
+            logger.info(f"--- VectorStoreService: Collection changed by another process (version {version}). Reloading indexes. ---")
+            self._load_indexes()
+            self.indexed_version = version
+
+    def note_own_changes(self, version_before: int, bumps: int = 1):
+        """
+        Keeps the indexes marked current after this process bumped the collection version
+        `bumps` times, having updated them itself. Any other bump in between still reloads them.
+        """
+        if version_before == self.indexed_version and self.manifest.get_collection_version() == version_before + bumps:
+            self.indexed_version = version_before + bumps
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            close = self._retired and self._users == 0
+        if close:
+            self._close()
+
+    def retire(self):
+        """Marks the generation as swapped out; its handles are closed when no call uses it any more."""
+        with self._lock:
+            self._retired = True
+            close = self._users == 0
+        if close:
+            self._close()
+
+    def _close(self):
+        self.manifest.close()
+        if self.content_store:
+            self.content_store.close()
+        logger.info(f"--- VectorStoreService: Closed generation '{self.generation or 'base'}'. ---")
+
+    def _load_duplicate_index(self) -> NearDuplicateIndex:
+        """Loads the stored near-duplicate signatures into an LSH index."""
+        near_duplicates = NearDuplicateIndex()
+        for chunk_id, signature, facts in self.manifest.get_signatures():
+            near_duplicates.add(chunk_id, np.frombuffer(signature, dtype=np.uint32), facts)
+        logger.info(f"--- VectorStoreService: Near-duplicate index holds {len(near_duplicates)} chunk signatures. ---")
+        return near_duplicates
+
+    def _load_form_index(self) -> FormIndex:
+        """Loads the form-number index from the metadata of every stored chunk."""
+        form_index = FormIndex()
+        offset = 0
+        while True:
+            page = self.collection.get(
+                limit=VECTORSTORE_SCAN_BATCH_SIZE,
+                offset=offset,
+                include=["metadatas"]
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            for chunk_id, metadata in zip(ids, page.get("metadatas") or []):
+                form_index.add(chunk_id, parse_forms_metadata((metadata or {}).get("forms", "")))
+            offset += len(ids)
+        logger.info(f"--- VectorStoreService: Form index loaded with {len(form_index)} forms from {offset} chunks. ---")
+        return form_index
+
+    def _load_summarized_documents(self) -> Set[str]:
+        """Names of the documents that have a document summary vector."""
+        stored = self.sections_collection.get(where={"level": "document"}, include=["metadatas"])
+        return {(metadata or {}).get("source") for metadata in stored["metadatas"] or []} - {None}
+
+
+def _one_generation(method):
+    """Runs a VectorStoreService method, and the service calls it makes, against a single index generation."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._using_generation():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class VectorStoreService:
     """
     Manages all interactions with the ChromaDB vector store, including adding
     documents with rich metadata and performing similarity searches.
     """
-    def __init__(self):
+    def __init__(self, generation: Optional[str] = None):
+        """
+        Opens the index generation that the alias currently points at. Passing an explicit
+        `generation` pins the service to it, e.g. to build a new index in the background.
+        """
         try:
-            self.client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
-            self.collection = self.client.get_or_create_collection(
-                name=COLLECTION_NAME,
-                metadata={"hnsw:space": "cosine"} # Using cosine distance for semantic similarity
-            )
-            logger.info(f"--- VectorStoreService: Initialized ChromaDB client and collection '{COLLECTION_NAME}'. ---")
+            self.client = create_chroma_client(CHROMA_PERSIST_DIR)
+            self.alias_store = CollectionAliasStore()
+            self.minhasher = MinHasher()
+            self._pinned = generation is not None
+            self._alias_checked_at = time.monotonic()
+            self._alias_mtime = self.alias_store.mtime()
+            self._lock = threading.Lock()
+            self._local = threading.local()
+            self._state = IndexGeneration(self.client, generation if generation is not None else self.alias_store.get_active())
         except Exception as e:
             logger.error(f"--- VectorStoreService: Failed to initialize ChromaDB: {e} ---", exc_info=True)
             raise
 
+    # The generation a call runs against: the one its thread holds, otherwise the current one
+    def _current(self) -> IndexGeneration:
+        return getattr(self._local, "state", None) or self._state
+
+    generation = property(lambda self: self._current().generation)
+    collection_name = property(lambda self: self._current().collection_name)
+    collection = property(lambda self: self._current().collection)
+    questions_collection = property(lambda self: self._current().questions_collection)
+    sections_collection = property(lambda self: self._current().sections_collection)
+    manifest = property(lambda self: self._current().manifest)
+    content_store = property(lambda self: self._current().content_store)
+    form_index = property(lambda self: self._current().form_index)
+    near_duplicates = property(lambda self: self._current().near_duplicates)
+    summarized_documents = property(lambda self: self._current().summarized_documents)
+    _chunk_query_fields = property(lambda self: self._current().chunk_query_fields)
+
+    @contextmanager
+    def _using_generation(self):
+        """
+        Holds one generation for the duration of a call. Nested service calls on the same
+        thread reuse it, and an alias swap in the meantime only affects later calls.
+        """
+        held = getattr(self._local, "state", None)
+        if held is not None:
+            yield held
+            return
+        # Follows an alias swap or rollback made by another worker or process
+        self._refresh_generation()
+        with self._lock:
+            state = self._state
+            state.acquire()
+        self._local.state = state
+        try:
+            state.refresh_indexes()
+            yield state
+        finally:
+            self._local.state = None
+            state.release()
+
+    def _switch_generation(self, generation: str):
+        """Opens `generation` and swaps it in with a single reference assignment."""
+        state = IndexGeneration(self.client, generation)
+        with self._lock:
+            previous, self._state = self._state, state
+        previous.retire()
+
+    def _refresh_generation(self):
+        """Follows an alias swap made by another process, checking at most every ALIAS_REFRESH_SECONDS."""
+        with self._lock:
+            if self._pinned or time.monotonic() - self._alias_checked_at < ALIAS_REFRESH_SECONDS:
+                return
+            self._alias_checked_at = time.monotonic()
+            mtime = self.alias_store.mtime()
+            if mtime == self._alias_mtime:
+                return
+            self._alias_mtime = mtime
+            active = self.alias_store.get_active()
+            if active == self._state.generation:
+                return
+        logger.info(f"--- VectorStoreService: Alias moved to generation '{active or 'base'}'. Reopening. ---")
+        self._switch_generation(active)
+
+    def activate_generation(self, generation: str) -> str:
+        """Atomically points reads at `generation` and switches this service to it. Returns the previous generation."""
+        previous = self.alias_store.swap(generation)
+        with self._lock:
+            self._alias_mtime = self.alias_store.mtime()
+            switch = not self._pinned and generation != self._state.generation
+        if switch:
+            self._switch_generation(generation)
+        return previous
+
+    def drop_generation(self, generation: str):
+        """Deletes the collections and side databases of an inactive generation."""
+        if generation == self.alias_store.get_active():
+            raise ValueError(f"Generation '{generation or 'base'}' is active and cannot be dropped.")
+        existing = {c.name if hasattr(c, "name") else c for c in self.client.list_collections()}
+        for name in collection_names(generation).values():
+            if name in existing:
+                self.client.delete_collection(name=name)
+        for path in (manifest_db_path(generation), content_db_path(generation)):
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info(f"--- VectorStoreService: Dropped generation '{generation or 'base'}'. ---")
+
+    @property
+    def collection_version(self) -> str:
+        """Changes whenever documents are ingested or deleted, or another generation becomes active."""
+        with self._using_generation() as state:
+            return f"{state.generation or 'base'}:{state.manifest.get_collection_version()}"
+
+    @_one_generation
     def add_documents(self, chunks: List[Dict], embeddings: List[List[float]]) -> bool:
-        """Adds a list of chunks and their embeddings to the vector store."""
+        """Upserts a list of chunks and their embeddings into the vector store."""
         try:
-            # Create a unique and descriptive ID for each chunk
-            ids = [
-                f"{chunk.get('document_name', 'doc')}_p{chunk.get('page', 0)}_{i}"
-                for i, chunk in enumerate(chunks)
-            ]
-            
-            documents = [chunk["content"] for chunk in chunks]
+            ids = [chunk.get("chunk_id") or make_chunk_id(chunk) for chunk in chunks]
             
             metadatas = [{
                 "page": str(chunk.get("page", "N/A")),
                 "source": chunk.get("source", "Unknown"),
                 "header": chunk.get("header", DEFAULT_HEADER_TEXT),
-                "questions": "|".join(chunk.get("questions", [])),
-                "original_content": chunk.get("original_content", chunk["content"])
+                "forms": "|".join(chunk.get("forms", [])),
+                "section_id": chunk.get("section_id", ""),
+                "chunk_index": int(chunk.get("chunk_index", 0)),
+                "language": chunk.get("language", "")
             } for chunk in chunks]
+
+            if self.content_store:
+                self.content_store.put_many({
+                    chunk_id: {
+                        "original_content": chunk.get("original_content", chunk["content"]),
+                        "questions": chunk.get("questions", [])
+                    }
+                    for chunk_id, chunk in zip(ids, chunks)
+                })
+                # Empty documents also clear any text left by a pre-compact version of the chunk
+                documents = [""] * len(chunks)
+                for metadata in metadatas:
+                    metadata.update({"questions": None, "original_content": None})
+            else:
+                documents = [chunk["content"] for chunk in chunks]
+                for metadata, chunk in zip(metadatas, chunks):
+                    metadata["questions"] = "|".join(chunk.get("questions", []))
+                    metadata["original_content"] = chunk.get("original_content", chunk["content"])
             
-            self.collection.add(
+            self.collection.upsert(
                 embeddings=embeddings,
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
             )
-            logger.info(f"--- VectorStoreService: Added {len(chunks)} documents to collection '{COLLECTION_NAME}'. ---")
+            for chunk_id, chunk in zip(ids, chunks):
+                self.form_index.add(chunk_id, chunk.get("forms", []))
+            signatures = {
+                chunk_id: (chunk["signature"], chunk["facts"]) for chunk_id, chunk in zip(ids, chunks) if chunk.get("signature") is not None
+            }
+            if signatures and self.near_duplicates is not None:
+                self.manifest.put_signatures({chunk_id: (signature.tobytes(), facts) for chunk_id, (signature, facts) in signatures.items()})
+                for chunk_id, (signature, facts) in signatures.items():
+                    self.near_duplicates.add(chunk_id, signature, facts)
+            logger.info(f"--- VectorStoreService: Upserted {len(chunks)} documents into collection '{self.collection_name}'. ---")
             return True
         except Exception as e:
             logger.error(f"--- VectorStoreService: Failed to add documents: {e} ---", exc_info=True)
             raise
 
-    def search(self, query_embedding: List[float], n_results: int = 3) -> List[Dict]:
-        """Performs a similarity search in the vector store."""
+    @_one_generation
+    def add_questions(self, chunks: List[Dict], question_embeddings: List[List[float]]) -> int:
+        """
+        Stores one vector per generated question of the given chunks. `question_embeddings`
+        must follow the order of the chunks' questions, flattened. Returns the number stored.
+        """
+        ids, documents, metadatas = [], [], []
+        for chunk in chunks:
+            parent_id = chunk.get("chunk_id") or make_chunk_id(chunk)
+            for i, question in enumerate(chunk.get("questions", [])):
+                ids.append(f"{parent_id}_q{i}")
+                documents.append(question)
+                metadatas.append({"parent_id": parent_id, "source": chunk.get("source", "Unknown"), "language": chunk.get("language", "")})
+        if not ids:
+            return 0
+        if len(ids) != len(question_embeddings):
+            raise ValueError(f"Expected {len(ids)} question embeddings, got {len(question_embeddings)}.")
+        try:
+            self.questions_collection.upsert(
+                embeddings=question_embeddings,
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids
+            )
+            logger.info(f"--- VectorStoreService: Upserted {len(ids)} question vectors. ---")
+            return len(ids)
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to add question vectors: {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def is_document_current(self, document_name: str, content_hash: str) -> bool:
+        """True if the document was already ingested from a file with the same content hash."""
+        entry = self.manifest.get_document(document_name)
+        return bool(entry and entry["content_hash"] == content_hash)
+
+    @_one_generation
+    def get_document_chunk_ids(self, document_name: str) -> List[str]:
+        """
+        Returns the chunk ids stored for a document: those in its manifest, in document
+        order, then any other chunk whose 'source' metadata names it. The latter are the
+        chunks of documents ingested before the manifest existed, and chunks a killed run
+        stored without recording them.
+        """
+        chunk_ids = self.manifest.get_chunk_ids(document_name)
+        recorded = set(chunk_ids)
+        by_source = self.collection.get(where={"source": document_name}, include=[])
+        return chunk_ids + [chunk_id for chunk_id in by_source.get("ids") or [] if chunk_id not in recorded]
+
+    @_one_generation
+    def existing_chunk_ids(self, chunk_ids: List[str]) -> Set[str]:
+        """The given chunk ids that are in the collection, e.g. stored by an interrupted ingestion."""
+        if not chunk_ids:
+            return set()
+        return set(self.collection.get(ids=list(chunk_ids), include=[])["ids"])
+
+    @_one_generation
+    def diff_document(self, document_name: str, chunks: List[Dict]) -> Tuple[List[Dict], List[str]]:
+        """
+        Assigns content-hash ids to a document's freshly processed chunks and compares
+        them with what is stored. Returns the chunks that still need to be embedded and
+        stored, and the ids of stored chunks that no longer exist in the document.
+        """
+        unique_chunks = {}
+        for chunk in chunks:
+            chunk["chunk_id"] = make_chunk_id(chunk)
+            unique_chunks.setdefault(chunk["chunk_id"], chunk)
+        if len(unique_chunks) < len(chunks):
+            logger.info(f"--- VectorStoreService: Dropped {len(chunks) - len(unique_chunks)} repeated chunks in '{document_name}'. ---")
+
+        stored_ids = set(self.get_document_chunk_ids(document_name))
+        new_chunks = [chunk for chunk_id, chunk in unique_chunks.items() if chunk_id not in stored_ids]
+        stale_ids = sorted(stored_ids - set(unique_chunks))
+        logger.info(f"--- VectorStoreService: '{document_name}' diff: {len(new_chunks)} new, {len(stale_ids)} stale, {len(unique_chunks) - len(new_chunks)} unchanged chunks. ---")
+        return new_chunks, stale_ids
+
+    @_one_generation
+    def record_document(self, document_name: str, content_hash: str, chunk_ids: List[str]) -> int:
+        """Stores the document's chunk manifest once its chunks are in the collection."""
+        version_before = self.manifest.get_collection_version()
+        version = self.manifest.record_document(document_name, content_hash, list(dict.fromkeys(chunk_ids)))
+        self._current().note_own_changes(version_before)
+        return version
+
+    @_one_generation
+    def delete_chunks(self, chunk_ids: List[str]):
+        """Removes the given chunks from the collection in a single batched call."""
+        if not chunk_ids:
+            return
+        try:
+            self.collection.delete(ids=list(chunk_ids))
+            self.questions_collection.delete(where={"parent_id": {"$in": list(chunk_ids)}})
+            if self.content_store:
+                self.content_store.delete_many(chunk_ids)
+            self.form_index.remove(chunk_ids)
+            if self.near_duplicates is not None:
+                self.manifest.delete_signatures(list(chunk_ids))
+                self.near_duplicates.remove(chunk_ids)
+            logger.info(f"--- VectorStoreService: Deleted {len(chunk_ids)} chunks from collection '{self.collection_name}'. ---")
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to delete chunks: {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def exclusive_chunk_ids(self, document_name: str, own_ids: Optional[List[str]] = None) -> Set[str]:
+        """
+        Stored chunks of the document that no other document references; they are deleted
+        if its new version drops them. `own_ids` defaults to get_document_chunk_ids.
+        """
+        own_ids = self.get_document_chunk_ids(document_name) if own_ids is None else own_ids
+        references = self.manifest.get_chunk_references(own_ids)
+        return {chunk_id for chunk_id in own_ids if references.get(chunk_id, [document_name]) == [document_name]}
+
+    @_one_generation
+    def match_near_duplicates(
+        self, document_name: str, chunks: List[Dict], exclude: Set[str], batch: Optional[NearDuplicateIndex] = None
+    ) -> Dict[str, str]:
+        """
+        Finds chunks that nearly duplicate a stored chunk of another document, or an earlier
+        chunk of the same batch that states the same numbers and forms. Returns
+        {chunk_id: canonical_chunk_id} for the duplicates; every other chunk gets a
+        "signature" and "facts" key that add_documents stores with it.
+        `exclude` are stored chunk ids that must not become canonical, i.e. those the new
+        version is about to release. Pass the same `batch` index to match a document in
+        several calls. Does not touch the manifest, so it can run beside writes.
+        """
+        if self.near_duplicates is None or not chunks:
+            return {}
+        batch = batch if batch is not None else NearDuplicateIndex()
+        duplicates = {}
+        for chunk in chunks:
+            text = chunk.get("original_content", chunk["content"])
+            signature = self.minhasher.signature(text) if len(text) >= NEAR_DUPLICATE_MIN_LENGTH else None
+            if signature is None:
+                continue
+            facts = fact_key(f"{chunk.get('header', '')}\n{text}")
+            matches = [
+                match for match in (
+                    self.near_duplicates.query(signature, facts, NEAR_DUPLICATE_THRESHOLD, exclude),
+                    batch.query(signature, facts, NEAR_DUPLICATE_THRESHOLD)
+                ) if match
+            ]
+            if matches:
+                duplicates[chunk["chunk_id"]] = max(matches, key=lambda match: match[1])[0]
+            else:
+                chunk["signature"] = signature
+                chunk["facts"] = facts
+                batch.add(chunk["chunk_id"], signature, facts)
+        if duplicates:
+            logger.info(f"--- VectorStoreService: {len(duplicates)} of {len(chunks)} new chunks in '{document_name}' are near-duplicates. ---")
+        return duplicates
+
+    @_one_generation
+    def add_chunk_references(self, document_name: str, duplicate_chunks: Dict[str, List[Dict]]):
+        """
+        Records that `document_name` contains near-duplicates of canonical chunks, given as
+        {canonical_chunk_id: [duplicate chunk, ...]}. The canonical chunk's 'sources' lists
+        every document#page it appears in, and its forms cover all of them.
+        """
+        if not duplicate_chunks:
+            return
         try:
+            stored = self.collection.get(ids=list(duplicate_chunks), include=["metadatas"])
+            ids, metadatas = [], []
+            for i, chunk_id in enumerate(stored["ids"]):
+                metadata = stored["metadatas"][i] or {}
+                own = format_reference(metadata.get("source", "Unknown"), metadata.get("page", "N/A"))
+                entries = {e for e in parse_references(metadata.get("sources")) if e == own or not e.startswith(f"{document_name}#")}
+                entries |= {own} | {format_reference(document_name, c.get("page", "N/A")) for c in duplicate_chunks[chunk_id]}
+                forms = set(parse_forms_metadata(metadata.get("forms"))) | {f for c in duplicate_chunks[chunk_id] for f in c.get("forms", [])}
+                ids.append(chunk_id)
+                metadatas.append({"sources": "|".join(sorted(entries)), "forms": "|".join(sorted(forms))})
+                self.form_index.add(chunk_id, sorted(forms))
+            if ids:
+                self.collection.update(ids=ids, metadatas=metadatas)
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to add chunk references for '{document_name}': {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def release_chunks(self, document_name: str, chunk_ids: List[str]) -> int:
+        """
+        Drops a document's claim on chunks it no longer contains; call after its manifest was
+        updated. Chunks no other document references are deleted, shared ones only lose the
+        document from their 'sources'. Returns the number of chunks deleted.
+        """
+        if not chunk_ids:
+            return 0
+        references = self.manifest.get_chunk_references(list(chunk_ids))
+        orphans = [chunk_id for chunk_id in chunk_ids if chunk_id not in references]
+        shared = [chunk_id for chunk_id in chunk_ids if chunk_id in references]
+        if shared:
+            self._drop_chunk_references(document_name, shared, references)
+        self.delete_chunks(orphans)
+        return len(orphans)
+
+    def _drop_chunk_references(self, document_name: str, chunk_ids: List[str], references: Dict[str, List[str]]):
+        stored = self.collection.get(ids=chunk_ids, include=["metadatas"])
+        ids, metadatas, new_owners = [], [], set()
+        for i, chunk_id in enumerate(stored["ids"]):
+            metadata = stored["metadatas"][i] or {}
+            entries = [e for e in parse_references(metadata.get("sources")) if not e.startswith(f"{document_name}#")]
+            update = {"sources": "|".join(entries)}
+            if metadata.get("source") == document_name:
+                # The chunk now belongs to one of the documents that still contain it
+                owner = references[chunk_id][0]
+                owner_entry = next((e for e in entries if e.startswith(f"{owner}#")), format_reference(owner, "N/A"))
+                update.update({"source": owner, "page": owner_entry[len(owner) + 1:], "section_id": ""})
+                new_owners.add(owner)
+            ids.append(chunk_id)
+            metadatas.append(update)
+        if ids:
+            self.collection.update(ids=ids, metadatas=metadatas)
+        for owner in new_owners:
+            self.rebuild_document_summaries(owner)
+
+    @_one_generation
+    def delete_document(self, document_name: str) -> int:
+        """
+        Removes a document's manifest entry and its vectors. Chunks it shares with other
+        documents are kept. Returns the number of chunks removed.
+        """
+        chunk_ids = self.get_document_chunk_ids(document_name)
+        version_before = self.manifest.get_collection_version()
+        self.manifest.remove_document(document_name)
+        removed = self.release_chunks(document_name, chunk_ids)
+        self.sections_collection.delete(where={"source": document_name})
+        self.summarized_documents.discard(document_name)
+        # Bumped again once the chunks are gone, so other processes reload their indexes without them
+        self.manifest.bump_collection_version()
+        self._current().note_own_changes(version_before, bumps=2)
+        logger.info(f"--- VectorStoreService: Removed document '{document_name}' ({removed} of {len(chunk_ids)} chunks deleted). ---")
+        return removed
+
+    @_one_generation
+    def search(self, query_embedding: List[float], n_results: int = 3, forms: Optional[List[str]] = None, language: Optional[str] = None) -> List[Dict]:
+        """
+        Performs a similarity search in the vector store. When `forms` is given and
+        the form index knows chunks for them, only those chunks are ranked.
+        With `language`, only chunks in that language are ranked.
+        """
+        return self.search_many([query_embedding], n_results=n_results, forms=forms, language=language)[0]
+
+    @_one_generation
+    def search_many(self, query_embeddings: List[List[float]], n_results: int = 3, forms: Optional[List[str]] = None, language: Optional[str] = None) -> List[List[Dict]]:
+        """
+        Runs several similarity searches in a single collection query and returns one
+        result list per query embedding, in input order. Use `fuse_search_results`
+        to merge the lists into a single ranking.
+        """
+        if not query_embeddings:
+            return []
+        try:
+            query_kwargs = {}
+            candidate_ids = self.form_index.chunk_ids_for(forms) if forms else []
+            if candidate_ids:
+                logger.info(f"--- VectorStoreService: Restricting search to {len(candidate_ids)} chunks for forms {forms}. ---")
+                query_kwargs["ids"] = candidate_ids
+            if language:
+                query_kwargs["where"] = {"language": language}
+
+            results = self.collection.query(
+                query_embeddings=[list(embedding) for embedding in query_embeddings],
+                n_results=n_results,
+                include=self._chunk_query_fields,
+                **query_kwargs
+            )
+
+            all_results = [self._parse_query_results(results, q) for q in range(len(query_embeddings))]
+            logger.debug(f"--- VectorStoreService: Search for {len(query_embeddings)} queries returned {sum(len(r) for r in all_results)} results. ---")
+            return all_results
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Vector search failed: {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def rebuild_document_summaries(self, document_name: str) -> int:
+        """
+        Recomputes a document's section and document summary vectors as the normalized
+        centroids of its chunk embeddings. Returns the number of section vectors stored.
+        Chunks without a section (ingested before sections existed, or taken over from
+        another document) become a section of their own, and are tagged with its id so
+        the section-restricted search reaches them. Bumps the collection version, so other
+        processes reload the set of summarized documents.
+        """
+        version_before = self.manifest.get_collection_version()
+        try:
+            chunk_ids = self.get_document_chunk_ids(document_name)
+            self.sections_collection.delete(where={"source": document_name})
+            self.summarized_documents.discard(document_name)
+            if not chunk_ids:
+                return 0
+
+            stored = self.collection.get(ids=chunk_ids, include=["embeddings", "metadatas"])
+            embeddings = np.asarray(stored["embeddings"], dtype=np.float32)
+            sections: Dict[str, List[int]] = {}
+            untagged = []
+            for i, metadata in enumerate(stored["metadatas"]):
+                if (metadata or {}).get("source", document_name) != document_name:
+                    continue  # Shared chunk owned by another document; it only counts towards the document vector
+                if not (metadata or {}).get("section_id"):
+                    untagged.append(stored["ids"][i])
+                sections.setdefault((metadata or {}).get("section_id") or stored["ids"][i], []).append(i)
+            if untagged:
+                self.collection.update(ids=untagged, metadatas=[{"section_id": chunk_id} for chunk_id in untagged])
+
+            ids, vectors, metadatas = [], [], []
+            for section_id, rows in sections.items():
+                first = stored["metadatas"][rows[0]] or {}
+                ids.append(f"section::{section_id}")
+                vectors.append(self._centroid(embeddings[rows]))
+                metadatas.append({
+                    "level": "section",
+                    "section_id": section_id,
+                    "source": document_name,
+                    "header": first.get("header", DEFAULT_HEADER_TEXT),
+                    "page": first.get("page", "N/A"),
+                    "chunk_count": len(rows)
+                })
+            ids.append(f"document::{document_name}")
+            vectors.append(self._centroid(embeddings))
+            metadatas.append({"level": "document", "section_id": "", "source": document_name, "chunk_count": len(chunk_ids)})
+
+            self.sections_collection.upsert(ids=ids, embeddings=vectors, metadatas=metadatas)
+            self.summarized_documents.add(document_name)
+            logger.info(f"--- VectorStoreService: Stored {len(sections)} section summaries for '{document_name}'. ---")
+            return len(sections)
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to rebuild summaries for '{document_name}': {e} ---", exc_info=True)
+            raise
+        finally:
+            self.manifest.bump_collection_version()
+            self._current().note_own_changes(version_before)
+
+    @_one_generation
+    def search_hierarchical(
+        self,
+        query_embedding: List[float],
+        n_results: int = 3,
+        n_sections: int = 5,
+        n_documents: int = 3,
+        forms: Optional[List[str]] = None,
+        language: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Two-stage search: picks the best documents, then the best sections within them
+        from the summary index, and ranks only the chunks of those sections. Chunks of
+        documents without summaries are always ranked as well, so nothing ingested
+        before the summary index existed drops out of the results (build their summaries
+        with scripts/backfill_document_summaries.py). Falls back to a flat search when
+        no summaries exist or the narrowed search finds nothing.
+        """
+        try:
+            summarized = sorted(self.summarized_documents)
+            if not summarized:
+                return self.search(query_embedding, n_results=n_results, forms=forms, language=language)
+
+            section_filter: Dict = {"level": "section"}
+            documents = self.sections_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_documents,
+                where={"level": "document"},
+                include=["metadatas"]
+            )
+            top_sources = [metadata["source"] for metadata in (documents["metadatas"] or [[]])[0]]
+            if top_sources:
+                section_filter = {"$and": [{"level": "section"}, {"source": {"$in": top_sources}}]}
+
+            sections = self.sections_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_sections,
+                where=section_filter,
+                include=["metadatas"]
+            )
+            section_ids = [metadata["section_id"] for metadata in (sections["metadatas"] or [[]])[0]]
+            if not section_ids:
+                return self.search(query_embedding, n_results=n_results, forms=forms, language=language)
+
+            chunk_filter = {"$or": [{"section_id": {"$in": section_ids}}, {"source": {"$nin": summarized}}]}
+            query_kwargs = {"where": {"$and": [chunk_filter, {"language": language}]} if language else chunk_filter}
+            candidate_ids = self.form_index.chunk_ids_for(forms) if forms else []
+            if candidate_ids:
+                query_kwargs["ids"] = candidate_ids
             results = self.collection.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
-                include=["metadatas", "documents", "distances"]
+                include=self._chunk_query_fields,
+                **query_kwargs
             )
-            
-            search_results = []
-            if results and results["documents"] and results["documents"][0]:
-                for i, doc_content in enumerate(results["documents"][0]):
-                    metadata = results["metadatas"][0][i] if results["metadatas"] and results["metadatas"][0] else {}
-                    distance = results["distances"][0][i] if results["distances"] and results["distances"][0] else float('inf')
-                    
-                    # Add original_content to the metadata if it's not already there
-                    if 'original_content' not in metadata:
-                        metadata['original_content'] = doc_content
-
-                    search_results.append({
-                        "content": doc_content,
-                        "metadata": metadata,
-                        "distance": distance
-                    })
+            search_results = self._parse_query_results(results, 0)
+            if not search_results:
+                logger.info("--- VectorStoreService: Section-restricted search found nothing. Using flat search. ---")
+                return self.search(query_embedding, n_results=n_results, forms=forms, language=language)
 
-            logger.debug(f"--- VectorStoreService: Search returned {len(search_results)} results. ---")
+            logger.debug(f"--- VectorStoreService: Hierarchical search over sections {section_ids} returned {len(search_results)} results. ---")
             return search_results
         except Exception as e:
-            logger.error(f"--- VectorStoreService: Vector search failed: {e} ---", exc_info=True)
+            logger.error(f"--- VectorStoreService: Hierarchical search failed: {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def unsummarized_documents(self) -> List[str]:
+        """Documents with chunks in the collection but no summary vectors, e.g. ingested before they existed."""
+        sources, offset = set(), 0
+        while True:
+            page = self.collection.get(limit=VECTORSTORE_SCAN_BATCH_SIZE, offset=offset, include=["metadatas"])
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            sources.update((metadata or {}).get("source") for metadata in page["metadatas"])
+            offset += len(ids)
+        return sorted(sources - self.summarized_documents - {None, "", "Unknown"})
+
+    @_one_generation
+    def get_section_chunks(self, section_id: str) -> List[Dict]:
+        """Returns all chunks of a section in document order."""
+        try:
+            results = self.collection.get(where={"section_id": section_id}, include=["metadatas", "documents"])
+            chunks = [
+                self._make_result(chunk_id, results["documents"][i], results["metadatas"][i], float('inf'))
+                for i, chunk_id in enumerate(results["ids"])
+            ]
+            return self.hydrate(sorted(chunks, key=lambda chunk: chunk["metadata"].get("chunk_index", 0)))
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to fetch section '{section_id}': {e} ---", exc_info=True)
+            raise
+
+    def _centroid(self, vectors: np.ndarray) -> List[float]:
+        centroid = vectors.mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        return (centroid / norm if norm > 0 else centroid).tolist()
+
+    @_one_generation
+    def search_questions(
+        self, query_embedding: List[float], n_results: int = 5, forms: Optional[List[str]] = None, language: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Matches the query against the generated-question vectors. Each hit carries the
+        matched question, its parent chunk id and the cosine distance. With `language`,
+        only questions of chunks in that language are matched.
+        """
+        try:
+            query_kwargs = {}
+            filters = []
+            candidate_ids = self.form_index.chunk_ids_for(forms) if forms else []
+            if candidate_ids:
+                filters.append({"parent_id": {"$in": candidate_ids}})
+            if language:
+                filters.append({"language": language})
+            if filters:
+                query_kwargs["where"] = filters[0] if len(filters) == 1 else {"$and": filters}
+
+            results = self.questions_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                include=["metadatas", "documents", "distances"],
+                **query_kwargs
+            )
+            hits = []
+            if results and results["ids"] and results["ids"][0]:
+                for i, question_id in enumerate(results["ids"][0]):
+                    hits.append({
+                        "id": question_id,
+                        "question": results["documents"][0][i],
+                        "parent_id": results["metadatas"][0][i]["parent_id"],
+                        "distance": results["distances"][0][i]
+                    })
+            return hits
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Question search failed: {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def backfill_question_languages(self, dry_run: bool = False) -> int:
+        """
+        Copies the parent chunk's language onto question vectors stored before questions
+        carried one, so language-filtered question matching can find them. Returns the
+        number of question vectors that lacked a language.
+        """
+        missing = 0
+        offset = 0
+        while True:
+            page = self.questions_collection.get(limit=VECTORSTORE_SCAN_BATCH_SIZE, offset=offset, include=["metadatas"])
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            offset += len(ids)
+            pending = {
+                question_id: metadata for question_id, metadata in zip(ids, page.get("metadatas") or [])
+                if "language" not in (metadata or {})
+            }
+            missing += len(pending)
+            if dry_run or not pending:
+                continue
+            parent_ids = sorted({metadata["parent_id"] for metadata in pending.values()})
+            parents = self.collection.get(ids=parent_ids, include=["metadatas"])
+            languages = {chunk_id: (metadata or {}).get("language", "") for chunk_id, metadata in zip(parents["ids"], parents["metadatas"])}
+            self.questions_collection.update(
+                ids=list(pending),
+                metadatas=[{"language": languages.get(metadata["parent_id"], "")} for metadata in pending.values()]
+            )
+        logger.info(f"--- VectorStoreService: {missing} question vectors had no language. ---")
+        return missing
+
+    @_one_generation
+    def get_chunks(self, chunk_ids: List[str]) -> List[Dict]:
+        """Fetches chunks by id, in the given order, as search-result dicts without a distance."""
+        if not chunk_ids:
+            return []
+        try:
+            results = self.collection.get(ids=list(chunk_ids), include=["metadatas", "documents"])
+            by_id = {
+                chunk_id: self._make_result(chunk_id, results["documents"][i], results["metadatas"][i], float('inf'))
+                for i, chunk_id in enumerate(results["ids"])
+            }
+            return self.hydrate([by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id])
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to fetch chunks: {e} ---", exc_info=True)
+            raise
+
+    @_one_generation
+    def get_embeddings(self, chunk_ids: List[str]) -> Dict[str, List[float]]:
+        """Stored chunk vectors by id, e.g. to compare retrieved chunks with each other."""
+        if not chunk_ids:
+            return {}
+        try:
+            results = self.collection.get(ids=list(dict.fromkeys(chunk_ids)), include=["embeddings"])
+            return {chunk_id: list(results["embeddings"][i]) for i, chunk_id in enumerate(results["ids"])}
+        except Exception as e:
+            logger.error(f"--- VectorStoreService: Failed to fetch embeddings: {e} ---", exc_info=True)
             raise
 
+    @_one_generation
+    def hydrate(self, results: List[Dict]) -> List[Dict]:
+        """
+        Fills in the text of results returned without it (compact storage). Only call
+        this for the hits that are actually used, so other candidates never load text.
+        """
+        missing = [result for result in results if not result.get("content")]
+        if not missing:
+            return results
+
+        records = self.content_store.get_many([result["id"] for result in missing]) if self.content_store else {}
+        for result in missing:
+            record = records.get(result["id"])
+            if record:
+                result["metadata"]["original_content"] = record["original_content"]
+                result["metadata"]["questions"] = "|".join(record["questions"])
+                result["content"] = enrich_content(record["original_content"], record["questions"])
+            else:
+                # Chunks written before compact storage keep their text in metadata
+                result["content"] = result["metadata"].get("original_content", "")
+        return results
+
+    def _parse_query_results(self, results: Dict, q: int) -> List[Dict]:
+        """Converts the q-th row of a Chroma query response into result dicts."""
+        search_results = []
+        if not (results and results["ids"] and len(results["ids"]) > q):
+            return search_results
+
+        for i, chunk_id in enumerate(results["ids"][q]):
+            doc_content = results["documents"][q][i] if results.get("documents") else None
+            metadata = results["metadatas"][q][i] if results["metadatas"] and results["metadatas"][q] else {}
+            distance = results["distances"][q][i] if results["distances"] and results["distances"][q] else float('inf')
+            result = self._make_result(chunk_id, doc_content, metadata, distance)
+            if results.get("embeddings") is not None:
+                result["embedding"] = list(results["embeddings"][q][i])
+            search_results.append(result)
+        return search_results
+
+    def _make_result(self, chunk_id: str, doc_content: Optional[str], metadata: Optional[Dict], distance: float) -> Dict:
+        """Builds the result dict shared by searches and direct chunk lookups."""
+        metadata = dict(metadata or {})
+        # Add original_content to the metadata if it's not already there
+        if doc_content and 'original_content' not in metadata:
+            metadata['original_content'] = doc_content
+        return {
+            "id": chunk_id,
+            "content": doc_content or None,
+            "metadata": metadata,
+            "distance": distance
+        }
+
+    @_one_generation
     def get_collection_count(self) -> int:
         """Returns the total number of items in the collection."""
         try:
             count = self.collection.count()
-            logger.info(f"--- VectorStoreService: Collection '{COLLECTION_NAME}' has {count} items. ---")
+            logger.info(f"--- VectorStoreService: Collection '{self.collection_name}' has {count} items. ---")
             return count
         except Exception as e:
             logger.error(f"--- VectorStoreService: Failed to get collection count: {e} ---", exc_info=True)
             raise
 
+    @_one_generation
     def delete_collection(self):
         """Deletes the entire collection. USE WITH CAUTION."""
         try:
-            self.client.delete_collection(name=COLLECTION_NAME)
-            logger.info(f"--- VectorStoreService: Collection '{COLLECTION_NAME}' deleted. ---")
-            # Recreate the collection so the service can continue to be used without restarting
-            self.collection = self.client.get_or_create_collection(
-                name=COLLECTION_NAME,
-                metadata={"hnsw:space": "cosine"}
-            )
+            for name in collection_names(self.generation).values():
+                self.client.delete_collection(name=name)
+            logger.info(f"--- VectorStoreService: Collection '{self.collection_name}' deleted. ---")
+            # Recreate the collections so the service can continue to be used without restarting
+            if self.content_store:
+                self.content_store.clear()
+            self.manifest.clear()
+            self._switch_generation(self.generation)
         except Exception as e:
             logger.error(f"--- VectorStoreService: Failed to delete collection: {e} ---", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
@@ -94,10 +94,10 @@ function initializeDocumentManagement(token) {
             const response = await fetch(`${API_BASE_URL}/upload`, { method: 'POST', body: formData, headers: AUTH_HEADER });
             const result = await response.json();
             if (!response.ok) throw new Error(result.detail || 'Upload failed');
-            showStatusMessage(uploadStatusEl, result.message, 'success');
+            showStatusMessage(uploadStatusEl, result.message, 'info');
             fileInput.value = '';
             fetchDocumentList();
-            fetchKbStatus();
+            pollIngestionJob(result.job_id);
         } catch (error) {
             showStatusMessage(uploadStatusEl, `Error: ${error.message}`, 'error');
         } finally {
@@ -105,6 +105,32 @@ function initializeDocumentManagement(token) {
         }
     }
 
+    // Ingestion runs in the background; follow the job until it finishes.
+    async function pollIngestionJob(jobId) {
+        try {
+            const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, { headers: AUTH_HEADER });
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.detail || 'Could not get the job status');
+
+            if (job.status === 'succeeded') {
+                showStatusMessage(uploadStatusEl, `${job.document_name} was processed successfully.`, 'success');
+                fetchKbStatus();
+                return;
+            }
+            if (job.status === 'failed' || job.status === 'cancelled') {
+                showStatusMessage(uploadStatusEl, `${job.document_name}: ${job.status}${job.error ? ` (${job.error})` : ''}`, 'error');
+                return;
+            }
+            let message = `${job.document_name}: ${job.stage.replace(/_/g, ' ')}`;
+            if (job.chunks_total) message += ` (${job.chunks_done}/${job.chunks_total} chunks)`;
+            if (job.eta_seconds !== null) message += `, about ${Math.ceil(job.eta_seconds)}s left`;
+            showStatusMessage(uploadStatusEl, message, 'info');
+            setTimeout(() => pollIngestionJob(jobId), 2000);
+        } catch (error) {
+            showStatusMessage(uploadStatusEl, `Error: ${error.message}`, 'error');
+        }
+    }
+
     async function fetchDocumentList() {
         setLoading(refreshDocsBtn, true);
         try {
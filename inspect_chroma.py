@@ -1,71 +1,240 @@
-import chromadb
-from app.core.config import CHROMA_PERSIST_DIR, COLLECTION_NAME, DEFAULT_HEADER_TEXT # Added DEFAULT_HEADER_TEXT for VectorStoreService
-from app.services.vectorstore import VectorStoreService # Import your service
+"""
+Paged inspection, backup and restore tool for the vector store. Every subcommand
+reads the collection in pages of VECTORSTORE_SCAN_BATCH_SIZE, so memory stays
+bounded regardless of the collection size.
+
+    python inspect_chroma.py show [--limit 10] [--offset 0] [--source guide.pdf]
+    python inspect_chroma.py stats
+    python inspect_chroma.py export backups/2024-06-01
+    python inspect_chroma.py import backups/2024-06-01 [--generation g7]
+    python inspect_chroma.py delete --source guide.pdf | --all [--yes]
+
+Export layout, one directory per collection (chunks, questions, sections):
+    meta.json           collection name, record count, embedding dimension
+    records.jsonl       one {"id", "document", "metadata", "content"} object per line
+    embeddings-NNNNN.npy  float32 embeddings of the matching page of records.jsonl
+plus documents.jsonl with the document manifest. "content" holds the chunk text
+from the compact side store, so an export is a complete backup in either mode.
+"""
+
+import argparse
+import json
 import logging
-import pprint # For pretty printing dictionaries
+import pprint
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import VECTORSTORE_SCAN_BATCH_SIZE
+from app.core.hashing import sha256_text
+from app.services.vectorstore import VectorStoreService
 
 # Configure basic logging for the script
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def inspect_collection_content(collection: chromadb.api.models.Collection.Collection, limit: int = 1000):
-    """
-    Inspects and prints the content of a given ChromaDB collection.
-    """
-    try:
-        count = collection.count()
-        logger.info(f"Total documents in collection '{collection.name}': {count}")
-
-        if count == 0:
-            print(f"Collection '{collection.name}' is empty.")
-            return
+EXPORT_FORMAT_VERSION = 1
+COLLECTION_KINDS = ["chunks", "questions", "sections"]
+LENGTH_BUCKETS = [0, 250, 500, 1000, 1500, 2000, 3000, 5000]
 
-        effective_limit = min(limit, count) if limit is not None else count
-        
-        print(f"\n--- Retrieving up to {effective_limit} documents from '{collection.name}' ---")
-        results = collection.get(
-            limit=effective_limit,
-            include=["metadatas", "documents"] 
-        )
+def get_collection(vs_service: VectorStoreService, kind: str):
+    return {
+        "chunks": vs_service.collection,
+        "questions": vs_service.questions_collection,
+        "sections": vs_service.sections_collection,
+    }[kind]
 
-        if not results or not results.get("ids"):
-            print("No documents found or unexpected result format.")
+def iter_pages(collection, include: List[str], where: Optional[Dict] = None, offset: int = 0, limit: Optional[int] = None) -> Iterator[Dict]:
+    """Yields collection.get() pages until the collection (or `limit`) is exhausted."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = VECTORSTORE_SCAN_BATCH_SIZE if remaining is None else min(VECTORSTORE_SCAN_BATCH_SIZE, remaining)
+        page = collection.get(where=where, limit=page_size, offset=offset, include=include)
+        ids = page.get("ids") or []
+        if not ids:
             return
+        yield page
+        offset += len(ids)
+        if remaining is not None:
+            remaining -= len(ids)
+
+def chunk_text(vs_service: VectorStoreService, page: Dict) -> Dict[str, str]:
+    """Original text of each chunk in a page, from the side store in compact mode."""
+    stored = vs_service.content_store.get_many(page["ids"]) if vs_service.content_store else {}
+    texts = {}
+    for i, chunk_id in enumerate(page["ids"]):
+        metadata = page["metadatas"][i] or {}
+        record = stored.get(chunk_id)
+        texts[chunk_id] = record["original_content"] if record else metadata.get("original_content") or page["documents"][i] or ""
+    return texts
 
-        for i in range(len(results["ids"])):
-            print(f"\n--- Document ID: {results['ids'][i]} ---")
+def show(vs_service: VectorStoreService, args):
+    collection = get_collection(vs_service, args.collection)
+    where = {"source": args.source} if args.source else None
+    print(f"\n--- '{collection.name}': {collection.count()} records, showing {args.limit} from offset {args.offset} ---")
+    for page in iter_pages(collection, ["metadatas", "documents"], where, args.offset, args.limit):
+        texts = chunk_text(vs_service, page) if args.collection == "chunks" else {}
+        for i, record_id in enumerate(page["ids"]):
+            print(f"\n--- ID: {record_id} ---")
             print("Metadata:")
-            pprint.pprint(results["metadatas"][i])
+            pprint.pprint(page["metadatas"][i])
+            text = texts.get(record_id) or page["documents"][i] or ""
             print("Content (first 300 chars):")
-            print(f"{results['documents'][i][:300]}...")
+            print(f"{text[:300]}...")
             print("-" * 30)
 
-    except Exception as e:
-        logger.error(f"An error occurred during collection inspection: {e}", exc_info=True)
+def stats(vs_service: VectorStoreService, args):
+    per_source, lengths, hashes = Counter(), Counter(), set()
+    total = duplicates = 0
+    for page in iter_pages(vs_service.collection, ["metadatas", "documents"]):
+        texts = chunk_text(vs_service, page)
+        for i, chunk_id in enumerate(page["ids"]):
+            per_source[(page["metadatas"][i] or {}).get("source", "unknown")] += 1
+            text = texts[chunk_id]
+            lengths[max(b for b in LENGTH_BUCKETS if len(text) >= b)] += 1
+            digest = sha256_text(" ".join(text.lower().split()))
+            duplicates += digest in hashes
+            hashes.add(digest)
+            total += 1
+
+    print(f"\n=== Collection '{vs_service.collection_name}' ===")
+    print(f"Chunks:            {total}")
+    print(f"Generated questions: {vs_service.questions_collection.count()}")
+    print(f"Summary vectors:   {vs_service.sections_collection.count()}")
+    print(f"Duplicate chunks:  {duplicates} ({duplicates / max(total, 1):.1%} exact duplicates after whitespace/case normalization)")
+    print("\nChunks per source:")
+    for source, count in per_source.most_common():
+        print(f"  {count:>7}  {source}")
+    print("\nChunk length (characters):")
+    peak = max(lengths.values(), default=1)
+    for i, bucket in enumerate(LENGTH_BUCKETS):
+        upper = f"{LENGTH_BUCKETS[i + 1] - 1}" if i + 1 < len(LENGTH_BUCKETS) else "+"
+        label = f"{bucket}-{upper}" if upper != "+" else f"{bucket}+"
+        print(f"  {label:>10} {lengths[bucket]:>7}  {'#' * round(40 * lengths[bucket] / peak)}")
+
+def export(vs_service: VectorStoreService, args):
+    target = Path(args.directory)
+    for kind in args.collections:
+        collection = get_collection(vs_service, kind)
+        out_dir = target / kind
+        out_dir.mkdir(parents=True, exist_ok=True)
+        count, dim, shard = 0, None, 0
+        with open(out_dir / "records.jsonl", "w", encoding="utf-8") as records:
+            for page in iter_pages(collection, ["embeddings", "metadatas", "documents"]):
+                stored = vs_service.content_store.get_many(page["ids"]) if kind == "chunks" and vs_service.content_store else {}
+                for i, record_id in enumerate(page["ids"]):
+                    records.write(json.dumps({
+                        "id": record_id,
+                        "document": page["documents"][i],
+                        "metadata": page["metadatas"][i],
+                        "content": stored.get(record_id)
+                    }, ensure_ascii=False) + "\n")
+                embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                np.save(out_dir / f"embeddings-{shard:05d}.npy", embeddings)
+                dim = embeddings.shape[1]
+                count += len(page["ids"])
+                shard += 1
+        meta = {"format_version": EXPORT_FORMAT_VERSION, "collection": collection.name, "count": count, "dim": dim, "shards": shard}
+        (out_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        print(f"Exported {count} records from '{collection.name}' to {out_dir}")
+
+    with open(target / "documents.jsonl", "w", encoding="utf-8") as documents:
+        for document in vs_service.manifest.list_documents():
+            document["chunk_ids"] = vs_service.manifest.get_chunk_ids(document["document_name"])
+            documents.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+def iter_export(directory: Path, shards: int) -> Iterator[tuple]:
+    """Yields (records, embeddings) per exported page."""
+    with open(directory / "records.jsonl", "r", encoding="utf-8") as records:
+        for shard in range(shards):
+            embeddings = np.load(directory / f"embeddings-{shard:05d}.npy")
+            yield [json.loads(records.readline()) for _ in range(len(embeddings))], embeddings
+
+def import_(vs_service: VectorStoreService, args):
+    source = Path(args.directory)
+    for kind in COLLECTION_KINDS:
+        directory = source / kind
+        if not (directory / "meta.json").is_file():
+            continue
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format_version") != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported export format in {directory}: {meta.get('format_version')}")
+        collection = get_collection(vs_service, kind)
+        imported = 0
+        for records, embeddings in iter_export(directory, meta["shards"]):
+            contents = {r["id"]: r["content"] for r in records if r.get("content")}
+            if contents and vs_service.content_store:
+                vs_service.content_store.put_many(contents)
+            collection.upsert(
+                ids=[r["id"] for r in records],
+                embeddings=embeddings.tolist(),
+                documents=[r["document"] or "" for r in records],
+                metadatas=[r["metadata"] for r in records]
+            )
+            imported += len(records)
+        print(f"Imported {imported} records into '{collection.name}'")
+
+    manifest_path = source / "documents.jsonl"
+    if manifest_path.is_file():
+        with open(manifest_path, "r", encoding="utf-8") as documents:
+            for line in documents:
+                document = json.loads(line)
+                vs_service.manifest.record_document(document["document_name"], document["content_hash"], document["chunk_ids"])
+
+def delete(vs_service: VectorStoreService, args):
+    target = f"document '{args.source}'" if args.source else f"ALL collections of generation '{vs_service.generation or 'base'}'"
+    if not args.yes:
+        answer = input(f"Delete {target}? This cannot be undone. Type 'yes' to confirm: ").strip().lower()
+        if answer != "yes":
+            print("Aborted.")
+            return
+    if args.source:
+        removed = vs_service.delete_document(args.source)
+        print(f"Deleted {removed} chunks of '{args.source}'.")
+    else:
+        vs_service.delete_collection()  # This method also recreates it
+        print(f"Collection '{vs_service.collection_name}' has been deleted and recreated (it's now empty).")
 
 def main():
+    parser = argparse.ArgumentParser(description="Inspect, back up and restore the vector store")
+    parser.add_argument("--generation", default=None, help="Index generation to use (default: the active one)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = subcommands.add_parser("show", help="Print records page by page")
+    show_parser.add_argument("--collection", choices=COLLECTION_KINDS, default="chunks")
+    show_parser.add_argument("--limit", type=int, default=10)
+    show_parser.add_argument("--offset", type=int, default=0)
+    show_parser.add_argument("--source", help="Only records of this document")
+    show_parser.set_defaults(handler=show)
+
+    stats_parser = subcommands.add_parser("stats", help="Counts per source, chunk-length histogram, duplicate ratio")
+    stats_parser.set_defaults(handler=stats)
+
+    export_parser = subcommands.add_parser("export", help="Stream the collections to JSONL + .npy files")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--collections", nargs="+", choices=COLLECTION_KINDS, default=COLLECTION_KINDS)
+    export_parser.set_defaults(handler=export)
+
+    import_parser = subcommands.add_parser("import", help="Upsert an export in batches")
+    import_parser.add_argument("directory")
+    import_parser.set_defaults(handler=import_)
+
+    delete_parser = subcommands.add_parser("delete", help="Delete one document or everything")
+    target = delete_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--source", help="Document name, e.g. guide.pdf")
+    target.add_argument("--all", action="store_true", help="Delete and recreate all collections")
+    delete_parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    delete_parser.set_defaults(handler=delete)
+
+    args = parser.parse_args()
     try:
-        # Instantiate VectorStoreService to use its methods
-        # This will also initialize the client and get/create the collection
-        vs_service = VectorStoreService() 
-        logger.info(f"Connected to ChromaDB and using collection '{vs_service.collection.name}'.")
-
-        # Ask user if they want to delete the collection
-        user_choice = input(f"Do you want to delete the collection '{vs_service.collection.name}' and recreate it? (yes/no): ").strip().lower()
-
-        if user_choice == 'yes':
-            logger.info(f"User chose to delete collection '{vs_service.collection.name}'.")
-            vs_service.delete_collection() # This method also recreates it
-            print(f"Collection '{vs_service.collection.name}' has been deleted and recreated (it's now empty).")
-        elif user_choice == 'no':
-            logger.info(f"User chose not to delete collection '{vs_service.collection.name}'. Proceeding to inspect.")
-            inspect_collection_content(vs_service.collection)
-        else:
-            logger.info(f"Invalid input. Proceeding to inspect collection '{vs_service.collection.name}'.")
-            inspect_collection_content(vs_service.collection)
-            
+        vs_service = VectorStoreService(generation=args.generation)
+        args.handler(vs_service, args)
     except Exception as e:
         logger.error(f"An error occurred in the main script: {e}", exc_info=True)
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
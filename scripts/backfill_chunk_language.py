@@ -0,0 +1,69 @@
+# Path: scripts/backfill_chunk_language.py
+
+"""
+Tags chunks ingested before language-partitioned retrieval with their language, so
+they are found by same-language searches instead of only by the cross-language fallback.
+
+    python scripts/backfill_chunk_language.py [--dry-run]
+"""
+
+import sys
+import logging
+import argparse
+from collections import Counter
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import VECTORSTORE_SCAN_BATCH_SIZE
+from app.core.language import detect_text_language
+from app.services.vectorstore import VectorStoreService
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def backfill(dry_run: bool):
+    vector_store = VectorStoreService()
+    collection = vector_store.collection
+    languages, scanned, offset = Counter(), 0, 0
+
+    while True:
+        page = collection.get(limit=VECTORSTORE_SCAN_BATCH_SIZE, offset=offset, include=["metadatas", "documents"])
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        offset += len(ids)
+        scanned += len(ids)
+
+        untagged = [i for i, metadata in enumerate(page["metadatas"]) if not (metadata or {}).get("language")]
+        if not untagged:
+            continue
+        untagged_ids = [ids[i] for i in untagged]
+        stored = vector_store.content_store.get_many(untagged_ids) if vector_store.content_store else {}
+        metadatas = []
+        for i, chunk_id in zip(untagged, untagged_ids):
+            record = stored.get(chunk_id)
+            text = record["original_content"] if record else (page["metadatas"][i] or {}).get("original_content") or page["documents"][i] or ""
+            language = detect_text_language(text)
+            languages[language] += 1
+            metadatas.append({"language": language})
+
+        if not dry_run:
+            # Metadata-only update: embeddings and documents are left untouched
+            collection.update(ids=untagged_ids, metadatas=metadatas)
+            logger.info(f"Tagged {sum(languages.values())} chunks so far...")
+
+    print(f"\nChunks scanned:  {scanned}")
+    print(f"{'Would tag:' if dry_run else 'Tagged:':<17}{sum(languages.values())}")
+    for language, count in languages.most_common():
+        print(f"  {language:<14}{count}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Add the 'language' metadata field to existing chunks")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+    backfill(args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Path: scripts/backfill_document_summaries.py
+
+"""
+Builds the section and document summary vectors of documents ingested before two-stage
+(hierarchical) retrieval existed, so the first stage can select them. Until then their
+chunks are still searched, but always compete with the selected sections.
+
+    python scripts/backfill_document_summaries.py [--dry-run]
+"""
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.vectorstore import VectorStoreService
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def backfill(dry_run: bool):
+    vector_store = VectorStoreService()
+    documents = vector_store.unsummarized_documents()
+    sections = 0
+    for document_name in documents:
+        if dry_run:
+            print(f"  {document_name}")
+            continue
+        sections += vector_store.rebuild_document_summaries(document_name)
+
+    print(f"\n{'Would summarize:' if dry_run else 'Summarized:':<17}{len(documents)} documents")
+    if not dry_run:
+        print(f"{'Sections:':<17}{sections}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build summary vectors for documents that have none")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the documents")
+    args = parser.parse_args()
+    backfill(args.dry_run)
+
+if __name__ == "__main__":
+    main()
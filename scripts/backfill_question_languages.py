@@ -0,0 +1,33 @@
+# Path: scripts/backfill_question_languages.py
+
+"""
+Copies each parent chunk's language onto question vectors stored before questions carried
+one. Question matching is filtered by the query language, so until then these questions
+only match through the cross-language fallback of the chunk search.
+
+    python scripts/backfill_question_languages.py [--dry-run]
+"""
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.vectorstore import VectorStoreService
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag stored question vectors with their chunk's language")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the question vectors")
+    args = parser.parse_args()
+
+    missing = VectorStoreService().backfill_question_languages(dry_run=args.dry_run)
+    print(f"\n{'Would tag:' if args.dry_run else 'Tagged:':<11}{missing} question vectors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Path: scripts/benchmark_ingestion_pipeline.py
+
+"""
+Measures ingestion throughput and peak memory of the streaming pipeline on a large PDF,
+with the stages running concurrently and chained in one thread. The PDF is built by
+concatenating the PDFs in data/raw until it has --pages pages (or pass --pdf). Each mode
+runs in its own process, so peak RSS is not shared, and ingests into a throwaway index
+generation that is dropped afterwards.
+
+    python scripts/benchmark_ingestion_pipeline.py [--pages 300] [--pdf big.pdf] [--batch-size N] [--queue-size N]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import fitz
+
+from app.core.config import RAW_DATA_DIR, INGESTION_PIPELINE_BATCH_SIZE, INGESTION_PIPELINE_QUEUE_SIZE
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+BENCHMARK_GENERATION = "benchmark"
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def build_pdf(raw_dir: Path, pages: int, output: Path) -> int:
+    sources = sorted(raw_dir.glob("*.pdf"))
+    if not sources:
+        raise SystemExit(f"No PDFs found in {raw_dir}.")
+    with fitz.open() as combined:
+        while combined.page_count < pages:
+            for source in sources:
+                with fitz.open(str(source)) as pdf:
+                    combined.insert_pdf(pdf, to_page=min(pdf.page_count, pages - combined.page_count) - 1)
+                if combined.page_count >= pages:
+                    break
+        combined.save(str(output), garbage=3, deflate=True)
+        return combined.page_count
+
+def run_once(pdf: str, concurrent: bool, batch_size: int, queue_size: int) -> dict:
+    """Ingests `pdf` once in this process and returns the measurements."""
+    from app.services import rag_service, ingestion_pipeline, vectorstore
+    from app.services.rag_service import RAGService
+    from app.services.vectorstore import VectorStoreService
+    # The built PDF repeats its sources; collapsing those repeats would skip most of the work
+    vectorstore.NEAR_DUPLICATE_ENABLED = False
+    rag_service.INGESTION_PIPELINE_BATCH_SIZE = batch_size
+    ingestion_pipeline.INGESTION_PIPELINE_QUEUE_SIZE = queue_size
+    ingestion_pipeline.INGESTION_PIPELINE_CONCURRENT = concurrent
+
+    rag = RAGService()
+    store = VectorStoreService(generation=BENCHMARK_GENERATION)
+    try:
+        baseline = peak_rss_mib()
+        start = time.perf_counter()
+        ok = rag.process_document(pdf, vector_store=store)
+        elapsed = time.perf_counter() - start
+        chunks = store.get_collection_count()
+    finally:
+        store.drop_generation(BENCHMARK_GENERATION)
+    return {"ok": ok, "seconds": elapsed, "chunks": chunks, "baseline_mib": baseline, "peak_mib": peak_rss_mib()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ingestion pipeline benchmark")
+    parser.add_argument("--pdf", default=None, help="PDF to ingest (default: built from data/raw)")
+    parser.add_argument("--pages", type=int, default=300, help="Pages of the built PDF")
+    parser.add_argument("--raw-dir", default=str(RAW_DATA_DIR))
+    parser.add_argument("--batch-size", type=int, default=INGESTION_PIPELINE_BATCH_SIZE, help="Chunks per pipeline batch")
+    parser.add_argument("--queue-size", type=int, default=INGESTION_PIPELINE_QUEUE_SIZE, help="Batches buffered between stages")
+    parser.add_argument("--mode", choices=["concurrent", "sequential"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Child process: one measured run, reported as JSON on the last line
+        print(json.dumps(run_once(args.pdf, args.mode == "concurrent", args.batch_size, args.queue_size)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = args.pdf
+        if pdf is None:
+            pdf = os.path.join(tmp, "benchmark.pdf")
+            build_pdf(Path(args.raw_dir), args.pages, Path(pdf))
+        with fitz.open(pdf) as document:
+            pages = document.page_count
+        print(f"Ingesting {pdf} ({pages} pages), batches of {args.batch_size}, queues of {args.queue_size} batches.\n")
+
+        results = {}
+        for mode in ("concurrent", "sequential"):
+            command = [
+                sys.executable, __file__, "--pdf", pdf, "--mode", mode,
+                "--batch-size", str(args.batch_size), "--queue-size", str(args.queue_size)
+            ]
+            output = subprocess.run(command, capture_output=True, text=True)
+            lines = output.stdout.strip().splitlines()
+            if output.returncode != 0 or not lines:
+                print(f"{mode} run failed:\n{output.stderr[-2000:]}")
+                continue
+            results[mode] = json.loads(lines[-1])
+
+    print(f"{'Mode':<12} {'seconds':>8} {'pages/s':>8} {'chunks/s':>9} {'chunks':>7} {'RSS before':>11} {'peak RSS':>9} {'growth':>8}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<12} {r['seconds']:>8.1f} {pages / r['seconds']:>8.2f} {r['chunks'] / r['seconds']:>9.2f} {r['chunks']:>7} "
+            f"{r['baseline_mib']:>8.0f} MiB {r['peak_mib']:>5.0f} MiB {r['peak_mib'] - r['baseline_mib']:>4.0f} MiB"
+            + ("" if r["ok"] else "  (ingestion failed)")
+        )
+    if len(results) == 2:
+        print(f"\nSpeed-up from overlapping stages: {results['sequential']['seconds'] / results['concurrent']['seconds']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Path: scripts/check_documentai_splitting.py
+
+"""
+Checks page-range splitting of the Document AI backend without calling Google: a local
+stand-in service answers each request with the PyMuPDF layout of the pages it received
+(page spans relative to the request, like Document AI) after a simulated per-page latency.
+
+Every PDF is processed once whole and once split into small page ranges. The merged
+blocks and the resulting chunks (pages, section headers, text) must match.
+
+    python scripts/check_documentai_splitting.py [PDF or folder ...] [--max-pages 2] [--latency 0.1]
+"""
+
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import fitz
+
+from app.core.config import RAW_DATA_DIR
+from app.services.layout_backends import DocumentAILayoutBackend, PyMuPDFLayoutBackend
+from app.services.data_loader import DocumentProcessor
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class LocalDocumentAIStandIn:
+    """Answers `process_document` requests like the Layout Parser, from the PDF text layer."""
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.local = PyMuPDFLayoutBackend()
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def process_document(self, request):
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            content = request["raw_document"]["content"]
+            with fitz.open(stream=content, filetype="pdf") as document:
+                time.sleep(self.latency * document.page_count)
+            with tempfile.NamedTemporaryFile(suffix=".pdf") as part:
+                part.write(content)
+                part.flush()
+                blocks = self.local.extract_blocks(part.name)
+            return SimpleNamespace(document=SimpleNamespace(document_layout=SimpleNamespace(blocks=[
+                SimpleNamespace(
+                    text_block=SimpleNamespace(type=block.type, text=block.text, blocks=[]),
+                    page_span=SimpleNamespace(page_start=block.page, page_end=block.page)
+                )
+                for block in blocks
+            ])))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+def chunk_signature(chunks):
+    return [(chunk["page"], chunk["header"], chunk["content"]) for chunk in chunks]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check Document AI page-range splitting against a local stand-in")
+    parser.add_argument("paths", nargs="*", help=f"PDF files or folders (default: {RAW_DATA_DIR})")
+    parser.add_argument("--max-pages", type=int, default=2, help="Pages per request when split")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per page")
+    args = parser.parse_args()
+
+    pdfs = []
+    for path in map(Path, args.paths or [RAW_DATA_DIR]):
+        pdfs.extend(sorted(path.glob("*.pdf")) if path.is_dir() else [path])
+
+    service = LocalDocumentAIStandIn(args.latency)
+    whole = DocumentAILayoutBackend(client=service, use_cache=False, max_pages_per_request=10 ** 6)
+    split = DocumentAILayoutBackend(client=service, use_cache=False, max_pages_per_request=args.max_pages)
+    processor = DocumentProcessor(layout_backend=whole)
+
+    failures, whole_time, split_time = 0, 0.0, 0.0
+    for pdf in pdfs:
+        start = time.perf_counter()
+        whole_blocks = whole.extract_blocks(str(pdf))
+        whole_time += time.perf_counter() - start
+
+        service.requests = service.max_in_flight = 0
+        start = time.perf_counter()
+        split_blocks = split.extract_blocks(str(pdf))
+        split_time += time.perf_counter() - start
+        requests, in_flight = service.requests, service.max_in_flight
+
+        whole_chunks = processor._extract_chunks_from_layout_parser(whole_blocks, pdf.name)
+        split_chunks = processor._extract_chunks_from_layout_parser(split_blocks, pdf.name)
+        pages_match = [(b.page, b.text) for b in whole_blocks] == [(b.page, b.text) for b in split_blocks]
+        chunks_match = chunk_signature(whole_chunks) == chunk_signature(split_chunks)
+        ok = pages_match and chunks_match
+        failures += not ok
+        print(
+            f"{'OK  ' if ok else 'FAIL'} {pdf.name[:40]:<40} {len(whole_blocks):>4} blocks, {len(whole_chunks):>3} chunks, "
+            f"{requests} requests ({in_flight} concurrent)"
+            + ("" if pages_match else "  [block pages/text differ]")
+            + ("" if chunks_match else "  [chunks differ]")
+        )
+
+    print(f"\nWhole: {whole_time:.1f}s, split into {args.max_pages}-page ranges: {split_time:.1f}s")
+    print("All documents match." if not failures else f"{failures} documents differ.")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Path: scripts/check_vectorstore_server.py
+
+"""
+Round-trips the VectorStoreService API against the configured Chroma server using a
+throwaway generation, so the live collections are never touched.
+
+    chroma run --path data/vectorstore --port 8001
+    CHROMA_MODE=http python scripts/check_vectorstore_server.py [--chunks 200] [--queries 50]
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import CHROMA_MODE, CHROMA_SERVER_HOST, CHROMA_SERVER_PORT
+from app.services.vectorstore import VectorStoreService
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+CHECK_GENERATION = "servercheck"
+DOCUMENT_NAME = "server_check.pdf"
+
+def make_chunks(n: int):
+    return [
+        {
+            "content": f"Server check chunk {i}",
+            "original_content": f"Server check chunk {i}",
+            "questions": [f"What is chunk {i}?"],
+            "source": DOCUMENT_NAME,
+            "document_name": DOCUMENT_NAME,
+            "page": i // 10 + 1,
+            "header": "Server check",
+            "forms": []
+        }
+        for i in range(n)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the vector store against a Chroma server")
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    if CHROMA_MODE != "http":
+        print("CHROMA_MODE is not 'http'; checking the local embedded store instead.")
+    rng = np.random.default_rng(0)
+    store = VectorStoreService(generation=CHECK_GENERATION)
+    try:
+        chunks = make_chunks(args.chunks)
+        embeddings = rng.normal(size=(args.chunks, args.dim)).astype(np.float32)
+        new_chunks, _ = store.diff_document(DOCUMENT_NAME, chunks)
+
+        start = time.perf_counter()
+        store.add_documents(new_chunks, embeddings.tolist())
+        store.record_document(DOCUMENT_NAME, "server-check", [c["chunk_id"] for c in chunks])
+        write_ms = (time.perf_counter() - start) * 1000
+        assert store.get_collection_count() == args.chunks, "Stored chunk count does not match"
+
+        latencies, found = [], 0
+        for i in rng.choice(args.chunks, size=min(args.queries, args.chunks), replace=False):
+            start = time.perf_counter()
+            results = store.hydrate(store.search(embeddings[i].tolist(), n_results=3))
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += bool(results) and results[0]["id"] == chunks[i]["chunk_id"]
+
+        removed = store.delete_document(DOCUMENT_NAME)
+        assert store.get_collection_count() == 0, "Chunks left behind after delete"
+
+        target = f"{CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}" if CHROMA_MODE == "http" else "local store"
+        print(f"\n=== Vector store check ({target}) ===")
+        print(f"Upserted {args.chunks} chunks in {write_ms:.0f} ms")
+        print(f"Self-retrieval: {found}/{len(latencies)} queries found their own chunk first")
+        print(f"Search + hydrate latency: p50 {np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms")
+        print(f"Deleted {removed} chunks")
+    finally:
+        store.drop_generation(CHECK_GENERATION)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Path: scripts/compare_layout_backends.py
+
+"""
+Compares the local PyMuPDF layout backend with Google Document AI on a folder of PDFs:
+extraction throughput, block types, and how far the resulting chunk structure
+(section headers and chunk text) differs. Without Document AI credentials, or with
+--local-only, only the local backend is measured.
+
+    python scripts/compare_layout_backends.py [--raw-dir data/raw] [--limit 20] [--local-only] [--detect-tables] [--show-headers]
+"""
+
+import sys
+import time
+import logging
+import argparse
+import difflib
+from collections import Counter
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import fitz
+
+from app.core.config import RAW_DATA_DIR
+from app.services import layout_backends
+from app.services.layout_backends import DocumentAILayoutBackend, PyMuPDFLayoutBackend, document_ai_configured
+from app.services.data_loader import DocumentProcessor
+from app.services.near_duplicates import shingles
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def run_backend(processor: DocumentProcessor, backend, pdf: Path):
+    """Returns (seconds, blocks, chunks) for one PDF."""
+    start = time.perf_counter()
+    blocks = backend.extract_blocks(str(pdf))
+    elapsed = time.perf_counter() - start
+    chunks = processor._extract_chunks_from_layout_parser(blocks, pdf.name) if blocks else []
+    return elapsed, blocks, chunks
+
+def section_headers(chunks):
+    headers = []
+    for chunk in chunks:
+        header = " ".join(chunk["header"].split()).lower()
+        if not headers or headers[-1] != header:
+            headers.append(header)
+    return headers
+
+def text_jaccard(chunks_a, chunks_b) -> float:
+    a = shingles(" ".join(chunk["content"] for chunk in chunks_a))
+    b = shingles(" ".join(chunk["content"] for chunk in chunks_b))
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description="PyMuPDF vs Document AI layout extraction")
+    parser.add_argument("--raw-dir", default=str(RAW_DATA_DIR))
+    parser.add_argument("--limit", type=int, default=None, help="Only the first N PDFs")
+    parser.add_argument("--local-only", action="store_true", help="Do not call Document AI")
+    parser.add_argument("--detect-tables", action="store_true", help="Enable PyMuPDF table detection (slower)")
+    parser.add_argument("--show-headers", action="store_true", help="Print the section header diff of each document")
+    args = parser.parse_args()
+
+    pdfs = sorted(Path(args.raw_dir).glob("*.pdf"))[:args.limit]
+    if not pdfs:
+        print(f"No PDFs found in {args.raw_dir}.")
+        return
+
+    layout_backends.PYMUPDF_DETECT_TABLES = args.detect_tables
+    local = PyMuPDFLayoutBackend()
+    remote = None
+    if not args.local_only:
+        if document_ai_configured():
+            remote = DocumentAILayoutBackend()
+        else:
+            print("Document AI is not configured; measuring the local backend only.\n")
+    processor = DocumentProcessor(layout_backend=local)
+
+    totals = Counter()
+    header_scores, text_scores, no_text = [], [], []
+    heading = f"{'Document':<40} {'pages':>5} {'local s':>8} {'chunks':>6}"
+    print(heading + (f" {'DocAI s':>8} {'chunks':>6} {'headers':>8} {'text':>6}" if remote else ""))
+    for pdf in pdfs:
+        with fitz.open(str(pdf)) as document:
+            pages = document.page_count
+        local_time, local_blocks, local_chunks = run_backend(processor, local, pdf)
+        totals["pages"] += pages
+        totals["local_time"] += local_time
+        totals.update(f"local:{block.type}" for block in local_blocks)
+        if not local_blocks:
+            no_text.append(pdf.name)
+
+        row = f"{pdf.name[:40]:<40} {pages:>5} {local_time:>8.2f} {len(local_chunks):>6}"
+        if remote:
+            try:
+                remote_time, remote_blocks, remote_chunks = run_backend(processor, remote, pdf)
+            except Exception as e:
+                print(f"{row}   Document AI failed: {e}")
+                continue
+            totals["remote_pages"] += pages
+            totals["remote_time"] += remote_time
+            totals["local_time_compared"] += local_time
+            totals.update(f"documentai:{block.type}" for block in remote_blocks)
+
+            local_headers, remote_headers = section_headers(local_chunks), section_headers(remote_chunks)
+            header_score = difflib.SequenceMatcher(None, local_headers, remote_headers).ratio()
+            text_score = text_jaccard(local_chunks, remote_chunks)
+            if local_blocks:
+                header_scores.append(header_score)
+                text_scores.append(text_score)
+            row += f" {remote_time:>8.2f} {len(remote_chunks):>6} {header_score:>8.0%} {text_score:>6.0%}"
+            if args.show_headers:
+                for line in difflib.unified_diff(remote_headers, local_headers, "documentai", "pymupdf", lineterm="", n=0):
+                    row += f"\n    {line}"
+        print(row)
+
+    print(f"\n=== Throughput ===")
+    print(f"PyMuPDF:      {totals['pages']} pages in {totals['local_time']:.2f}s ({totals['pages'] / max(totals['local_time'], 1e-9):.1f} pages/s)")
+    if totals["remote_pages"]:
+        remote_rate = totals["remote_pages"] / max(totals["remote_time"], 1e-9)
+        print(f"Document AI:  {totals['remote_pages']} pages in {totals['remote_time']:.2f}s ({remote_rate:.1f} pages/s)")
+        print(f"Speed-up:     {totals['remote_time'] / max(totals['local_time_compared'], 1e-9):.0f}x")
+
+    print(f"\n=== Block types ===")
+    for prefix in ("local", "documentai"):
+        types = {key.split(":", 1)[1]: count for key, count in totals.items() if key.startswith(f"{prefix}:")}
+        if types:
+            print(f"{'PyMuPDF' if prefix == 'local' else 'Document AI':<13} " + ", ".join(f"{t} {n}" for t, n in sorted(types.items())))
+
+    if header_scores:
+        print(f"\n=== Chunk structure agreement (documents with a text layer) ===")
+        print(f"Section headers (sequence similarity): {sum(header_scores) / len(header_scores):.0%} on average")
+        print(f"Chunk text (shingle Jaccard):          {sum(text_scores) / len(text_scores):.0%} on average")
+    if no_text:
+        print(f"\nNo text layer (needs OCR, handled by the Document AI fallback): {', '.join(no_text)}")
+
+if __name__ == "__main__":
+    main()
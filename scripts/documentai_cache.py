@@ -0,0 +1,103 @@
+# Path: scripts/documentai_cache.py
+
+"""
+Manages the on-disk cache of Document AI responses.
+
+    python scripts/documentai_cache.py stats
+    python scripts/documentai_cache.py prewarm [PDF or folder ...] [--workers 4] [--refresh]
+    python scripts/documentai_cache.py evict [--max-bytes N]
+    python scripts/documentai_cache.py clear [--older-than-days N]
+
+`prewarm` sends every PDF that is not cached yet (default: data/raw) to Document AI,
+so later ingestion and re-chunking runs never wait on the network.
+"""
+
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import RAW_DATA_DIR
+from app.services.documentai_cache import DocumentAIResponseCache
+from app.services.layout_backends import DocumentAILayoutBackend
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def format_bytes(n: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+def collect_pdfs(paths):
+    pdfs = []
+    for path in map(Path, paths):
+        pdfs.extend(sorted(path.glob("*.pdf")) if path.is_dir() else [path])
+    return pdfs
+
+def cmd_stats(cache: DocumentAIResponseCache, args):
+    stats = cache.stats()
+    print(f"Cache directory: {cache.cache_dir}")
+    print(f"Entries:         {stats['entries']}")
+    print(f"Size:            {format_bytes(stats['bytes'])} of {format_bytes(stats['max_bytes'])}")
+
+def cmd_prewarm(cache: DocumentAIResponseCache, args):
+    backend = DocumentAILayoutBackend(cache=cache)
+    pdfs = collect_pdfs(args.paths or [RAW_DATA_DIR])
+    pending = [pdf for pdf in pdfs if args.refresh or not backend.is_cached(str(pdf))]
+    print(f"{len(pdfs)} PDFs, {len(pdfs) - len(pending)} already cached, {len(pending)} to fetch.")
+
+    start, fetched, failed = time.perf_counter(), 0, 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(backend.fetch_documents, str(pdf), not args.refresh): pdf for pdf in pending}
+        for future in as_completed(futures):
+            pdf = futures[future]
+            try:
+                future.result()
+                fetched += 1
+                print(f"  cached  {pdf.name}")
+            except Exception as e:
+                failed += 1
+                print(f"  FAILED  {pdf.name}: {e}")
+    print(f"\nFetched {fetched}, failed {failed} in {time.perf_counter() - start:.1f}s.")
+    cmd_stats(cache, args)
+
+def cmd_evict(cache: DocumentAIResponseCache, args):
+    removed = cache.evict(args.max_bytes)
+    print(f"Evicted {removed} entries.")
+    cmd_stats(cache, args)
+
+def cmd_clear(cache: DocumentAIResponseCache, args):
+    older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+    removed = cache.clear(older_than)
+    print(f"Removed {removed} entries.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Document AI response cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("stats", help="Show entries and size")
+
+    prewarm = subparsers.add_parser("prewarm", help="Fetch and cache PDFs that are not cached yet")
+    prewarm.add_argument("paths", nargs="*", help=f"PDF files or folders (default: {RAW_DATA_DIR})")
+    prewarm.add_argument("--workers", type=int, default=4, help="Concurrent Document AI requests")
+    prewarm.add_argument("--refresh", action="store_true", help="Fetch again even if cached")
+
+    evict = subparsers.add_parser("evict", help="Apply the size bound now")
+    evict.add_argument("--max-bytes", type=int, default=None, help="Bound to apply (default: DOCUMENT_AI_CACHE_MAX_BYTES)")
+
+    clear = subparsers.add_parser("clear", help="Delete cached responses")
+    clear.add_argument("--older-than-days", type=float, default=None, help="Only entries not used for this many days")
+
+    args = parser.parse_args()
+    cache = DocumentAIResponseCache()
+    {"stats": cmd_stats, "prewarm": cmd_prewarm, "evict": cmd_evict, "clear": cmd_clear}[args.command](cache, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Path: scripts/ingest_documents.py
+
+"""
+Bulk-ingests a folder of PDFs into the knowledge base, several files at a time in
+separate worker processes (each loads its own models, so mind the memory per worker).
+
+Files whose content hash is already indexed are skipped. Per-file and per-stage
+progress is checkpointed to BULK_INGEST_CHECKPOINT_PATH, so an interrupted run picks
+up where it stopped when started again: finished files are skipped, and files that
+were cut off reuse the chunk batches they had already stored.
+
+The embedded vector store supports a single process; running several workers needs
+CHROMA_MODE=http (a shared Chroma server).
+
+    python scripts/ingest_documents.py [folder] [--workers 4] [--pattern "*.pdf"] [--restart]
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import fitz
+
+from app.core.config import RAW_DATA_DIR, CHROMA_MODE, BULK_INGEST_CHECKPOINT_PATH
+from app.core.hashing import sha256_file
+from app.services.collection_alias import CollectionAliasStore, manifest_db_path
+from app.services.manifest_service import DocumentManifestService
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PENDING, RUNNING, DONE, FAILED, INTERRUPTED = "pending", "running", "done", "failed", "interrupted"
+
+
+class IngestCheckpoint:
+    """Per-file state of a bulk run, saved as JSON with an atomic rename after every change."""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.files: Dict[str, Dict] = json.load(f).get("files", {})
+        except FileNotFoundError:
+            self.files = {}
+
+    def queue_file(self, file_path: str, content_hash: str, pages: int) -> bool:
+        """Marks the file pending for this run. Returns True if an earlier run had started on the same content."""
+        with self._lock:
+            entry = self.files.get(file_path) or {}
+            resumed = entry.get("content_hash") == content_hash and entry.get("status", PENDING) != PENDING
+            self.files[file_path] = {**(entry if resumed else {}), "content_hash": content_hash, "pages": pages, "status": PENDING}
+            self._save()
+            return resumed
+
+    def update(self, file_path: str, **fields):
+        with self._lock:
+            self.files.setdefault(file_path, {}).update(fields)
+            self._save()
+
+    def record_progress(self, file_path: str, **fields):
+        """Like update, but late progress messages never reopen a finished file."""
+        with self._lock:
+            entry = self.files.setdefault(file_path, {})
+            if entry.get("status") in (DONE, FAILED):
+                return
+            entry.update(fields)
+            self._save()
+
+    def mark_running_as(self, status: str):
+        with self._lock:
+            for entry in self.files.values():
+                if entry.get("status") == RUNNING:
+                    entry["status"] = status
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": datetime.now().isoformat(), "files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+# --- Worker processes ---
+
+_worker: Dict = {}
+
+def init_worker(progress_queue):
+    # Interrupts are handled by the coordinator, which terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    from app.services.rag_service import RAGService
+    _worker["rag"] = RAGService()
+    _worker["progress"] = progress_queue
+
+def ingest_file(file_path: str) -> Dict:
+    rag = _worker["rag"]
+
+    def progress(stage: str, done: int = 0, total: int = 0):
+        _worker["progress"].put((file_path, stage, done, total))
+
+    stats, llm_calls, start = {}, rag.doc_processor.llm_calls, time.perf_counter()
+    try:
+        ok, error = rag.process_document(file_path, progress=progress, stats=stats), None
+    except Exception as e:
+        ok, error = False, str(e)
+    return {
+        "path": file_path, "ok": ok, "error": error, "seconds": time.perf_counter() - start,
+        "llm_calls": rag.doc_processor.llm_calls - llm_calls, **stats
+    }
+
+
+# --- Coordinator ---
+
+def scan(folder: Path, pattern: str, checkpoint: IngestCheckpoint):
+    """
+    Returns the (path, pages) of the files to ingest, largest first, the number already
+    indexed, and how many of the pending ones an earlier run had started.
+    """
+    manifest = DocumentManifestService(manifest_db_path(CollectionAliasStore().get_active()))
+    pending, indexed, resumed = [], 0, 0
+    for path in sorted(folder.glob(pattern)):
+        content_hash = sha256_file(str(path))
+        stored = manifest.get_document(path.name)
+        if stored and stored["content_hash"] == content_hash:
+            indexed += 1
+            continue
+        with fitz.open(str(path)) as pdf:
+            pages = pdf.page_count
+        resumed += checkpoint.queue_file(str(path), content_hash, pages)
+        pending.append((path, pages))
+    pending.sort(key=lambda item: item[0].stat().st_size, reverse=True)
+    return pending, indexed, resumed
+
+def watch_progress(progress_queue, checkpoint: IngestCheckpoint, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            file_path, stage, done, total = progress_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        fields = {"status": RUNNING, "stage": stage, "chunks_done": done, "chunks_total": total}
+        if stage == "extracting":
+            fields["started_at"] = datetime.now().isoformat()
+        checkpoint.record_progress(file_path, **fields)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingestion with checkpoint/resume")
+    parser.add_argument("folder", nargs="?", default=str(RAW_DATA_DIR), help=f"Folder to ingest (default: {RAW_DATA_DIR})")
+    parser.add_argument("--pattern", default="*.pdf", help="File pattern within the folder")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Worker processes")
+    parser.add_argument("--checkpoint", default=BULK_INGEST_CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = IngestCheckpoint(args.checkpoint)
+    pending, indexed, resumed = scan(Path(args.folder), args.pattern, checkpoint)
+    print(f"{len(pending) + indexed} files: {indexed} already indexed, {len(pending)} to ingest ({resumed} resumed).")
+    if not pending:
+        return
+
+    workers = max(1, min(args.workers, len(pending)))
+    if CHROMA_MODE == "local" and workers > 1:
+        print("The embedded vector store supports one process; using 1 worker (set CHROMA_MODE=http for more).")
+        workers = 1
+
+    context = multiprocessing.get_context("spawn")
+    progress_queue = context.Queue()
+    stop = threading.Event()
+    watcher = threading.Thread(target=watch_progress, args=(progress_queue, checkpoint, stop), daemon=True)
+    watcher.start()
+
+    totals = {"files": 0, "failed": 0, "pages": 0, "chunks": 0, "new": 0, "reused": 0, "llm_calls": 0}
+    start, interrupted = time.perf_counter(), False
+    pages_by_path = {str(path): pages for path, pages in pending}
+    pool = context.Pool(workers, initializer=init_worker, initargs=(progress_queue,))
+    try:
+        for result in pool.imap_unordered(ingest_file, list(pages_by_path)):
+            path, pages = Path(result["path"]), pages_by_path[result["path"]]
+            status = DONE if result["ok"] else FAILED
+            fields = {key: value for key, value in result.items() if key not in ("path", "ok")}
+            checkpoint.update(str(path), status=status, finished_at=datetime.now().isoformat(), **fields)
+
+            totals["files"] += 1
+            if status == FAILED:
+                totals["failed"] += 1
+                print(f"  FAILED  {path.name}: {result['error'] or 'nothing was ingested, see the log'}")
+                continue
+            totals["pages"] += pages
+            for key in ("chunks", "new", "reused", "llm_calls"):
+                totals[key] += result.get(key, 0)
+            print(
+                f"  done    {path.name[:48]:<48} {pages:>4} pages {result.get('chunks', 0):>5} chunks "
+                f"({result.get('new', 0)} new, {result.get('reused', 0)} reused) {result.get('llm_calls', 0):>5} LLM calls "
+                f"{result['seconds']:>7.1f}s"
+            )
+        pool.close()
+    except KeyboardInterrupt:
+        # Files cut off here keep the chunk batches they stored; the next run reuses them
+        interrupted = True
+        pool.terminate()
+    finally:
+        pool.join()
+        stop.set()
+        watcher.join()
+
+    if interrupted:
+        checkpoint.mark_running_as(INTERRUPTED)
+        print(f"\nInterrupted. Progress is saved in {args.checkpoint}; run the command again to resume.")
+        sys.exit(130)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"\n=== Summary ({workers} worker{'s' if workers > 1 else ''}, {elapsed:.1f}s) ===")
+    print(f"Files:      {totals['files'] - totals['failed']} ingested, {totals['failed']} failed, {indexed} skipped")
+    print(f"Pages:      {totals['pages']} ({totals['pages'] / elapsed:.2f} pages/s)")
+    print(f"Chunks:     {totals['chunks']} ({totals['chunks'] / elapsed:.2f} chunks/s), {totals['new']} embedded, {totals['reused']} reused")
+    print(f"LLM calls:  {totals['llm_calls']} ({totals['llm_calls'] / elapsed:.2f} calls/s)")
+    if totals["failed"]:
+        print(f"\nFailed files stay in {args.checkpoint}; run the command again to retry them.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
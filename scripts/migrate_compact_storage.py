@@ -0,0 +1,125 @@
+# Path: scripts/migrate_compact_storage.py
+
+"""
+Moves chunk text out of an existing Chroma collection into the compressed
+side store used by compact storage, then reports the disk and per-query
+payload savings.
+
+    python scripts/migrate_compact_storage.py [--dry-run] [--vacuum]
+"""
+
+import sys
+import json
+import sqlite3
+import logging
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import CHROMA_PERSIST_DIR, CHUNK_CONTENT_DB_PATH, VECTORSTORE_SCAN_BATCH_SIZE
+from app.services.chunk_store import ChunkContentStore
+from app.services.vectorstore import VectorStoreService
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def directory_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+def payload_size(document: str, metadata: dict) -> int:
+    """Approximate bytes a query result deserializes for one chunk."""
+    return len((document or "").encode("utf-8")) + len(json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8"))
+
+def format_bytes(n: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+def migrate(dry_run: bool, vacuum: bool):
+    vector_store = VectorStoreService()
+    collection = vector_store.collection
+    content_store = vector_store.content_store or ChunkContentStore()
+
+    disk_before = directory_size(Path(CHROMA_PERSIST_DIR))
+    payload_before, payload_after, migrated, offset = 0, 0, 0, 0
+
+    while True:
+        page = collection.get(
+            limit=VECTORSTORE_SCAN_BATCH_SIZE,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        offset += len(ids)
+
+        records, slim_metadatas, embeddings, slim_ids = {}, [], [], []
+        for i, chunk_id in enumerate(ids):
+            document = page["documents"][i]
+            metadata = page["metadatas"][i] or {}
+            payload_before += payload_size(document, metadata)
+
+            slim = {k: v for k, v in metadata.items() if k not in ("original_content", "questions")}
+            payload_after += payload_size("", slim)
+            if not document and "original_content" not in metadata:
+                continue  # Already compact
+
+            records[chunk_id] = {
+                "original_content": metadata.get("original_content") or document or "",
+                "questions": [q for q in metadata.get("questions", "").split("|") if q]
+            }
+            slim_ids.append(chunk_id)
+            embeddings.append(page["embeddings"][i])
+            slim_metadatas.append({**slim, "original_content": None, "questions": None})
+
+        if dry_run or not slim_ids:
+            migrated += len(slim_ids)
+            continue
+
+        # Text goes to the side store first so no chunk is ever without content
+        content_store.put_many(records)
+        collection.upsert(
+            ids=slim_ids,
+            embeddings=embeddings,
+            documents=[""] * len(slim_ids),
+            metadatas=slim_metadatas
+        )
+        migrated += len(slim_ids)
+        logger.info(f"Migrated {migrated} chunks so far...")
+
+    if vacuum and not dry_run:
+        # Chroma's SQLite file keeps freed pages until it is vacuumed
+        sqlite_path = Path(CHROMA_PERSIST_DIR) / "chroma.sqlite3"
+        if sqlite_path.is_file():
+            with sqlite3.connect(sqlite_path) as conn:
+                conn.execute("VACUUM")
+
+    disk_after = directory_size(Path(CHROMA_PERSIST_DIR))
+    side_store = Path(CHUNK_CONTENT_DB_PATH).stat().st_size if Path(CHUNK_CONTENT_DB_PATH).exists() else 0
+    chunks = max(offset, 1)
+
+    print("\n=== Compact storage migration report ===")
+    print(f"Chunks scanned:                 {offset}")
+    print(f"{'Chunks to migrate:' if dry_run else 'Chunks migrated:':<32}{migrated}")
+    print(f"Vector store on disk before:    {format_bytes(disk_before)}")
+    if not dry_run:
+        print(f"Vector store on disk after:     {format_bytes(disk_after)}{'' if vacuum else '  (run with --vacuum to reclaim freed pages)'}")
+        print(f"Side store on disk:             {format_bytes(side_store)} ({format_bytes(content_store.stored_bytes())} compressed payload)")
+        print(f"Total on disk after:            {format_bytes(disk_after + side_store)}")
+    print(f"Avg payload per search hit:     {format_bytes(payload_before / chunks)} -> {format_bytes(payload_after / chunks)}")
+    print(f"Payload for a 20-candidate search: {format_bytes(20 * payload_before / chunks)} -> {format_bytes(20 * payload_after / chunks)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the vector store to compact chunk storage")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM Chroma's SQLite file after migrating")
+    args = parser.parse_args()
+    migrate(args.dry_run, args.vacuum)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Path: scripts/near_duplicate_report.py
+
+"""
+Reports how much near-duplicate collapsing saves on the current collection: chunks
+already collapsed at ingestion (canonical chunks with several sources) and stored
+chunks that would still collapse, with the index size, embedding and
+question-generation work involved.
+
+    python scripts/near_duplicate_report.py [--threshold 0.85] [--top 10]
+"""
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import VECTORSTORE_SCAN_BATCH_SIZE, NEAR_DUPLICATE_THRESHOLD, NEAR_DUPLICATE_MIN_LENGTH
+from app.services.near_duplicates import NearDuplicateIndex, fact_key, parse_references
+from app.services.vectorstore import VectorStoreService
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def format_bytes(n: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate savings report")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--top", type=int, default=10, help="Largest duplicate clusters to show")
+    args = parser.parse_args()
+
+    vector_store = VectorStoreService()
+    index = NearDuplicateIndex()
+    clusters, previews = {}, {}
+    chunks = collapsed = dim = text_bytes = 0
+    offset = 0
+    while True:
+        page = vector_store.collection.get(
+            limit=VECTORSTORE_SCAN_BATCH_SIZE, offset=offset, include=["metadatas", "documents", "embeddings"]
+        )
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        offset += len(ids)
+        dim = len(page["embeddings"][0])
+        stored = vector_store.content_store.get_many(ids) if vector_store.content_store else {}
+        for i, chunk_id in enumerate(ids):
+            metadata = page["metadatas"][i] or {}
+            record = stored.get(chunk_id)
+            text = record["original_content"] if record else metadata.get("original_content") or page["documents"][i] or ""
+            chunks += 1
+            text_bytes += len(text.encode("utf-8"))
+            collapsed += max(len(parse_references(metadata.get("sources"))) - 1, 0)
+
+            signature = vector_store.minhasher.signature(text) if len(text) >= NEAR_DUPLICATE_MIN_LENGTH else None
+            if signature is None:
+                continue
+            facts = fact_key(f"{metadata.get('header', '')}\n{text}")
+            match = index.query(signature, facts, args.threshold)
+            if match:
+                clusters.setdefault(match[0], []).append(metadata.get("source", "Unknown"))
+            else:
+                index.add(chunk_id, signature, facts)
+                previews[chunk_id] = (metadata.get("source", "Unknown"), " ".join(text.split())[:80])
+
+    if not chunks:
+        print("The collection is empty.")
+        return
+
+    questions = vector_store.questions_collection.count()
+    questions_per_chunk = questions / chunks
+    vector_bytes = dim * 4
+    per_chunk_bytes = vector_bytes * (1 + questions_per_chunk) + text_bytes / chunks
+    remaining = sum(len(members) for members in clusters.values())
+
+    print(f"\n=== Near-duplicate report (threshold {args.threshold}) ===")
+    print(f"Stored chunks:                       {chunks}")
+    print(f"Question vectors:                    {questions} ({questions_per_chunk:.1f} per chunk)")
+    print(f"\nAlready collapsed at ingestion:      {collapsed} duplicate occurrences")
+    print(f"  Index size saved:                  ~{format_bytes(collapsed * per_chunk_bytes)}")
+    print(f"  Embeddings saved:                  ~{collapsed * (1 + questions_per_chunk):.0f} ({collapsed} chunks + their questions)")
+    print(f"  Question-generation calls saved:   {collapsed}")
+    print(f"\nStored chunks that still collapse:   {remaining} ({remaining / chunks:.1%}) in {len(clusters)} clusters")
+    print(f"  Index size a rebuild would save:   ~{format_bytes(remaining * per_chunk_bytes)}")
+    print(f"  Embeddings a rebuild would save:   ~{remaining * (1 + questions_per_chunk):.0f}")
+    print(f"  Question-generation calls saved:   {remaining}")
+
+    if clusters:
+        print(f"\nLargest clusters:")
+        for canonical_id, members in sorted(clusters.items(), key=lambda item: -len(item[1]))[:args.top]:
+            source, preview = previews[canonical_id]
+            documents = len(set(members) | {source})
+            print(f"  {len(members) + 1:>4} copies in {documents:>3} documents: {preview}...")
+        print("\nRun a rebuild (POST /api/documents/rebuild) to collapse the remaining duplicates.")
+
+if __name__ == "__main__":
+    main()
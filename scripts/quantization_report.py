@@ -0,0 +1,100 @@
+# Path: scripts/quantization_report.py
+
+"""
+Measures recall@k against exact cosine search, and the memory of the codes, for
+several PCA + int8 settings on the embeddings currently in the vector store.
+
+The service does not search compressed codes: Chroma keeps its full-precision HNSW
+index in memory either way, so an in-process code index would only add to it. The
+report tells what a store that keeps only the codes in RAM would give up in recall.
+
+Queries are the generated-question vectors when available (they look like real
+user questions); otherwise perturbed chunk embeddings are used.
+
+    python scripts/quantization_report.py [--k 3] [--queries 200] [--dims 384 256 128 64]
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import VECTORSTORE_SCAN_BATCH_SIZE, QUANTIZATION_TRAINING_SIZE
+from app.services.vectorstore import VectorStoreService
+from vector_quantizer import PCAInt8Quantizer, CompressedVectorIndex, exact_top_k, rescore
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def load_embeddings(collection, limit=None):
+    ids, vectors, offset = [], [], 0
+    while limit is None or offset < limit:
+        page = collection.get(limit=VECTORSTORE_SCAN_BATCH_SIZE, offset=offset, include=["embeddings"])
+        if not page.get("ids"):
+            break
+        ids.extend(page["ids"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+    return ids, (np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32))
+
+def evaluate(ids, vectors, queries, k, dim, rescore_candidates):
+    quantizer = PCAInt8Quantizer(dim=dim).fit(vectors[:QUANTIZATION_TRAINING_SIZE])
+    index = CompressedVectorIndex(quantizer)
+    index.add(ids, vectors)
+    positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+
+    hits, elapsed = 0, 0.0
+    for query in queries:
+        truth = {ids[i] for i in exact_top_k(vectors, query, k)}
+        start = time.perf_counter()
+        candidates = index.search(query, max(k, rescore_candidates))
+        if rescore_candidates:
+            rows = [positions[c] for c in candidates]
+            found = [chunk_id for chunk_id, _ in rescore(candidates, vectors[rows], query, k)]
+        else:
+            found = candidates[:k]
+        elapsed += time.perf_counter() - start
+        hits += len(truth & set(found))
+    return hits / (k * len(queries)), index.nbytes, elapsed / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs memory report for compressed vector search")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, nargs="+", default=[384, 256, 128, 64])
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 20, 50])
+    args = parser.parse_args()
+
+    vector_store = VectorStoreService()
+    ids, vectors = load_embeddings(vector_store.collection)
+    if len(ids) < 2:
+        print("The collection has too few vectors to evaluate.")
+        return
+
+    rng = np.random.default_rng(0)
+    _, queries = load_embeddings(vector_store.questions_collection, limit=args.queries * 5)
+    source = "generated questions"
+    if len(queries) == 0:
+        queries = vectors + rng.normal(0, 0.02, vectors.shape).astype(np.float32)
+        source = "perturbed chunk embeddings"
+    queries = queries[rng.choice(len(queries), size=min(args.queries, len(queries)), replace=False)]
+
+    full_bytes = vectors.nbytes
+    print(f"\nCorpus: {len(ids)} vectors x {vectors.shape[1]} dims, float32 = {full_bytes / 1024:.0f} KiB")
+    print(f"Queries: {len(queries)} {source}, k = {args.k}\n")
+    print(f"{'dims':>6} {'rescore':>8} {'recall@k':>9} {'codes KiB':>10} {'of float32':>11} {'ms/query':>9}")
+    for dim in [vectors.shape[1]] + [d for d in args.dims if d < vectors.shape[1]]:
+        for rescore_candidates in args.rescore:
+            recall, nbytes, ms = evaluate(ids, vectors, queries, args.k, dim, rescore_candidates)
+            print(f"{dim:>6} {rescore_candidates:>8} {recall:>9.3f} {nbytes / 1024:>10.0f} {nbytes / full_bytes:>10.1%} {ms:>9.2f}")
+    print("\nWith rescore > 0 the full-precision vectors are read from the store only for those candidates.")
+    print("Codes only save memory in a store that does not also keep the float32 vectors (and HNSW graph) in RAM;")
+    print("next to Chroma's index they are an addition, not a replacement.")
+
+if __name__ == "__main__":
+    main()
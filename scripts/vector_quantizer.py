@@ -0,0 +1,133 @@
+# Path: scripts/vector_quantizer.py
+
+"""
+PCA + int8 compression of the stored embeddings, used by quantization_report.py to
+measure what searching compressed codes would cost in recall. Not used when serving.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import logging
+
+from app.services.context_builder import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+class PCAInt8Quantizer:
+    """
+    Compresses embeddings with PCA to `dim` dimensions followed by symmetric int8
+    scalar quantization per dimension. A 768-d float32 vector (3 KiB) becomes
+    `dim` bytes; approximate cosine scores are computed directly on the codes.
+    """
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None  # (input_dim, dim)
+        self.scale: Optional[np.ndarray] = None       # (dim,)
+
+    def fit(self, vectors: np.ndarray) -> "PCAInt8Quantizer":
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self.mean = vectors.mean(axis=0)
+        centered = vectors - self.mean
+        input_dim = vectors.shape[1]
+        dim = min(self.dim or input_dim, input_dim, len(vectors))
+        if dim < input_dim:
+            # Principal axes from the SVD of the centered data
+            _, _, vt = np.linalg.svd(centered, full_matrices=False)
+            self.components = vt[:dim].T.astype(np.float32)
+        else:
+            self.components = np.eye(input_dim, dtype=np.float32)
+        projected = centered @ self.components
+        max_abs = np.abs(projected).max(axis=0)
+        max_abs[max_abs == 0] = 1.0
+        self.scale = (max_abs / 127.0).astype(np.float32)
+        self.dim = self.components.shape[1]
+        return self
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = normalize_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        return (vectors - self.mean) @ self.components
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.round(self.project(vectors) / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate similarity of each code to the query (same ordering as cosine)."""
+        projected_query = self.project(query)[0]
+        return codes.astype(np.float32) @ (projected_query * self.scale)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.mean, self.components, self.scale) if a is not None)
+
+
+class CompressedVectorIndex:
+    """
+    In-memory first-pass index over compressed embeddings. `search` ranks every code
+    with the quantizer and returns the best candidate ids for full-precision re-scoring.
+    """
+    def __init__(self, quantizer: PCAInt8Quantizer):
+        self.quantizer = quantizer
+        self.ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.codes = np.zeros((0, quantizer.dim or 0), dtype=np.int8)
+        self._alive = np.zeros(0, dtype=bool)
+
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        if not ids:
+            return
+        self.remove(ids)
+        codes = self.quantizer.encode(np.asarray(embeddings, dtype=np.float32))
+        start = len(self.ids)
+        self.ids.extend(ids)
+        self._positions.update({chunk_id: start + i for i, chunk_id in enumerate(ids)})
+        self.codes = np.vstack([self.codes, codes]) if len(self.codes) else codes
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+
+    def remove(self, ids: Iterable[str]):
+        for chunk_id in ids:
+            position = self._positions.pop(chunk_id, None)
+            if position is not None:
+                self._alive[position] = False
+
+    def search(self, query_embedding: List[float], n_candidates: int, allowed_ids: Optional[List[str]] = None) -> List[str]:
+        if not self._positions:
+            return []
+        scores = self.quantizer.scores(self.codes, np.asarray(query_embedding, dtype=np.float32))
+        mask = self._alive.copy()
+        if allowed_ids:
+            allowed = np.zeros_like(mask)
+            allowed[[self._positions[i] for i in allowed_ids if i in self._positions]] = True
+            mask &= allowed
+        scores[~mask] = -np.inf
+        n_candidates = min(n_candidates, int(mask.sum()))
+        if n_candidates <= 0:
+            return []
+        top = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[i] for i in top]
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes and the quantizer (excluding the id list)."""
+        return self.codes.nbytes + self._alive.nbytes + self.quantizer.nbytes
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k row indices, used as ground truth and for re-scoring."""
+    scores = normalize_rows(vectors) @ normalize_rows(np.atleast_2d(query))[0]
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def rescore(candidate_ids: List[str], candidate_vectors: np.ndarray, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+    """Re-ranks candidates with full-precision cosine distance; returns (id, distance) pairs."""
+    if not candidate_ids:
+        return []
+    similarities = normalize_rows(candidate_vectors) @ normalize_rows(np.atleast_2d(query))[0]
+    order = np.argsort(-similarities)[:k]
+    return [(candidate_ids[i], float(1.0 - similarities[i])) for i in order]